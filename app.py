@@ -1,60 +1,54 @@
-import os
-import pickle
-import time
-
 import dash
-import pandas as pd
+import flask
 
-from utils import evaluate, explore
+from utils.session import ResultCache, SessionStore
 from utils.settings import (
-    CALENDAR_FILEPATH,
-    SELL_PRICES_FILEPATH,
-    SALES_FILEPATH,
-    CACHE_DIR,
-    ACCURACY_EVALUATOR_FILE_PATH,
-    SALES_EXPLORER_FILE_PATH
+    EXPLORE_CACHE_DIR,
+    EXPLORE_CACHE_MAX_BYTES,
+    EXPLORE_CACHE_TTL,
+    WARMUP_IN_BACKGROUND
 )
+from utils.warmup import Warmup
 
 
-start = time.process_time()
-
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 server = app.server
 
 # warmup
+# artifacts are rebuilt only if stale, then memory-mapped read-only
+# and shared across processes by the OS page cache.
+# `warmup.accuracy_evaluator` and `warmup.sales_explorer` are set once ready
 
-if not os.path.exists(ACCURACY_EVALUATOR_FILE_PATH):
-    
-    calendar_df = pd.read_csv(CALENDAR_FILEPATH, parse_dates=['date'])
-    sell_prices_df = pd.read_csv(SELL_PRICES_FILEPATH)
-    sales_df = pd.read_csv(SALES_FILEPATH)
-    
-    accuracy_evaluator = evaluate.AccuracyEvaluator(
-        sales_df,
-        sell_prices_df,
-        calendar_df
-        )
-    
-    with open(ACCURACY_EVALUATOR_FILE_PATH, 'wb') as f:
-        pickle.dump(accuracy_evaluator, f)
-else:
-    with open(ACCURACY_EVALUATOR_FILE_PATH, 'rb') as f:
-        accuracy_evaluator = pickle.load(f)
-
-if not os.path.exists(SALES_EXPLORER_FILE_PATH):
-    
-    sales_df = pd.read_csv(SALES_FILEPATH)
-    calendar_df = pd.read_csv(CALENDAR_FILEPATH, parse_dates=['date'])
-    
-    sales_explorer = explore.SalesExplorer(
-        sales_df,
-        calendar_df
-        )
-    
-    with open(SALES_EXPLORER_FILE_PATH, 'wb') as f:
-        pickle.dump(sales_explorer, f)
-else:
-    with open(SALES_EXPLORER_FILE_PATH, 'rb') as f:
-        sales_explorer = pickle.load(f)
+warmup = Warmup()
 
-print('Prelim steps time: {}'.format(time.process_time() - start))
\ No newline at end of file
+if WARMUP_IN_BACKGROUND:
+    warmup.start()
+else:
+    warmup.run()
+
+# server-side per-session data, e.g. uploaded predictions
+session_store = SessionStore()
+
+# server-side explore query results, shared by all sessions and workers
+explore_cache = ResultCache(EXPLORE_CACHE_DIR, EXPLORE_CACHE_MAX_BYTES, EXPLORE_CACHE_TTL)
+
+@server.route('/warmup')
+def warmup_status():
+    """
+    Warm-up progress, with per-phase timings
+    """
+    return flask.jsonify(warmup.status())
+
+@server.route('/ready')
+def warmup_ready():
+    """
+    Readiness probe: 200 once all data objects are ready, 503 before
+    """
+    return flask.jsonify(ready=warmup.ready), 200 if warmup.ready else 503
+
+@server.route('/explore-cache')
+def explore_cache_stats():
+    """
+    Explore query cache hits and misses of this worker, and its in-process tier usage
+    """
+    return flask.jsonify(explore_cache.stats())
@@ -0,0 +1,85 @@
+"""
+Accuracy, memory and speed of single precision evaluation, against double precision.
+
+Builds one `AccuracyEvaluator` per precision from the data files, scores the same random
+predictions with both, and reports
+    max relative WRMSSE error : must be below SINGLE_PRECISION_RTOL, exit code 1 otherwise
+    MB per precision          : pre-computed arrays (rolled-up values, scaling factors, prices, weights)
+    ms per submission         : `evaluate_many` wall time
+
+    $ pipenv run python benchmarks/precision.py --n-submissions 16
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from utils.evaluate import AccuracyEvaluator
+from utils.loading import read_calendar, read_sales, read_sell_prices
+from utils.settings import SINGLE_PRECISION_RTOL
+
+ARRAY_ATTRIBUTES = [
+    'rolled_up_groundtruth_values',
+    'rolled_up_lookback_values',
+    'scaling_factors',
+    'abs_scaling_factors',
+    'price_cube',
+    'sales_usd_per_id',
+    'sales_usd',
+    'sales_usd_weights'
+]
+
+def get_arrays_mb(evaluator: AccuracyEvaluator) -> float:
+    return sum(getattr(evaluator, attribute).nbytes for attribute in ARRAY_ATTRIBUTES) / 2**20
+
+def get_random_predictions(evaluator: AccuracyEvaluator, n_submissions: int, seed: int) -> np.array:
+    """
+    Return groundtruth values plus Poisson noise, of shape `(n_submissions, n_ids, n_validation_days)`
+    """
+    rng = np.random.default_rng(seed)
+    groundtruth_values = np.asarray(evaluator.groundtruth_values, dtype=np.float64)
+    noise = rng.poisson(1., size=(n_submissions,) + groundtruth_values.shape) \
+        - rng.poisson(1., size=(n_submissions,) + groundtruth_values.shape)
+    return np.maximum(groundtruth_values[None] + noise, 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-submissions', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sales_df, sell_prices_df, calendar_df = read_sales(), read_sell_prices(), read_calendar()
+
+    evaluators = {
+        precision: AccuracyEvaluator(sales_df, sell_prices_df, calendar_df, precision=precision)
+        for precision in ['double', 'single']
+    }
+
+    pred_values = get_random_predictions(evaluators['double'], args.n_submissions, args.seed)
+
+    print('precision,arrays_mb,ms_per_submission')
+
+    wrmsse = {}
+    for precision, evaluator in evaluators.items():
+        values = pred_values.astype(evaluator.float_dtype)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            wrmsse[precision], _ = evaluator.evaluate_many(values)
+            timings.append(time.perf_counter() - start)
+        print(f'{precision},{get_arrays_mb(evaluator):.1f},{1e3 * min(timings) / args.n_submissions:.2f}')
+
+    relative_error = np.max(np.abs(wrmsse['single'] - wrmsse['double']) / np.abs(wrmsse['double']))
+    print(f'max relative WRMSSE error: {relative_error:.2e} (tolerance {SINGLE_PRECISION_RTOL:.0e})')
+
+    if not relative_error < SINGLE_PRECISION_RTOL:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+Wall time and peak memory of the hot paths, on synthetic M5-shaped data (see `utils.synthetic`),
+compared against a stored baseline.
+
+For each benchmark, reports
+    seconds : best wall time over `--repeat` runs
+    peak_mb : peak memory allocated during one run, traced with tracemalloc (numpy arrays included)
+and flags a regression when the time or memory exceeds the baseline by more than the tolerances.
+The exit code is 1 if any benchmark regressed.
+
+Baselines are stored per data scale in `benchmarks/baselines/`, with the machine they were measured on.
+Timings are only comparable on the same machine: refresh the baseline with `--save-baseline` after
+an intended change, or when benchmarking on another machine.
+
+    $ pipenv run python benchmarks/suite.py --scale 0.1
+    $ pipenv run python benchmarks/suite.py --scale 0.1 --only evaluate --save-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from utils.evaluate import (
+    AccuracyEvaluator,
+    get_rollup_matrix,
+    get_scaling_factors,
+    get_sales_usd_weights
+)
+from utils.explore import SalesExplorer
+from utils.plotting import (
+    plot_evaluate_first_col,
+    plot_evaluate_second_col,
+    plot_evaluate_third_col,
+    plot_sunburst,
+    plot_time_pyramid
+)
+from utils.settings import N_VALIDATION_DAYS, RMSSE_COL, WRMSSE_COL
+from utils.synthetic import make_synthetic_m5
+
+BASELINES_DIR = os.path.join(REPO_DIR, 'benchmarks', 'baselines')
+
+# explore tab queries: filter values (in the order of `SalesExplorer.filter_possible_values_dict`), group by, aggregate
+EXPLORE_QUERIES = {
+    'all': (None, 'store_id', 'sum'),
+    'filtered': ({'state_id': ['CA'], 'cat_id': ['FOODS', 'HOBBIES']}, 'dept_id', 'mean'),
+    'sampled': (None, 'item_id', 'sum'),
+}
+
+def get_filter_values(
+    sales_explorer: SalesExplorer,
+    filters: dict
+) -> List[List[str]]:
+    filters = filters or {}
+    return [filters.get(f['name'], []) for f in sales_explorer.filter_possible_values_dict]
+
+def get_benchmarks(
+    sales_df: pd.DataFrame,
+    sell_prices_df: pd.DataFrame,
+    calendar_df: pd.DataFrame,
+    seed: int
+) -> Dict[str, Callable]:
+    """
+    Return the benchmarked functions, by name, with their inputs bound.
+    Inputs shared by several benchmarks are computed here, outside of the measures
+    """
+
+    rng = np.random.default_rng(seed)
+
+    _, _, _, rollup_matrix = get_rollup_matrix(sales_df)
+
+    evaluator = AccuracyEvaluator(sales_df, sell_prices_df, calendar_df)
+
+    predictions_df = pd.DataFrame(
+        np.maximum(evaluator.groundtruth_values + rng.normal(0, 1, evaluator.groundtruth_values.shape), 0),
+        columns=[f'F{k + 1}' for k in range(N_VALIDATION_DAYS)]
+    )
+    predictions_df.insert(0, 'id', evaluator.ids)
+
+    _, residuals, results_df = evaluator.evaluate_detailed(predictions_df)
+
+    # top series of the store level, as rendered by `layout.evaluate.render_fa_third_col`
+    agg_level = 'store_id'
+    top_results_df = results_df.loc[results_df['agg_level'] == agg_level]\
+        .nlargest(n=10, columns=[WRMSSE_COL])
+    index = top_results_df.index.values
+    top_results_df = top_results_df.reset_index(drop=True)
+    groundtruth_values = evaluator.get_rolled_up_groundtruth(index)
+    to_plot_df = pd.concat(
+        [
+            pd.concat([top_results_df, pd.DataFrame(values, columns=d_cols).assign(label=label)], axis=1)\
+                .melt(id_vars=list(top_results_df.columns) + ['label'], value_vars=d_cols, var_name='d', value_name='sales')
+            for values, d_cols, label in [
+                (evaluator.get_rolled_up_lookback(index), evaluator.lookback_d_cols, 'lookback'),
+                (residuals[index] + groundtruth_values, evaluator.groundtruth_d_cols, 'prediction'),
+                (groundtruth_values, evaluator.groundtruth_d_cols, 'groundtruth'),
+            ]
+        ],
+        ignore_index=True
+    )
+
+    sunburst_df = evaluator.id_df.copy()
+    sunburst_df['sales_usd'] = evaluator.sales_usd_per_id
+
+    sales_explorer = SalesExplorer(sales_df, calendar_df)
+
+    _, _, _, explore_groups, explore_values = sales_explorer.filter_groupby_agg(
+        get_filter_values(sales_explorer, None), 'store_id', 'sum'
+    )
+    pyramid = sales_explorer.get_time_pyramid(explore_values)
+
+    # viewport of a zoom on the second quarter of the history
+    dates = pd.to_datetime(sales_explorer.d_dates)
+    zoom_start, zoom_end = dates[len(dates) // 4], dates[len(dates) // 2]
+
+    benchmarks = dict(
+        get_rollup_matrix=lambda: get_rollup_matrix(sales_df),
+        get_scaling_factors=lambda: get_scaling_factors(sales_df, rollup_matrix, N_VALIDATION_DAYS),
+        get_sales_usd_weights=lambda: get_sales_usd_weights(sales_df, sell_prices_df, calendar_df, rollup_matrix),
+        accuracy_evaluator=lambda: AccuracyEvaluator(sales_df, sell_prices_df, calendar_df),
+        evaluate=lambda: evaluator.evaluate(predictions_df),
+        evaluate_detailed=lambda: evaluator.evaluate_detailed(predictions_df),
+        sales_explorer=lambda: SalesExplorer(sales_df, calendar_df),
+    )
+
+    for name, (filters, groupby_col, agg_function) in EXPLORE_QUERIES.items():
+        benchmarks[f'filter_groupby_agg:{name}'] = (
+            lambda filters=filters, groupby_col=groupby_col, agg_function=agg_function:
+                sales_explorer.filter_groupby_agg(
+                    get_filter_values(sales_explorer, filters), groupby_col, agg_function
+                )
+        )
+
+    benchmarks.update(
+        get_time_pyramid=lambda: sales_explorer.get_time_pyramid(explore_values),
+        query_time_pyramid=lambda: sales_explorer.query_time_pyramid(
+            explore_groups, pyramid, 'store_id', start=zoom_start, end=zoom_end
+        ),
+        plot_time_pyramid=lambda: plot_time_pyramid(
+            sales_explorer, explore_groups, pyramid, 'store_id', start=zoom_start, end=zoom_end
+        ),
+        plot_sunburst=lambda: plot_sunburst(sunburst_df, col='sales_usd'),
+        plot_evaluate_first_col=lambda: plot_evaluate_first_col(results_df),
+        plot_evaluate_second_col=lambda: plot_evaluate_second_col(agg_level, results_df, residuals),
+        plot_evaluate_third_col=lambda: plot_evaluate_third_col(agg_level, to_plot_df, WRMSSE_COL, RMSSE_COL),
+    )
+
+    return benchmarks
+
+def measure(
+    func: Callable,
+    repeat: int
+) -> dict:
+    """
+    Return the best wall time over `repeat` runs, and the peak traced memory of one more run
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return dict(seconds=min(timings), peak_mb=peak / 2**20)
+
+def get_machine() -> dict:
+    return dict(
+        platform=platform.platform(),
+        processor=platform.processor() or platform.machine(),
+        cpu_count=os.cpu_count(),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        pandas=pd.__version__
+    )
+
+def get_baseline_path(scale: float, n_days: int) -> str:
+    return os.path.join(BASELINES_DIR, f'scale-{scale:g}-days-{n_days}.json')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=0.1, help='number of items relative to M5, up to 10')
+    parser.add_argument('--n-days', type=int, default=1913)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs, the best one is reported')
+    parser.add_argument('--only', nargs='*', default=None, help='benchmarks whose name starts with one of these')
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help='relative slowdown flagged as a regression')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help='relative memory increase flagged as a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='store results as the baseline of this scale')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sales_df, sell_prices_df, calendar_df = make_synthetic_m5(scale=args.scale, n_days=args.n_days, seed=args.seed)
+    print(
+        f'Synthetic data: {len(sales_df)} series x {args.n_days} days, {len(sell_prices_df)} prices, '
+        f'{time.perf_counter() - start:.1f}s',
+        file=sys.stderr
+    )
+
+    benchmarks = get_benchmarks(sales_df, sell_prices_df, calendar_df, args.seed)
+    if args.only:
+        benchmarks = {
+            name: func for name, func in benchmarks.items()
+            if any(name.startswith(prefix) for prefix in args.only)
+        }
+
+    baseline_path = get_baseline_path(args.scale, args.n_days)
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        if baseline['machine'] != get_machine():
+            print(f'Baseline measured on another machine: {baseline["machine"]}', file=sys.stderr)
+
+    print('name,seconds,baseline_seconds,peak_mb,baseline_peak_mb,status')
+
+    results = {}
+    n_regressions = 0
+
+    for name, func in benchmarks.items():
+        result = results[name] = measure(func, args.repeat)
+        reference = baseline.get('results', {}).get(name)
+
+        if reference is None:
+            status = 'new'
+            reference = dict(seconds=float('nan'), peak_mb=float('nan'))
+        elif result['seconds'] > reference['seconds'] * (1 + args.time_tolerance):
+            status = 'slower'
+        elif result['peak_mb'] > reference['peak_mb'] * (1 + args.memory_tolerance):
+            status = 'more_memory'
+        else:
+            status = 'ok'
+
+        n_regressions += status in ['slower', 'more_memory']
+
+        print(
+            f"{name},{result['seconds']:.4f},{reference['seconds']:.4f},"
+            f"{result['peak_mb']:.1f},{reference['peak_mb']:.1f},{status}",
+            flush=True
+        )
+
+    if args.save_baseline:
+        # benchmarks that were not run keep their baseline
+        baseline_results = baseline.get('results', {})
+        baseline_results.update(results)
+
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(
+                dict(scale=args.scale, n_days=args.n_days, seed=args.seed, machine=get_machine(), results=baseline_results),
+                f,
+                indent=2
+            )
+        print(f'Saved baseline {baseline_path}', file=sys.stderr)
+    elif n_regressions > 0:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Memory and throughput of the multi-worker deployment, as the number of workers scales from 1 to N.
+
+Runs `gunicorn -c gunicorn.conf.py index:server` for each number of workers, and reports
+    RSS per worker : resident memory, including pages shared with other processes
+    PSS per worker : proportional share of resident memory, i.e. shared pages divided among sharers
+    requests/sec   : throughput of a data-backed Dash callback: scoring uploaded predictions,
+                     which reads the memory-mapped evaluator artifacts at each request
+
+Each concurrent client is a browser session: it uploads predictions once per run,
+then scores them repeatedly through its session token, see `layout.evaluate`.
+Linux only (reads /proc). Data artifacts must have been built beforehand, e.g. by running the app once.
+
+    $ pipenv run python benchmarks/workers.py --max-workers 8
+"""
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SALES_FILEPATH = os.path.join(REPO_DIR, 'data', 'sales_train_validation.csv')
+N_VALIDATION_DAYS = 28
+
+def get_callback_output(url: str, output: str) -> str:
+    """
+    Return the output id of the callback updating `output` (e.g. 'evaluate:score.children'),
+    as expected by `/_dash-update-component`
+    """
+    with urllib.request.urlopen(url + '/_dash-dependencies') as response:
+        dependencies = json.load(response)
+
+    return next(
+        dependency['output'] for dependency in dependencies
+        if output in dependency['output'].strip('.').split('...')
+    )
+
+def post_callback(url: str, payload: dict) -> dict:
+    request = urllib.request.Request(
+        url + '/_dash-update-component',
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+def get_predictions_contents(seed: int=0) -> str:
+    """
+    Return random predictions for all ids of the sales file, as an uploaded CSV file content
+    """
+
+    ids = pd.read_csv(SALES_FILEPATH, usecols=['id'])['id']
+
+    predictions_df = pd.DataFrame(
+        np.random.default_rng(seed).poisson(1., size=(len(ids), N_VALIDATION_DAYS)),
+        columns=[f'F{k + 1}' for k in range(N_VALIDATION_DAYS)]
+    )
+    predictions_df.insert(0, 'id', ids)
+
+    return 'data:text/csv;base64,' + base64.b64encode(predictions_df.to_csv(index=False).encode('utf-8')).decode('ascii')
+
+def get_score_payload(url: str, contents: str) -> dict:
+    """
+    Upload predictions, and return the payload of the callback scoring them from their session token
+    """
+
+    response = post_callback(
+        url,
+        {
+            'output': get_callback_output(url, 'evaluate:predictions.data'),
+            'inputs': [
+                {'id': 'evaluate:upload', 'property': 'contents', 'value': contents},
+                {'id': 'evaluate:mode', 'property': 'value', 'value': 'accuracy'}
+            ],
+            'state': [
+                {'id': 'evaluate:upload', 'property': 'filename', 'value': 'predictions.csv'},
+                {'id': 'evaluate:upload', 'property': 'last_modified', 'value': time.time()},
+                {'id': 'evaluate:predictions', 'property': 'data', 'value': None}
+            ],
+            'changedPropIds': ['evaluate:upload.contents']
+        }
+    )
+    predictions_data = response['response']['evaluate:predictions']['data']
+
+    if 'token' not in predictions_data:
+        raise ValueError(f'Predictions upload failed: {predictions_data}')
+
+    return {
+        'output': get_callback_output(url, 'evaluate:score.children'),
+        'inputs': [
+            {'id': 'evaluate:predictions', 'property': 'data', 'value': predictions_data}
+        ],
+        'changedPropIds': ['evaluate:predictions.data']
+    }
+
+def get_children_pids(pid: int) -> list:
+    with open(f'/proc/{pid}/task/{pid}/children', 'r') as f:
+        return [int(child) for child in f.read().split()]
+
+def get_memory_mb(pid: int) -> dict:
+    """
+    Return Rss and Pss of a process, in MB
+    """
+    ret = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            if key in ['Rss', 'Pss']:
+                ret[key.lower()] = int(value.split()[0]) / 2**10
+    return ret
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float):
+    start = time.time()
+    while time.time() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with code {process.returncode}, run it directly to see its logs')
+        try:
+            with urllib.request.urlopen(url + '/ready') as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f'{url} not ready after {timeout}s')
+
+def measure_throughput(url: str, payloads: list, duration: float) -> float:
+    """
+    Return requests/sec, with one concurrent client per payload
+    """
+
+    def _client(payload):
+        n_requests = 0
+        end = time.time() + duration
+        while time.time() < end:
+            post_callback(url, payload)
+            n_requests += 1
+        return n_requests
+
+    with ThreadPoolExecutor(max_workers=len(payloads)) as executor:
+        n_requests = sum(executor.map(_client, payloads))
+
+    return n_requests / duration
+
+def run(n_workers: int, port: int, contents: str, duration: float, concurrency: int, timeout: float) -> dict:
+
+    url = f'http://127.0.0.1:{port}'
+
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), M5_VIEWER_BIND=f'127.0.0.1:{port}')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'index:server'],
+        cwd=REPO_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    try:
+        wait_ready(url, process, timeout)
+        payloads = [get_score_payload(url, contents) for _ in range(concurrency)]
+        # warm every worker before measuring memory
+        measure_throughput(url, payloads, duration=1)
+
+        workers_memory = [get_memory_mb(pid) for pid in get_children_pids(process.pid)]
+        master_memory = get_memory_mb(process.pid)
+        requests_per_sec = measure_throughput(url, payloads, duration=duration)
+    finally:
+        process.terminate()
+        process.wait()
+
+    return dict(
+        n_workers=n_workers,
+        rss_mb_per_worker=sum(m['rss'] for m in workers_memory) / len(workers_memory),
+        pss_mb_per_worker=sum(m['pss'] for m in workers_memory) / len(workers_memory),
+        pss_mb_total=sum(m['pss'] for m in workers_memory) + master_memory['pss'],
+        requests_per_sec=requests_per_sec
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per run')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients, i.e. browser sessions')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds to wait for readiness')
+    args = parser.parse_args()
+
+    contents = get_predictions_contents()
+
+    print('n_workers,rss_mb_per_worker,pss_mb_per_worker,pss_mb_total,requests_per_sec')
+
+    for n_workers in range(1, args.max_workers + 1):
+        result = run(n_workers, args.port, contents, args.duration, args.concurrency, args.timeout)
+        print('{n_workers},{rss_mb_per_worker:.0f},{pss_mb_per_worker:.0f},{pss_mb_total:.0f},{requests_per_sec:.1f}'.format(**result), flush=True)
+
+if __name__ == '__main__':
+    main()
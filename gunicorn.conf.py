@@ -0,0 +1,17 @@
+# Multi-worker deployment, run with
+#   $ pipenv run gunicorn -c gunicorn.conf.py index:server
+#
+# Data objects are warmed up once, synchronously, in the master process before workers are forked.
+# Their arrays are read-only memory maps: all workers share the same physical pages,
+# so memory does not grow linearly with the number of workers.
+
+import multiprocessing
+import os
+
+# threads do not survive fork: warm up in the master process, before forking
+os.environ['M5_VIEWER_WARMUP_IN_BACKGROUND'] = '0'
+
+bind = os.environ.get('M5_VIEWER_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+preload_app = True
+timeout = 120
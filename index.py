@@ -2,12 +2,15 @@ import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output
 
-from app import app
+from app import app, server, warmup
 from layouts import layout1, layout2
 from layout import about, explore, evaluate
+from layout import warmup as warmup_layout
+from utils.settings import WARMUP_REFRESH_INTERVAL
 
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
+    dcc.Interval(id='warmup:interval', interval=WARMUP_REFRESH_INTERVAL, disabled=True),
     html.Div(
         [
             html.Div(
@@ -30,22 +33,37 @@ app.layout = html.Div([
     html.Div(id='page-content')
 ])
 
-@app.callback(Output('page-content', 'children'),
-            [Input('url', 'pathname')])
-def display_page(pathname):
+def warmup_page() -> tuple:
+    """
+    Warm-up progress, refreshed by `warmup:interval` until ready.
+    The interval is disabled if warm-up failed, and the error is displayed instead
+    """
+    status = warmup.status()
+    return warmup_layout.content(status), status['error'] is not None
+
+@app.callback([Output('page-content', 'children'),
+            Output('warmup:interval', 'disabled')],
+            [Input('url', 'pathname'),
+            Input('warmup:interval', 'n_intervals')])
+def display_page(pathname, n_intervals):
     if pathname == '/about':
-        return about.content()
+        return about.content(), True
     elif pathname == '/explore':
-        return explore.content()
+        if not warmup.ready:
+            return warmup_page()
+        return explore.content(), True
     elif pathname == '/accuracy':
-        return evaluate.content()
+        # both tracks are scored from this page
+        if warmup.accuracy_evaluator is None or warmup.uncertainty_evaluator is None:
+            return warmup_page()
+        return evaluate.content(), True
     else:
         return html.Div(
             html.H4("Start with visiting one the tabs in the above ^"),
             style={
                 'padding':'10px'
             }
-        )
+        ), True
 
 if __name__ == '__main__':
     app.run_server(debug=False)
@@ -1,6 +1,4 @@
 import datetime
-import json
-import re
 from typing import List
 
 import dash
@@ -11,13 +9,29 @@ import dash_table
 import numpy as np
 import pandas as pd
 
-from app import app, accuracy_evaluator
+from app import app, session_store, warmup
+from utils.evaluate import ValidationError
 from utils.plotting import (
     plot_evaluate_first_col,
     plot_evaluate_second_col,
     plot_evaluate_third_col
 )
 from utils.io import parse_contents
+from utils.settings import (
+    BOOTSTRAP_CONFIDENCE,
+    RMSSE_COL,
+    SPL_COL,
+    WRMSSE_COL,
+    WSPL_COL
+)
+
+# competition track -> (weighted score, per-series error) result columns
+MODE_METRIC_COLS = {
+    'accuracy' : (WRMSSE_COL, RMSSE_COL),
+    'uncertainty' : (WSPL_COL, SPL_COL),
+}
+
+UPLOAD_ERROR_MESSAGE = "There was an issue processing your file. Check the format and schema."
 
 UPLOAD_BUTTON_TEXT = [
     'Drag and Drop or ',
@@ -30,6 +44,7 @@ def content() -> html.Div:
     ret = [
         html.Div([
             instructions(),
+            mode_selector(),
             score_display_area(),
         ]),
         file_upload_area(),
@@ -45,7 +60,7 @@ def instructions() -> html.Div:
     ret = html.Div(
         [
             html.H4('Instructions'),
-            "Visualize errors on the 'Accuracy' competition. ",
+            "Visualize errors on the 'Accuracy' or 'Uncertainty' competition. ",
             "The validation period corresponds to the last 28 days of the training set. ",
             "To begin, upload your predictions over that horizon, in the format specified by the competition."  
         ],
@@ -54,6 +69,23 @@ def instructions() -> html.Div:
 
     return ret
 
+def mode_selector() -> html.Div:
+
+    ret = html.Div(
+        dcc.RadioItems(
+            id='evaluate:mode',
+            options=[
+                {'label' : 'Accuracy (WRMSSE)', 'value' : 'accuracy'},
+                {'label' : 'Uncertainty (WSPL)', 'value' : 'uncertainty'},
+            ],
+            value='accuracy',
+            labelStyle={'display' : 'inline-block'}
+        ),
+        className='instructions-evaluate'
+    )
+
+    return ret
+
 
 def file_upload_area() -> html.Div:
 
@@ -73,13 +105,9 @@ def hidden_uploaded_data_area() -> html.Div:
 
     ret = html.Div(
         children=[
-            html.Div(
-                children=[
-                    dash_table.DataTable(
-                        id='evaluate:predictions'
-                        )
-                    ],
-                hidden=True
+            # token of the predictions stored server-side, see `utils.session.SessionStore`
+            dcc.Store(
+                id='evaluate:predictions'
             ),
                 
             html.Div(
@@ -90,10 +118,6 @@ def hidden_uploaded_data_area() -> html.Div:
                     ],
                 hidden=True
             ),
-            html.Div(
-                id='evaluate:residuals',
-                hidden=True
-            ),
         ],
         hidden=True
     )
@@ -103,7 +127,7 @@ def hidden_uploaded_data_area() -> html.Div:
 def score_display_area() -> html.Div:
 
     ret = html.Div([
-        html.H6('WRMSSE:'),
+        html.H6('WRMSSE:', id='evaluate:score_label'),
         html.Div(
             'N/A',
             id='evaluate:score',
@@ -118,7 +142,7 @@ def score_display_area() -> html.Div:
 def upload_error_message() -> html.Div:
 
     ret = html.Div(
-        "There was an issue processing your file. Check the format and schema.",
+        UPLOAD_ERROR_MESSAGE,
         style={
             'display' : 'hidden',
         },
@@ -128,6 +152,16 @@ def upload_error_message() -> html.Div:
 
     return ret
 
+def upload_error_children(errors: List[str]) -> list:
+    """
+    Generic error message, followed by the schema validation errors, if any
+    """
+
+    if len(errors) == 0:
+        return UPLOAD_ERROR_MESSAGE
+
+    return [UPLOAD_ERROR_MESSAGE, html.Ul([html.Li(error) for error in errors])]
+
 def report_display_area() -> html.Div:
 
     first_column = html.Div(
@@ -200,15 +234,17 @@ def report_display_area() -> html.Div:
         Output('evaluate:predictions', 'data'),
     ],
     [
-        Input('evaluate:upload', 'contents')
+        Input('evaluate:upload', 'contents'),
+        Input('evaluate:mode', 'value'),
     ],
     [
         State('evaluate:upload', 'filename'),
         State('evaluate:upload', 'last_modified'),
+        State('evaluate:predictions', 'data'),
     ]
 )
-def receive_prediction_file(content, filename, last_modified):
-    empty_response = (UPLOAD_BUTTON_TEXT, []) 
+def receive_prediction_file(content, mode, filename, last_modified, previous_data):
+    empty_response = (UPLOAD_BUTTON_TEXT, None) 
     
     if content is not None:
 
@@ -221,17 +257,37 @@ def receive_prediction_file(content, filename, last_modified):
             f' - Uploaded {filename} (last modified: {datetime.datetime.fromtimestamp(last_modified)})'
             ]
 
-        data = df.to_dict('records')
+        # predictions are kept server-side, aligned with the evaluator ids.
+        # Only their token is sent to the browser
+        try:
+            if mode == 'uncertainty':
+                pred_values = warmup.uncertainty_evaluator.align_values(df)
+            else:
+                pred_values = warmup.accuracy_evaluator.align_values(
+                    df,
+                    n_value_columns=warmup.accuracy_evaluator.n_validation_days
+                )
+        except ValidationError as e:
+            return upload_button_children, {'errors' : e.report['errors']}
+        except Exception:
+            return upload_button_children, {'errors' : []}
+
+        # a re-upload is scored incrementally from the previous one, see `eval_predictions`
+        token = session_store.create(
+            dict(predictions=pred_values),
+            dict(filename=filename, mode=mode, previous_token=(previous_data or {}).get('token'))
+        )
 
-        return upload_button_children, data
+        return upload_button_children, {'token' : token}
     
     return empty_response
 
 
 @app.callback([
+        Output('evaluate:score_label', 'children'),
         Output('evaluate:score', 'children'),
         Output('evaluate:results', 'data'),
-        Output('evaluate:residuals', 'children'),
+        Output('evaluate:upload_error_message', 'children'),
         Output('evaluate:upload_error_message', 'style'),
         Output('evaluate:report', 'style'),
     ],
@@ -240,19 +296,104 @@ def receive_prediction_file(content, filename, last_modified):
     ]
 )
 def eval_predictions(data):
+    default_label = 'WRMSSE:'
+
     if data is not None and len(data) > 0:
-        predictions_df = pd.DataFrame.from_records(data)
+
+        if 'errors' in data:
+            return default_label, 'N/A', [], upload_error_children(data['errors']), {'display' : 'block'}, {'display' : 'none'}
+
+        token = data.get('token')
+        session = session_store.get(token)
+
+        if session is None:
+            return default_label, 'N/A', [], UPLOAD_ERROR_MESSAGE, {'display' : 'block'}, {'display' : 'none'}
+
+        arrays, metadata = session
+        score_col, error_col = MODE_METRIC_COLS[metadata.get('mode', 'accuracy')]
 
         try:
-            wrmsse, residuals, results = accuracy_evaluator.evaluate_detailed(
-                predictions_df
-            )
+            score, residuals, results = score_session(arrays, metadata)
         except Exception:
-            return 'N/A', [], [], {'display' : 'block'}, {'display' : 'none'}
+            return default_label, 'N/A', [], UPLOAD_ERROR_MESSAGE, {'display' : 'block'}, {'display' : 'none'}
+
+        # residuals stay server-side, and are sliced per aggregation level on click
+        session_store.update(token, {'residuals' : residuals, error_col : results[error_col].values})
+
+        if metadata.get('mode') != 'uncertainty':
+            interval = warmup.accuracy_evaluator.bootstrap(residuals)
+            score = score_with_interval_children(score, interval)
 
-        return wrmsse, results.to_dict('records'), json.dumps(residuals.tolist()), {'display' : 'none'}, {'display' : 'block'}
+        return f'{score_col.upper()}:', score, results.to_dict('records'), UPLOAD_ERROR_MESSAGE, {'display' : 'none'}, {'display' : 'block'}
     
-    return 'N/A', [], [], {'display' : 'none'}, {'display' : 'none'}
+    return default_label, 'N/A', [], UPLOAD_ERROR_MESSAGE, {'display' : 'none'}, {'display' : 'none'}
+
+
+def score_with_interval_children(
+    score: float,
+    interval: dict
+) -> list:
+    """
+    Point score followed by its bootstrap confidence interval, see `AccuracyEvaluator.bootstrap`
+    """
+
+    return [
+        f"{score:.4f}",
+        html.Span(
+            f" ({BOOTSTRAP_CONFIDENCE:.0%} CI: {interval['low']:.4f} - {interval['high']:.4f})",
+            className='score-interval'
+        )
+    ]
+
+
+def score_session(
+    arrays: dict,
+    metadata: dict
+) -> tuple:
+    """
+    Score the predictions of a session, on the accuracy or uncertainty track.
+    On the accuracy track, if the previous upload of the same browser session was scored,
+    only the aggregated time series of ids whose predictions changed are re-scored.
+    """
+
+    if metadata.get('mode') == 'uncertainty':
+        return warmup.uncertainty_evaluator.evaluate_detailed_from_values(arrays['predictions'])
+
+    accuracy_evaluator = warmup.accuracy_evaluator
+    pred_values = arrays['predictions']
+
+    previous_session = session_store.get(metadata.get('previous_token'))
+
+    # only accuracy track sessions store RMSSE
+    if previous_session is not None and RMSSE_COL in previous_session[0]:
+        previous_arrays, _ = previous_session
+
+        rows = np.flatnonzero(
+            (pred_values != previous_arrays['predictions']).any(axis=1)
+        )
+
+        wrmsse, residuals, results = accuracy_evaluator.evaluate_detailed_delta(
+            previous_arrays['residuals'],
+            previous_arrays[RMSSE_COL],
+            rows,
+            previous_arrays['predictions'][rows],
+            pred_values[rows]
+        )
+
+        return wrmsse, residuals, results
+
+    return accuracy_evaluator.evaluate_detailed_from_values(pred_values)
+
+
+def get_metric_cols(results_df: pd.DataFrame) -> tuple:
+    """
+    Weighted score and per-series error columns of accuracy or uncertainty results
+    """
+
+    if WSPL_COL in results_df.columns:
+        return MODE_METRIC_COLS['uncertainty']
+
+    return MODE_METRIC_COLS['accuracy']
 
 
 @app.callback([
@@ -268,7 +409,7 @@ def render_fa_first_col(data):
     if data is not None and len(data) > 0:
         results_df = pd.DataFrame.from_records(data)
 
-        return plot_evaluate_first_col(results_df)
+        return plot_evaluate_first_col(results_df, *get_metric_cols(results_df))
     
     return {}, {}, {}
 
@@ -303,10 +444,10 @@ def relayout_clicked_agg_level(clickData1, clickData2, clickData3):
     ],
     [
         State('evaluate:results', 'data'),
-        State('evaluate:residuals', 'children')
+        State('evaluate:predictions', 'data')
     ]
 )
-def render_fa_second_col(agg_level, results_data, residuals_json):
+def render_fa_second_col(agg_level, results_data, predictions_data):
     if (agg_level is not None and len(agg_level) > 0):
 
         #
@@ -315,9 +456,12 @@ def render_fa_second_col(agg_level, results_data, residuals_json):
 
         results_df = pd.DataFrame.from_records(results_data)
         
-        residuals_nd = np.array(
-            json.loads(residuals_json)
-            )
+        session = session_store.get((predictions_data or {}).get('token'))
+
+        if session is None or 'residuals' not in session[0]:
+            return {}, {}, {'display': 'none'}
+
+        residuals_nd = session[0]['residuals']
 
         #
         # 2. filter
@@ -325,13 +469,15 @@ def render_fa_second_col(agg_level, results_data, residuals_json):
 
         results_df = results_df.loc[results_df["agg_level"]==agg_level]
 
-        agg_level_ids = accuracy_evaluator.agg_level_ids
+        agg_level_ids = warmup.accuracy_evaluator.agg_level_ids
         index = agg_level_ids.loc[agg_level_ids["agg_level"]==agg_level]\
             .reset_index()['index'].values
 
         residuals = residuals_nd[index, :].reshape(-1) # filtered residuals
 
-        return plot_evaluate_second_col(agg_level, results_df, residuals) + ({'display': 'block'}, )
+        score_col, _ = get_metric_cols(results_df)
+
+        return plot_evaluate_second_col(agg_level, results_df, residuals, score_col) + ({'display': 'block'}, )
     
     return {}, {}, {'display': 'none'}
 
@@ -358,39 +504,42 @@ def render_fa_third_col(agg_level, results_data, predictions_data):
 
         results_df = pd.DataFrame.from_records(results_data)
         
-        predictions_df = pd.DataFrame.from_records(predictions_data) 
-        groundtruth_df = accuracy_evaluator.groundtruth_df
-        lookback_df = accuracy_evaluator.lookback_df
+        session = session_store.get((predictions_data or {}).get('token'))
 
-        predictions_values, groundtruth_values, lookback_values = [
-            accuracy_evaluator.get_rolled_up_values(df) 
-                for df in [predictions_df, groundtruth_df, lookback_df]
-                ]
+        if session is None or 'residuals' not in session[0]:
+            return {}, {'display': 'none'}
+
+        arrays, _ = session
+
+        accuracy_evaluator = warmup.accuracy_evaluator
 
         #
         # 2. filter
         #
 
-        agg_level_ids_df = accuracy_evaluator.agg_level_ids
+        agg_level_ids_df = accuracy_evaluator.agg_level_ids.reset_index()
+        agg_level_ids_df = agg_level_ids_df.loc[agg_level_ids_df["agg_level"]==agg_level]
 
         # to keep
-        results_df = results_df.loc[results_df["agg_level"]==agg_level].nlargest(n=10, columns=['wrmsse']).reset_index(drop=True)
+        score_col, error_col = get_metric_cols(results_df)
+        results_df = results_df.loc[results_df["agg_level"]==agg_level].nlargest(n=10, columns=[score_col]).reset_index(drop=True)
 
-        agg_level_ids_to_plot = results_df['agg_level_id']        
-        index = agg_level_ids_df.loc[agg_level_ids_df["agg_level_id"].isin(agg_level_ids_to_plot)]\
-            .reset_index()['index'].values
+        # rows of the aggregated time series to plot, in the order of results_df
+        index = results_df[['agg_level_id']]\
+            .merge(agg_level_ids_df, on='agg_level_id', how='left')['index'].values
 
         # to keep
-        predictions_values, groundtruth_values, lookback_values = [
-            values[index, :] for values in [predictions_values, groundtruth_values, lookback_values]
-        ]
+        groundtruth_values = accuracy_evaluator.get_rolled_up_groundtruth(index)
+        lookback_values = accuracy_evaluator.get_rolled_up_lookback(index)
+        # residuals are rolled-up predictions (median on the uncertainty track) minus rolled-up groundtruth
+        predictions_values = arrays['residuals'][index, :] + groundtruth_values
 
         #
         # 3. reshape and melt in one dataframe
         #
 
-        d_cols_lookback = [col for col in lookback_df.columns if re.match(r'd_[0-9]+', col)]
-        d_cols_groundtruth = [col for col in groundtruth_df.columns if re.match(r'd_[0-9]+', col)]  
+        d_cols_lookback = accuracy_evaluator.lookback_d_cols
+        d_cols_groundtruth = accuracy_evaluator.groundtruth_d_cols
         d_cols_predictions = d_cols_groundtruth
         
         dfs = []
@@ -428,7 +577,7 @@ def render_fa_third_col(agg_level, results_data, predictions_data):
         
         to_plot_df = pd.concat(dfs, axis=0, ignore_index=True)
 
-        fig = plot_evaluate_third_col(agg_level, to_plot_df)
+        fig = plot_evaluate_third_col(agg_level, to_plot_df, score_col, error_col)
         return (fig, {'display': 'block'})
     
     return {}, {'display': 'none'}
\ No newline at end of file
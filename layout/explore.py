@@ -1,14 +1,24 @@
+import json
 import re
-from typing import List
+from typing import Dict, List, Tuple
 
-from dash.dependencies import Input, Output
+import dash
+from dash.dependencies import ALL, Input, Output, State
 import dash_core_components as dcc
 import dash_html_components as html
+import numpy as np
+import pandas as pd
 import plotly.express as px
 
-from app import app, accuracy_evaluator, sales_explorer
-from utils.plotting import plot_sunburst, plot_samples
-from utils.settings import AGG_FUNCTIONS
+from app import app, explore_cache, warmup
+from utils.artifacts import cache_key
+from utils.explore import SalesExplorer
+from utils.plotting import plot_sunburst, plot_time_pyramid
+from utils.settings import AGG_FUNCTIONS, EXPLORE_MAX_POINTS, EXPLORE_SAMPLING_SEED
+
+# x axis range keys of relayoutData, for any facet of the samples graph
+X_RANGE_PATTERN = re.compile(r'xaxis[0-9]*\.range(\[[01]\])?')
+X_AUTORANGE_PATTERN = re.compile(r'xaxis[0-9]*\.autorange')
 
 def content() -> html.Div:
 
@@ -102,8 +112,8 @@ def explore_sample_plots_tab(
         "Explore > Sales Repartition" tab content Div    
     """
 
-    group_by_cols = sales_explorer.id_cols
-    filters = sales_explorer.filter_possible_values_dict
+    group_by_cols = warmup.sales_explorer.id_cols
+    filters = warmup.sales_explorer.filter_possible_values_dict
 
     def _filter_by_div():
         ret = html.Div(
@@ -118,7 +128,7 @@ def explore_sample_plots_tab(
                             ],
                             value=[],
                             multi=True,
-                            id='filter-{}'.format(f['name'])
+                            id={'type': 'explore:filter', 'name': f['name']}
                         )
                     ]
                 )
@@ -231,7 +241,9 @@ def explore_sample_plots_tab(
                             id="samples_graph",
                             figure={}
                         )
-                    )
+                    ),
+                    # cache key of the current query, whose time pyramid is kept server-side, and the plotted date range
+                    dcc.Store(id='explore:pyramid')
                 ],
                 id='explore-graphs',
                 className='nine columns'
@@ -257,8 +269,8 @@ def render_explore_content(tab):
 
     sales_col = 'sales_usd'
 
-    df = accuracy_evaluator.sales_df
-    df[sales_col] = accuracy_evaluator.sales_usd_per_id 
+    df = warmup.accuracy_evaluator.id_df.copy()
+    df[sales_col] = warmup.accuracy_evaluator.sales_usd_per_id 
 
     fig_1 = plot_sunburst(
         df,
@@ -279,26 +291,188 @@ def render_explore_content(tab):
     elif tab == 'sales_repartition':
         return {'display' : 'none'}, {'display' : 'block'},  fig_1, fig_2
     
+def get_x_range(relayout_data: dict) -> Tuple:
+    """
+    Return the date range set by a zoom, a pan or the range slider, `(None, None)` on autorange,
+    or None if `relayout_data` does not change the x axis
+
+    Parameters
+    ----------
+    relayout_data : dict
+        samples graph relayoutData, e.g. `{'xaxis.range[0]': '2012-01-01', 'xaxis.range[1]': '2012-06-30'}`
+
+    Returns
+    -------
+    Tuple
+        start and end dates, as strings
+    """
+
+    start, end = None, None
+
+    for key, value in (relayout_data or {}).items():
+        if X_AUTORANGE_PATTERN.fullmatch(key):
+            return None, None
+        if X_RANGE_PATTERN.fullmatch(key):
+            if key.endswith('[0]'):
+                start = value
+            elif key.endswith('[1]'):
+                end = value
+            else:
+                start, end = value
+
+    if start is None or end is None:
+        return None
+
+    return start, end
+
+def get_query_key(
+    sales_explorer: SalesExplorer,
+    group_by: str,
+    aggregate: str,
+    filter_values: List[List[str]]
+) -> str:
+    """
+    Return the cache key of an explore query: a hash of the canonical query (filters by name, with sorted values,
+    empty filters left out), of the explorer artifacts and of the settings the results depend on
+
+    Parameters
+    ----------
+    sales_explorer : SalesExplorer
+        explorer, see `SalesExplorer.artifacts_key`
+    group_by : str
+        id column to perform grouping on
+    aggregate : str
+        aggregation operation to perform
+    filter_values : List[List[str]]
+        List of permitted values per identifier column,
+        in the order of sales_explorer.filter_possible_values_dict
+
+    Returns
+    -------
+    str
+        cache key
+    """
+
+    filters = {
+        f['name'] : sorted(values)
+        for f, values in zip(sales_explorer.filter_possible_values_dict, filter_values)
+        if values
+    }
+
+    return cache_key(
+        component='explore_query',
+        artifacts=sales_explorer.artifacts_key,
+        filters=filters,
+        group_by=group_by,
+        aggregate=aggregate,
+        sampling_frequencies=[sf['name'] for sf in sales_explorer.SAMPLING_FREQUENCIES],
+        max_points=EXPLORE_MAX_POINTS,
+        seed=EXPLORE_SAMPLING_SEED
+    )
+
+def compute_query(
+    sales_explorer: SalesExplorer,
+    group_by: str,
+    aggregate: str,
+    filter_values: List[List[str]],
+    uirevision: str=None
+) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    Return the arrays and metadata cached for an explore query, see `get_query_key`:
+    the time pyramid of the aggregated sales with the plotted groups, the figure json as bytes,
+    and the row and group counts
+    """
+
+    id_count, id_count_after_filtering, n_agg_time_series, groups, values = sales_explorer.filter_groupby_agg(
+        [values or [] for values in filter_values],
+        group_by,
+        aggregate
+    )
+
+    pyramid = sales_explorer.get_time_pyramid(values)
+
+    fig = plot_time_pyramid(sales_explorer, groups, pyramid, group_by, uirevision=uirevision)
+
+    arrays = dict(
+        pyramid,
+        groups=groups,
+        figure=np.frombuffer(fig.to_json().encode('utf-8'), dtype=np.uint8)
+    )
+    metadata = dict(
+        groupby_col=group_by,
+        id_count=int(id_count),
+        id_count_after_filtering=int(id_count_after_filtering),
+        n_agg_time_series=int(n_agg_time_series)
+    )
+
+    return arrays, metadata
+
 @app.callback([
         Output('total_count', 'children'),
         Output('considered_count', 'children'),
         Output('agg_count', 'children'),
         Output('samples_graph', 'figure'),
+        Output('explore:pyramid', 'data'),
     ],
     [
         Input('group_by', 'value'),
         Input('aggregate', 'value'),
-    ] +
+        # filters are in the order of sales_explorer.filter_possible_values_dict,
+        # which is only known once the sales explorer is ready
+        Input({'type': 'explore:filter', 'name': ALL}, 'value'),
+        Input('samples_graph', 'relayoutData'),
+    ],
     [
-        Input('filter-{}'.format(f['name']), 'value')
-        for f in sales_explorer.filter_possible_values_dict
+        State('explore:pyramid', 'data')
     ]
 )
-def plot(group_by, aggregate, *filter_values):
-    
-    return plot_samples(
-        sales_explorer,
-        group_by, 
-        aggregate, 
-        *filter_values
+def plot(group_by, aggregate, filter_values, relayout_data, pyramid_data):
+
+    sales_explorer = warmup.sales_explorer
+    pyramid_data = pyramid_data or {}
+
+    triggered = [elt['prop_id'] for elt in dash.callback_context.triggered]
+
+    #
+    # 1. viewport change: re-query the visible date range from the cached time pyramid
+    #
+
+    if triggered == ['samples_graph.relayoutData']:
+
+        x_range = get_x_range(relayout_data)
+        session = explore_cache.get(pyramid_data.get('token'))
+
+        if x_range is None or session is None or list(x_range) == pyramid_data.get('x_range'):
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+        arrays, metadata = session
+        start, end = (pd.Timestamp(elt) if elt is not None else None for elt in x_range)
+
+        fig = plot_time_pyramid(
+            sales_explorer,
+            arrays['groups'],
+            arrays,
+            metadata['groupby_col'],
+            start=start,
+            end=end,
+            uirevision=pyramid_data['uirevision']
         )
+
+        return dash.no_update, dash.no_update, dash.no_update, fig, dict(pyramid_data, x_range=list(x_range))
+
+    #
+    # 2. new query: served from the explore cache, computed on miss
+    #
+
+    key = get_query_key(sales_explorer, group_by, aggregate, filter_values)
+
+    arrays, metadata = explore_cache.get_or_compute(
+        key,
+        lambda: compute_query(sales_explorer, group_by, aggregate, filter_values, uirevision=key)
+    )
+
+    fig = json.loads(bytes(arrays['figure']))
+
+    # the key identifies the query: zoom and legend state are kept while browsing it, and reset by a new one
+    return metadata['id_count'], metadata['id_count_after_filtering'], metadata['n_agg_time_series'], fig, \
+        dict(token=key, uirevision=key, x_range=None)
@@ -0,0 +1,53 @@
+import dash_html_components as html
+
+CLASSNAME = 'instructions'
+
+def content(status: dict) -> html.Div:
+    """
+    Return Div displayed while data objects are warming up
+
+    Parameters
+    ----------
+    status : dict
+        warm-up status, see `utils.warmup.Warmup.status`
+
+    Returns
+    -------
+    html.Div
+        "Warming up" content Div, or the warm-up error
+    """
+
+    if status['error'] is not None:
+        # warm-up is not retried: the page is not refreshed anymore
+        return html.Div(
+            [
+                html.H4('Warm-up failed'),
+                "Data objects could not be prepared, see the server logs. ",
+                "The 'About' tab is still available.",
+                html.P(status['error'])
+            ],
+            className=CLASSNAME
+        )
+
+    if status['current_phase'] is not None:
+        current = f"Current step: {status['current_phase']}"
+    else:
+        current = ''
+
+    ret = html.Div(
+        [
+            html.H4('Warming up...'),
+            "Data objects are being prepared, this page will refresh once they are ready. ",
+            "The 'About' tab is available in the meantime.",
+            html.P(current),
+            html.Ul(
+                [
+                    html.Li(f"{phase['name']}: {phase['seconds']:.1f}s")
+                    for phase in status['phases']
+                ]
+            )
+        ],
+        className=CLASSNAME
+    )
+
+    return ret
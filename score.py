@@ -0,0 +1,63 @@
+"""
+Score submission files against the last days of the train set, without the Dash app.
+
+Files (CSV or Parquet, in the competition format) and directories of files are scored in a process pool.
+One result per file is streamed to stdout as soon as it is available, as CSV or JSON lines,
+with the WRMSSE, its contribution per aggregation level and wall times.
+
+Evaluator artifacts are built on first run if needed (see `utils.warmup`), then loaded once per worker
+as read-only memory maps.
+
+    $ pipenv run python score.py submissions/ --workers 4 --format jsonl > scores.jsonl
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+from utils.scoring import iter_scores, list_submission_files
+from utils.settings import ACCURACY_EVALUATOR_DIR, AGGREGATION_LEVEL_NAMES
+from utils.warmup import warmup_accuracy_evaluator
+
+CSV_FIELDNAMES = ['path', 'status', 'wrmsse'] + AGGREGATION_LEVEL_NAMES + ['read_seconds', 'score_seconds', 'error']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='submission files or directories')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    args = parser.parse_args()
+
+    paths = list_submission_files(args.paths)
+
+    # warm-up logs go to stderr, stdout only carries results
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        warmup_accuracy_evaluator(ACCURACY_EVALUATOR_DIR)
+    print(f'Evaluator ready: {time.perf_counter() - start:.2f}s', file=sys.stderr)
+
+    if args.format == 'csv':
+        writer = csv.DictWriter(sys.stdout, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+
+    start = time.perf_counter()
+    n_failed = 0
+
+    for result in iter_scores(paths, n_workers=min(args.workers, max(len(paths), 1))):
+        if args.format == 'csv':
+            writer.writerow(result)
+        else:
+            print(json.dumps(result))
+        sys.stdout.flush()
+
+        n_failed += result['status'] != 'ok'
+
+    print(f'Scored {len(paths)} files in {time.perf_counter() - start:.2f}s, {n_failed} failed', file=sys.stderr)
+
+    sys.exit(1 if n_failed > 0 else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from utils.evaluate import AccuracyEvaluator
+from utils.explore import SalesExplorer
+from utils.synthetic import make_synthetic_m5
+
+@pytest.fixture(scope='session')
+def synthetic_m5():
+    """
+    Small synthetic sales, sell prices and calendar dataframes, see `utils.synthetic.make_synthetic_m5`
+    """
+    return make_synthetic_m5(scale=0.01, seed=0)
+
+@pytest.fixture(scope='session')
+def accuracy_evaluator(synthetic_m5):
+    """
+    Double precision AccuracyEvaluator of the synthetic data
+    """
+    return AccuracyEvaluator(*synthetic_m5, precision='double')
+
+@pytest.fixture(scope='session', params=['double', 'single'])
+def precision_evaluator(request, synthetic_m5):
+    """
+    AccuracyEvaluator of the synthetic data, in each precision
+    """
+    return AccuracyEvaluator(*synthetic_m5, precision=request.param)
+
+@pytest.fixture(scope='session')
+def sales_explorer(synthetic_m5):
+    """
+    SalesExplorer of the synthetic data
+    """
+    sales_df, _, calendar_df = synthetic_m5
+    return SalesExplorer(sales_df, calendar_df)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from utils.backtest import BacktestEvaluator
+from utils.evaluate import AccuracyEvaluator
+
+FOLD_ATTRIBUTES = [
+    'scaling_factors',
+    'sales_usd',
+    'sales_usd_weights',
+    'groundtruth_values',
+    'rolled_up_groundtruth_values',
+    'rolled_up_lookback_values',
+]
+
+@pytest.fixture(scope='module')
+def backtest_evaluator(synthetic_m5):
+    return BacktestEvaluator(*synthetic_m5, chunk_size=7, precision='double')
+
+@pytest.fixture(scope='module')
+def cutoff_evaluators(synthetic_m5, backtest_evaluator):
+    """
+    One AccuracyEvaluator per fold, on sales truncated after the fold validation period
+    """
+    sales_df, sell_prices_df, calendar_df = synthetic_m5
+    d_cols = [col for col in sales_df.columns if col.startswith('d_')]
+
+    return [
+        AccuracyEvaluator(
+            sales_df.drop(columns=d_cols[cutoff + backtest_evaluator.horizon:]),
+            sell_prices_df,
+            calendar_df,
+            n_validation_days=backtest_evaluator.horizon,
+            precision='double'
+        )
+        for cutoff in backtest_evaluator.cutoffs
+    ]
+
+def test_folds_match_cutoff_evaluators(backtest_evaluator, cutoff_evaluators):
+    for fold, evaluator in zip(backtest_evaluator.folds, cutoff_evaluators):
+        for attribute in FOLD_ATTRIBUTES:
+            np.testing.assert_allclose(
+                getattr(fold, attribute),
+                getattr(evaluator, attribute),
+                rtol=1e-10,
+                err_msg=attribute
+            )
+
+def test_evaluate_matches_cutoff_evaluators(backtest_evaluator, cutoff_evaluators):
+    rng = np.random.default_rng(0)
+
+    predictions_dfs = []
+    for evaluator in cutoff_evaluators:
+        predictions_df = evaluator.groundtruth_df
+        predictions_df.columns = ['id'] + [f'F{k + 1}' for k in range(evaluator.n_validation_days)]
+        predictions_df[predictions_df.columns[1:]] = np.maximum(
+            evaluator.groundtruth_values + rng.normal(0, 1, evaluator.groundtruth_values.shape),
+            0
+        )
+        predictions_dfs.append(predictions_df)
+
+    wrmsse, results_df = backtest_evaluator.evaluate(predictions_dfs)
+
+    expected = [evaluator.evaluate(df) for evaluator, df in zip(cutoff_evaluators, predictions_dfs)]
+
+    np.testing.assert_allclose(results_df['wrmsse'].values, expected, rtol=1e-10)
+    assert wrmsse == pytest.approx(np.mean(expected), rel=1e-10)
@@ -0,0 +1,352 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.evaluate import (
+    AccuracyEvaluator,
+    ValidationError,
+    align_to_ids,
+    get_rollup_matrix,
+    get_scaling_factors,
+    get_scaling_factors_from_values,
+    roll_up
+)
+from utils.settings import N_VALIDATION_DAYS, SINGLE_PRECISION_RTOL
+
+def get_scaling_factors_baseline(sales_values_agg: np.array) -> np.array:
+    """
+    Scaling factors as computed before the masked lag-1 diff kernel: days before the sales start
+    are flagged with a dense `diag(1 / (start + 1)) x day number` product, and set to NaN
+    """
+
+    n_days = sales_values_agg.shape[1]
+
+    start_index_per_ts = np.argmax(sales_values_agg > 0, axis=1)
+
+    flag = np.dot(
+        np.diag(1 / (start_index_per_ts + 1)),
+        np.tile(
+            np.arange(1, n_days + 1),
+            (sales_values_agg.shape[0], 1)
+            )
+        ) < 1
+    sales_values_agg = np.where(flag, np.nan, sales_values_agg)
+
+    return np.nansum(
+        np.diff(sales_values_agg, axis=1)**2,
+        axis=1
+        ) / (n_days - 1 - start_index_per_ts)
+
+def float_mask_is_exact(start_index_per_ts: np.array) -> np.array:
+    """
+    True where the baseline flag is exact, i.e. `(start + 1) * (1 / (start + 1))` does not round below 1.
+    Otherwise (e.g. start = 48), the baseline also flags the first sales day, and drops its diff
+    """
+    return (start_index_per_ts + 1) * (1 / (start_index_per_ts + 1)) >= 1
+
+def get_sales_values_agg(synthetic_m5) -> np.array:
+    sales_df, _, _ = synthetic_m5
+    _, _, _, rollup_matrix = get_rollup_matrix(sales_df)
+    d_cols = [col for col in sales_df.columns if col.startswith('d_')][:-N_VALIDATION_DAYS]
+    return roll_up(rollup_matrix, sales_df[d_cols].values)
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7])
+def test_scaling_factors_match_baseline(chunk_size):
+    # sales starting at integer day indices where the baseline flag is exact
+    rng = np.random.default_rng(0)
+    start_index_per_ts = np.array([0, 1, 2, 5, 30, 47, 49, 50, 99, 150])
+    assert float_mask_is_exact(start_index_per_ts).all()
+
+    n_days = 200
+    sales_values_agg = rng.poisson(3, size=(len(start_index_per_ts), n_days))
+    sales_values_agg[:, 0] = 0
+    sales_values_agg[np.arange(n_days)[None, :] < start_index_per_ts[:, None]] = 0
+    sales_values_agg[np.arange(len(start_index_per_ts)), start_index_per_ts] = 1
+
+    np.testing.assert_allclose(
+        get_scaling_factors_from_values(sales_values_agg, chunk_size=chunk_size),
+        get_scaling_factors_baseline(sales_values_agg),
+        rtol=1e-12
+    )
+
+def test_scaling_factors_match_baseline_on_synthetic_data(synthetic_m5):
+    sales_values_agg = get_sales_values_agg(synthetic_m5)
+    start_index_per_ts = np.argmax(sales_values_agg > 0, axis=1)
+    exact = float_mask_is_exact(start_index_per_ts)
+
+    np.testing.assert_allclose(
+        get_scaling_factors_from_values(sales_values_agg)[exact],
+        get_scaling_factors_baseline(sales_values_agg)[exact],
+        rtol=1e-12
+    )
+
+def test_scaling_factors_count_first_diff_where_float_mask_misfires():
+    # 49 * (1 / 49) < 1: the baseline flags day 48, the first sales day, and drops the diff to day 49
+    start = 48
+    assert not float_mask_is_exact(np.array([start])).any()
+
+    sales_values_agg = np.zeros((1, 100))
+    sales_values_agg[0, start:] = np.arange(100 - start) % 3 + 1
+
+    diffs = np.diff(sales_values_agg[0, start:])
+    expected = np.sum(diffs**2) / len(diffs)
+
+    np.testing.assert_allclose(get_scaling_factors_from_values(sales_values_agg), [expected], rtol=1e-12)
+    np.testing.assert_allclose(
+        get_scaling_factors_baseline(sales_values_agg),
+        [(np.sum(diffs**2) - diffs[0]**2) / len(diffs)],
+        rtol=1e-12
+    )
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 50])
+def test_scaling_factors_chunks(synthetic_m5, chunk_size):
+    sales_df, _, _ = synthetic_m5
+    _, _, _, rollup_matrix = get_rollup_matrix(sales_df)
+
+    np.testing.assert_array_equal(
+        get_scaling_factors(sales_df, rollup_matrix, chunk_size=chunk_size),
+        get_scaling_factors_from_values(get_sales_values_agg(synthetic_m5))
+    )
+
+@pytest.mark.parametrize('shape', [
+    lambda n_ids, n_days: (n_ids, n_days),
+    lambda n_ids, n_days: (2, n_ids - 1, n_days),
+    lambda n_ids, n_days: (2, n_ids, n_days + 1),
+    # same number of values as 2 submissions
+    lambda n_ids, n_days: (1, 2 * n_ids, n_days),
+])
+def test_evaluate_many_rejects_wrong_shapes(accuracy_evaluator, shape):
+    pred_values = np.zeros(shape(len(accuracy_evaluator.ids), accuracy_evaluator.n_validation_days))
+
+    with pytest.raises(ValueError, match='n_validation_days'):
+        accuracy_evaluator.evaluate_many(pred_values)
+
+def test_rollup_matrix_cast_is_cached(precision_evaluator):
+    evaluator = precision_evaluator
+    rollup_matrix = evaluator.get_rollup_matrix_as(evaluator.float_dtype)
+
+    assert evaluator.get_rollup_matrix_as(evaluator.float_dtype) is rollup_matrix
+    assert rollup_matrix.dtype == evaluator.float_dtype
+    # compact data is kept, indices are shared
+    assert evaluator.rollup_matrix.dtype == np.int8
+    assert np.shares_memory(rollup_matrix.indices, evaluator.rollup_matrix.indices)
+    # no copy in `roll_up` products of that dtype
+    assert rollup_matrix.astype(evaluator.float_dtype, copy=False) is rollup_matrix
+
+# relative tolerance of 50 chained delta updates versus a full re-score, by precision
+CHAINED_DELTA_RTOL = dict(double=1e-12, single=1e-5)
+
+def test_evaluate_detailed_delta_matches_full_score_after_chained_updates(precision_evaluator):
+    evaluator = precision_evaluator
+    rng = np.random.default_rng(0)
+    n_ids, n_days = len(evaluator.ids), evaluator.n_validation_days
+
+    pred_values = rng.poisson(2., size=(n_ids, n_days)).astype(evaluator.float_dtype)
+    _, residuals, results_df = evaluator.evaluate_detailed_from_values(pred_values)
+    rmsse = results_df['rmsse'].values
+
+    for _ in range(50):
+        rows = np.unique(rng.integers(0, n_ids, size=rng.integers(1, 10)))
+        values = (rng.random((len(rows), n_days)) * 10).astype(evaluator.float_dtype)
+        # e.g. memory-mapped session arrays
+        residuals.flags.writeable = False
+
+        wrmsse, residuals, results_df = evaluator.evaluate_detailed_delta(
+            residuals, rmsse, rows, pred_values[rows], values
+        )
+        pred_values[rows] = values
+        rmsse = results_df['rmsse'].values
+
+    expected_wrmsse, expected_residuals, expected_results_df = evaluator.evaluate_detailed_from_values(pred_values)
+
+    # rolled-up changes are added to the residuals: rounding errors stay at the level of the residuals precision
+    rtol = CHAINED_DELTA_RTOL[evaluator.precision]
+    scale = np.maximum(np.abs(expected_residuals).max(axis=1, keepdims=True), 1)
+
+    np.testing.assert_allclose(residuals / scale, expected_residuals / scale, rtol=0, atol=rtol)
+    np.testing.assert_allclose(rmsse, expected_results_df['rmsse'].values, rtol=rtol)
+    assert wrmsse == pytest.approx(expected_wrmsse, rel=rtol)
+
+    # results are built on a shallow copy of the aggregated time series ids
+    assert list(evaluator.agg_level_ids.columns) == ['agg_level', 'agg_level_id']
+
+def get_predictions(evaluator, n_submissions: int, seed: int=0) -> np.array:
+    """
+    Noisy groundtruth, of shape `(n_submissions, n_ids, n_validation_days)`
+    """
+    rng = np.random.default_rng(seed)
+    groundtruth_values = np.asarray(evaluator.groundtruth_values, dtype=np.float64)
+    return np.maximum(
+        groundtruth_values[None] * rng.uniform(0.5, 1.5, (n_submissions, 1, 1))
+        + rng.normal(0, 1, (n_submissions,) + groundtruth_values.shape),
+        0
+    )
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 100])
+def test_evaluate_many_matches_evaluate_detailed(accuracy_evaluator, chunk_size):
+    pred_values = get_predictions(accuracy_evaluator, n_submissions=7)
+
+    wrmsse, wrmsse_per_agg_level_df = accuracy_evaluator.evaluate_many(pred_values, chunk_size=chunk_size)
+
+    for k, values in enumerate(pred_values):
+        expected_wrmsse, _, results_df = accuracy_evaluator.evaluate_detailed_from_values(values)
+        expected_per_agg_level = results_df.groupby('agg_level', sort=False)['wrmsse'].sum()
+
+        assert wrmsse[k] == pytest.approx(expected_wrmsse, rel=1e-12)
+        np.testing.assert_allclose(
+            wrmsse_per_agg_level_df.iloc[k].values,
+            expected_per_agg_level[wrmsse_per_agg_level_df.columns].values,
+            rtol=1e-12
+        )
+
+def test_evaluate_detailed_matches_evaluate(accuracy_evaluator):
+    predictions_df = accuracy_evaluator.groundtruth_df
+    predictions_df.columns = ['id'] + [f'F{k + 1}' for k in range(accuracy_evaluator.n_validation_days)]
+    predictions_df[predictions_df.columns[1:]] = get_predictions(accuracy_evaluator, n_submissions=1)[0]
+
+    # rows in another order than the evaluator ids
+    predictions_df = predictions_df.sample(frac=1, random_state=0)
+
+    wrmsse, _, _ = accuracy_evaluator.evaluate_detailed(predictions_df)
+
+    assert accuracy_evaluator.evaluate(predictions_df) == pytest.approx(wrmsse, rel=1e-12)
+
+def test_single_precision_matches_double_precision(synthetic_m5, accuracy_evaluator):
+    evaluator = AccuracyEvaluator(*synthetic_m5, precision='single')
+    pred_values = get_predictions(accuracy_evaluator, n_submissions=3)
+
+    np.testing.assert_allclose(
+        evaluator.evaluate_many(pred_values.astype(np.float32))[0],
+        accuracy_evaluator.evaluate_many(pred_values)[0],
+        rtol=SINGLE_PRECISION_RTOL
+    )
+
+def test_save_load_round_trip(tmp_path, accuracy_evaluator):
+    accuracy_evaluator.save(str(tmp_path))
+    evaluator = AccuracyEvaluator.load(str(tmp_path))
+
+    assert evaluator.precision == accuracy_evaluator.precision
+    assert evaluator.n_validation_days == accuracy_evaluator.n_validation_days
+    np.testing.assert_array_equal(evaluator.ids, accuracy_evaluator.ids)
+    # read-only memory maps
+    assert not evaluator.scaling_factors.flags.writeable
+
+    pred_values = get_predictions(accuracy_evaluator, n_submissions=3)
+
+    np.testing.assert_array_equal(
+        evaluator.evaluate_many(pred_values)[0],
+        accuracy_evaluator.evaluate_many(pred_values)[0]
+    )
+
+    _, residuals, results_df = evaluator.evaluate_detailed_from_values(pred_values[0])
+    _, expected_residuals, expected_results_df = accuracy_evaluator.evaluate_detailed_from_values(pred_values[0])
+
+    np.testing.assert_array_equal(residuals, expected_residuals)
+    pd.testing.assert_frame_equal(results_df, expected_results_df)
+
+def get_values_df(ids: np.array, n_value_columns: int=3) -> pd.DataFrame:
+    """
+    Wide values dataframe of `ids`, where the values of each row are its position in `ids`
+    """
+    df = pd.DataFrame(
+        np.repeat(np.arange(len(ids), dtype=np.float64)[:, None], n_value_columns, axis=1),
+        columns=[f'F{k + 1}' for k in range(n_value_columns)]
+    )
+    df.insert(0, 'id', ids)
+    return df
+
+def test_align_to_ids_reorders_rows():
+    ids = np.array(['a', 'b', 'c', 'd'])
+    df = get_values_df(ids).iloc[[2, 0, 3, 1]]
+
+    values, report = align_to_ids(ids, pd.Index(ids), df, n_value_columns=3)
+
+    assert report['errors'] == []
+    np.testing.assert_array_equal(values[:, 0], np.arange(len(ids)))
+
+def test_align_to_ids_reports_errors():
+    ids = np.array(['a', 'b', 'c', 'd'])
+    # `b` duplicated, `d` missing, `x` unknown, one value column too many
+    df = get_values_df(np.array(['a', 'b', 'b', 'c', 'x']), n_value_columns=4)
+
+    values, report = align_to_ids(ids, pd.Index(ids), df, n_value_columns=3)
+
+    assert values is None
+    assert report['n_missing_ids'] == 1 and report['missing_ids'] == ['d']
+    assert report['n_duplicate_ids'] == 1 and report['duplicate_ids'] == ['b']
+    assert report['n_unknown_ids'] == 1 and report['unknown_ids'] == ['x']
+    assert report['n_value_columns'] == 4 and report['expected_n_value_columns'] == 3
+    assert report['errors'] == [
+        "1 missing ids, e.g. d.",
+        "1 duplicate ids, e.g. b.",
+        "Expected 3 F*/d_* columns, found 4.",
+    ]
+
+def test_align_to_ids_ignores_unknown_ids():
+    ids = np.array(['a', 'b'])
+    df = get_values_df(np.array(['b', 'x', 'a']))
+
+    values, report = align_to_ids(ids, pd.Index(ids), df)
+
+    assert report['errors'] == []
+    assert report['unknown_ids'] == ['x']
+    np.testing.assert_array_equal(values[:, 0], [2, 0])
+
+def test_align_values_raises_validation_error(accuracy_evaluator):
+    df = get_values_df(accuracy_evaluator.ids[1:], n_value_columns=accuracy_evaluator.n_validation_days)
+
+    with pytest.raises(ValidationError, match='1 missing ids') as excinfo:
+        accuracy_evaluator.align_values(df, n_value_columns=accuracy_evaluator.n_validation_days)
+
+    assert excinfo.value.report['missing_ids'] == [str(accuracy_evaluator.ids[0])]
+
+@pytest.mark.parametrize('resample', ['days', 'series', 'both'])
+def test_bootstrap_is_reproducible(accuracy_evaluator, resample):
+    pred_values = get_predictions(accuracy_evaluator, n_submissions=1)[0]
+    wrmsse, residuals, _ = accuracy_evaluator.evaluate_detailed_from_values(pred_values)
+
+    result = accuracy_evaluator.bootstrap(residuals, resample=resample, n_replicates=200, seed=1)
+
+    assert result['wrmsse'] == pytest.approx(wrmsse, rel=1e-12)
+    assert result['replicates'].shape == (200,)
+    assert result['low'] <= result['high']
+    assert result['std'] > 0
+    # same seed, same replicates
+    np.testing.assert_array_equal(
+        accuracy_evaluator.bootstrap(residuals, resample=resample, n_replicates=200, seed=1)['replicates'],
+        result['replicates']
+    )
+    assert not np.array_equal(
+        accuracy_evaluator.bootstrap(residuals, resample=resample, n_replicates=200, seed=2)['replicates'],
+        result['replicates']
+    )
+
+def test_bootstrap_days_single_block_is_the_point_estimate(accuracy_evaluator):
+    pred_values = get_predictions(accuracy_evaluator, n_submissions=1)[0]
+    wrmsse, residuals, _ = accuracy_evaluator.evaluate_detailed_from_values(pred_values)
+
+    # one block of all validation days: each replicate draws every day once
+    result = accuracy_evaluator.bootstrap(
+        residuals, resample='days', n_replicates=10, block_size=accuracy_evaluator.n_validation_days
+    )
+
+    np.testing.assert_allclose(result['replicates'], wrmsse, rtol=1e-12)
+    assert result['low'] == pytest.approx(wrmsse, rel=1e-12)
+    assert result['high'] == pytest.approx(wrmsse, rel=1e-12)
+
+def test_bootstrap_series_replicates_are_unbiased(accuracy_evaluator):
+    pred_values = get_predictions(accuracy_evaluator, n_submissions=1)[0]
+    wrmsse, residuals, _ = accuracy_evaluator.evaluate_detailed_from_values(pred_values)
+
+    # each series is drawn once on average, within its aggregation level
+    result = accuracy_evaluator.bootstrap(residuals, resample='series', n_replicates=2000)
+
+    n_replicates = len(result['replicates'])
+    assert abs(result['replicates'].mean() - wrmsse) < 4 * result['std'] / np.sqrt(n_replicates)
+    assert result['low'] < wrmsse < result['high']
+
+def test_bootstrap_rejects_unknown_resampling(accuracy_evaluator):
+    residuals = np.zeros((len(accuracy_evaluator.scaling_factors), accuracy_evaluator.n_validation_days))
+
+    with pytest.raises(ValueError, match='Unknown resampling'):
+        accuracy_evaluator.bootstrap(residuals, resample='weeks')
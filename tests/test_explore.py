@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.explore import SalesExplorer, minmax_downsample
+from utils.settings import AGG_FUNCTIONS
+
+FILTERS = [
+    {},
+    {'state_id': ['CA', 'WI'], 'cat_id': ['FOODS']},
+    {'state_id': ['CA'], 'store_id': ['TX_1']},
+    {'dept_id': ['HOBBIES_1', 'unknown']},
+]
+
+def get_filter_values(sales_explorer: SalesExplorer, filters: dict) -> list:
+    return [filters.get(f['name'], []) for f in sales_explorer.filter_possible_values_dict]
+
+def get_filter_mask(sales_df: pd.DataFrame, filters: dict) -> np.array:
+    """
+    Rows matching filters, with `isin` masks as before the bitset index
+    """
+    mask = np.ones(len(sales_df), dtype=bool)
+    for col, values in filters.items():
+        mask &= sales_df[col].astype(str).isin(values).values
+    return mask
+
+def filter_groupby_agg_reference(
+    sales_df: pd.DataFrame,
+    filters: dict,
+    groupby_col: str,
+    agg_function: str
+) -> pd.DataFrame:
+    """
+    Filtered and aggregated sales in wide format, computed with pandas as before the wide matrix engine
+    """
+    d_cols = [col for col in sales_df.columns if col.startswith('d_')]
+    df = sales_df.loc[get_filter_mask(sales_df, filters)]
+    return pd.DataFrame(df[d_cols].to_numpy(np.float64), index=df[groupby_col].astype(str).values)\
+        .groupby(level=0).agg(agg_function)
+
+def resample_reference(
+    sales_explorer: SalesExplorer,
+    values: np.array,
+    pd_freq_alias: str,
+    agg_function: str
+) -> pd.DataFrame:
+    """
+    Values of each period (columns), with pandas period groupby as before the calendar buckets
+    """
+    period_end_dates = pd.Series(pd.to_datetime(sales_explorer.d_dates))\
+        .dt.to_period(pd_freq_alias).dt.to_timestamp(how='E')
+    return pd.DataFrame(np.asarray(values, dtype=np.float64).T)\
+        .groupby(period_end_dates.values).agg(agg_function).T
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_filter_rows_match_isin_masks(synthetic_m5, sales_explorer, filters):
+    sales_df, _, _ = synthetic_m5
+    filter_values = get_filter_values(sales_explorer, filters)
+    expected = np.flatnonzero(get_filter_mask(sales_df, filters))
+
+    np.testing.assert_array_equal(sales_explorer.get_filter_rows(filter_values), expected)
+    assert sales_explorer.count_rows(filter_values) == len(expected)
+
+@pytest.mark.parametrize('filters', FILTERS)
+@pytest.mark.parametrize('groupby_col', ['store_id', 'dept_id'])
+@pytest.mark.parametrize('agg_function', AGG_FUNCTIONS)
+def test_filter_groupby_agg_matches_pandas(synthetic_m5, sales_explorer, filters, groupby_col, agg_function):
+    sales_df, _, _ = synthetic_m5
+    expected = filter_groupby_agg_reference(sales_df, filters, groupby_col, agg_function)
+
+    id_count, id_count_after_filtering, n_agg_time_series, groups, values = sales_explorer.filter_groupby_agg(
+        get_filter_values(sales_explorer, filters), groupby_col, agg_function
+    )
+
+    assert id_count == len(sales_df)
+    assert id_count_after_filtering == get_filter_mask(sales_df, filters).sum()
+    assert n_agg_time_series == len(expected)
+    np.testing.assert_array_equal(np.asarray(groups, dtype=str), expected.index.values.astype(str))
+    np.testing.assert_allclose(values, expected.values, rtol=1e-10, equal_nan=True)
+
+def test_filter_groupby_agg_sampling_is_seeded(sales_explorer):
+    filter_values = get_filter_values(sales_explorer, {})
+
+    _, _, n_agg_time_series, groups, values = sales_explorer.filter_groupby_agg(filter_values, 'item_id', 'sum')
+    _, _, _, other_groups, other_values = sales_explorer.filter_groupby_agg(filter_values, 'item_id', 'sum')
+
+    assert n_agg_time_series > sales_explorer.MAX_N_GRAPH_TRACES == len(groups)
+    np.testing.assert_array_equal(groups, other_groups)
+    np.testing.assert_array_equal(values, other_values)
+
+def test_explorer_from_artifacts(sales_explorer):
+    explorer = SalesExplorer.from_artifacts(*sales_explorer.get_artifacts())
+    filter_values = get_filter_values(sales_explorer, FILTERS[1])
+
+    for left, right in zip(
+        explorer.filter_groupby_agg(filter_values, 'dept_id', 'mean'),
+        sales_explorer.filter_groupby_agg(filter_values, 'dept_id', 'mean')
+    ):
+        np.testing.assert_array_equal(left, right)
+
+def test_time_pyramid_statistics(sales_explorer):
+    _, _, _, groups, values = sales_explorer.filter_groupby_agg(
+        get_filter_values(sales_explorer, {}), 'store_id', 'sum'
+    )
+
+    pyramid = sales_explorer.get_time_pyramid(values)
+
+    for sf in sales_explorer.SAMPLING_FREQUENCIES:
+        for statistic in sales_explorer.PYRAMID_STATISTICS:
+            expected = resample_reference(sales_explorer, values, sf['pd_freq_alias'], statistic)
+            np.testing.assert_array_equal(pyramid[f"{sf['name']}.date"], expected.columns.values)
+            np.testing.assert_allclose(pyramid[f"{sf['name']}.{statistic}"], expected.values, rtol=1e-10)
+
+def test_query_time_pyramid_bounds_points(sales_explorer):
+    _, _, _, groups, values = sales_explorer.filter_groupby_agg(
+        get_filter_values(sales_explorer, {}), 'store_id', 'sum'
+    )
+    pyramid = sales_explorer.get_time_pyramid(values)
+    daily = pyramid['Daily.sum']
+
+    # everything fits
+    df = sales_explorer.query_time_pyramid(groups, pyramid, 'store_id', max_points=10**6)
+    np.testing.assert_array_equal(df.loc[df['sampling_frequency'] == 'Daily', 'sales'].values, daily.reshape(-1))
+
+    # whole range downsampled, peaks are kept
+    max_points = 100
+    df = sales_explorer.query_time_pyramid(groups, pyramid, 'store_id', max_points=max_points)
+    points_per_trace = df.groupby(['sampling_frequency', 'store_id']).size()
+    assert points_per_trace.max() <= max_points
+    daily_df = df.loc[df['sampling_frequency'] == 'Daily']
+    np.testing.assert_array_equal(daily_df.groupby('store_id')['sales'].max().values, daily.max(axis=1))
+    np.testing.assert_array_equal(daily_df.groupby('store_id')['sales'].min().values, daily.min(axis=1))
+
+    # zoom: all visible days, and a bounded context on each side
+    dates = pyramid['Daily.date']
+    start, end = pd.Timestamp(dates[500]).normalize(), pd.Timestamp(dates[529])
+    df = sales_explorer.query_time_pyramid(groups, pyramid, 'store_id', start=start, end=end, max_points=max_points)
+    daily_df = df.loc[df['sampling_frequency'] == 'Daily']
+    visible = daily_df.loc[(daily_df['date'] >= start) & (daily_df['date'] <= end)]
+    assert (visible.groupby('store_id').size() == 30).all()
+    assert (daily_df.groupby('store_id').size() <= 30 + 2 * (max_points // 4)).all()
+
+def test_minmax_downsample():
+    values = np.random.default_rng(0).normal(size=(3, 5000))
+
+    columns = minmax_downsample(values, 1000)
+
+    assert columns.shape == (3, 1000)
+    assert (np.diff(columns, axis=1) >= 0).all()
+    kept = np.take_along_axis(values, columns, axis=1)
+    np.testing.assert_array_equal(kept.max(axis=1), values.max(axis=1))
+    np.testing.assert_array_equal(kept.min(axis=1), values.min(axis=1))
+
+    np.testing.assert_array_equal(minmax_downsample(values[:, :10], 1000), np.tile(np.arange(10), (3, 1)))
@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils import session
+from utils.artifacts import cache_key
+from utils.session import ResultCache, SessionStore
+
+def test_session_store_round_trip(tmp_path):
+    store = SessionStore(directory=str(tmp_path), max_bytes=2**20, ttl=60)
+    values = np.arange(12.).reshape(3, 4)
+
+    token = store.create(dict(values=values), dict(filename='predictions.csv'))
+    store.update(token, dict(residuals=-values))
+
+    # another worker only sees the on-disk tier
+    arrays, metadata = SessionStore(directory=str(tmp_path), max_bytes=2**20, ttl=60).get(token)
+
+    np.testing.assert_array_equal(arrays['values'], values)
+    np.testing.assert_array_equal(arrays['residuals'], -values)
+    assert metadata == dict(filename='predictions.csv')
+
+    assert store.get('0' * 32) is None
+    assert store.get('not a token') is None
+
+def test_session_store_update_writes_only_new_arrays(tmp_path):
+    store = SessionStore(directory=str(tmp_path), max_bytes=2**20, ttl=60)
+    path = os.path.join(str(tmp_path), store.create(dict(predictions=np.ones((3, 4)))))
+
+    files_before = set(os.listdir(path))
+    store.update(os.path.basename(path), dict(residuals=np.zeros((5, 4))), dict(score=1.))
+    new_files = set(os.listdir(path)) - files_before
+
+    # the predictions file is kept as is
+    assert [filename.split('.')[0] for filename in new_files] == ['residuals']
+
+    arrays, metadata = SessionStore(directory=str(tmp_path), max_bytes=2**20, ttl=60).get(os.path.basename(path))
+    assert sorted(arrays) == ['predictions', 'residuals']
+    assert metadata == dict(score=1.)
+
+def test_session_store_concurrent_updates_and_reads(tmp_path):
+    # e.g. a worker re-scoring a session while another one serves its residuals
+    n_updates, n_reads = 100, 300
+
+    writer = SessionStore(directory=str(tmp_path), max_bytes=2**30, ttl=60)
+    token = writer.create(dict(predictions=np.ones((100, 28))), dict(n_scores=0))
+    # without memory tier: every read goes to the on-disk tier
+    reader = SessionStore(directory=str(tmp_path), max_bytes=0, ttl=60)
+
+    inconsistent = []
+    misses = []
+
+    def _update():
+        for k in range(1, n_updates + 1):
+            writer.update(token, dict(residuals=np.full((100, 28), k)), dict(n_scores=k))
+
+    def _read():
+        for _ in range(n_reads):
+            result = reader.get(token)
+            if result is None:
+                misses.append(1)
+                continue
+            arrays, metadata = result
+            # arrays and metadata of the same update
+            if metadata['n_scores'] > 0 and arrays['residuals'][0, 0] != metadata['n_scores']:
+                inconsistent.append(metadata['n_scores'])
+
+    threads = [threading.Thread(target=_update), threading.Thread(target=_read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(misses) == 0
+    assert inconsistent == []
+    assert reader.get(token)[1] == dict(n_scores=n_updates)
+
+def test_result_cache_counts_hits_and_misses(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), max_bytes=2**20, ttl=60)
+    key = cache_key(query='test')
+    n_computes = []
+
+    def _compute():
+        n_computes.append(1)
+        return dict(values=np.ones(4)), dict(count=4)
+
+    for _ in range(3):
+        arrays, metadata = cache.get_or_compute(key, _compute)
+
+    np.testing.assert_array_equal(arrays['values'], np.ones(4))
+    assert metadata == dict(count=4)
+    assert len(n_computes) == 1
+
+    stats = cache.stats()
+    assert (stats['misses'], stats['memory_hits'], stats['disk_hits']) == (1, 2, 0)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+
+    # other worker: served from the on-disk tier
+    other_cache = ResultCache(directory=str(tmp_path), max_bytes=2**20, ttl=60)
+    other_cache.get_or_compute(key, _compute)
+    assert other_cache.stats()['disk_hits'] == 1
+    assert len(n_computes) == 1
+
+def test_result_cache_memory_budget(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), max_bytes=100, ttl=60)
+
+    for k in range(3):
+        cache.put(cache_key(query=k), dict(values=np.zeros(10)))
+
+    # 80 bytes per entry: only the most recent one is kept in memory
+    assert cache.stats()['entries'] == 1
+    assert cache.get(cache_key(query=0)) is not None
+    assert cache.stats()['disk_hits'] == 1
+
+def test_result_cache_concurrent_puts_of_the_same_key(tmp_path):
+    # e.g. several workers missing on the same query at once
+    n_writers, n_puts, n_reads = 3, 50, 300
+
+    key = cache_key(query='concurrent')
+    values = np.arange(10000.)
+    writers = [ResultCache(directory=str(tmp_path), max_bytes=2**30, ttl=60) for _ in range(n_writers)]
+    # without memory tier: every read goes to the on-disk tier
+    reader = ResultCache(directory=str(tmp_path), max_bytes=0, ttl=60)
+
+    writers[0].put(key, dict(values=values), dict(count=len(values)))
+
+    errors = []
+    misses = []
+    barrier = threading.Barrier(n_writers + 1)
+
+    def _write(cache):
+        barrier.wait()
+        for _ in range(n_puts):
+            try:
+                cache.put(key, dict(values=values), dict(count=len(values)))
+            except Exception as e:
+                errors.append(e)
+
+    def _read():
+        barrier.wait()
+        for _ in range(n_reads):
+            result = reader.get(key)
+            if result is None:
+                misses.append(1)
+            else:
+                np.testing.assert_array_equal(result[0]['values'], values)
+
+    threads = [threading.Thread(target=_write, args=(cache,)) for cache in writers]
+    threads.append(threading.Thread(target=_read))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(misses) == 0
+    assert reader.stats()['disk_hits'] == n_reads
+
+def test_result_cache_get_or_compute_when_put_fails(tmp_path, monkeypatch):
+    cache = ResultCache(directory=str(tmp_path), max_bytes=2**20, ttl=60)
+
+    def _fail(*args, **kwargs):
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(cache, '_save', _fail)
+
+    arrays, metadata = cache.get_or_compute(cache_key(query='test'), lambda: (dict(values=np.ones(4)), dict(count=4)))
+
+    np.testing.assert_array_equal(arrays['values'], np.ones(4))
+    assert metadata == dict(count=4)
+
+@pytest.mark.parametrize('touch_interval, n_touches', [(60, 0), (0, 100)])
+def test_result_cache_memory_hits_do_not_stat_and_throttle_touches(tmp_path, monkeypatch, touch_interval, n_touches):
+    cache = ResultCache(directory=str(tmp_path), max_bytes=2**20, ttl=60, touch_interval=touch_interval)
+    key = cache_key(query='test')
+    cache.put(key, dict(values=np.ones(4)))
+
+    calls = dict(touch=0, get_mtime=0)
+
+    def _counted(name, function):
+        def _wrapper(*args, **kwargs):
+            calls[name] += 1
+            return function(*args, **kwargs)
+        return _wrapper
+
+    for name in calls:
+        monkeypatch.setattr(session, name, _counted(name, getattr(session, name)))
+
+    for _ in range(100):
+        assert cache.get(key) is not None
+
+    assert cache.stats()['memory_hits'] == 100
+    assert calls == dict(touch=n_touches, get_mtime=0)
+
+@pytest.mark.parametrize('sweep_interval, n_sweeps', [(600, 1), (0, 10)])
+def test_session_store_sweeps_periodically(tmp_path, monkeypatch, sweep_interval, n_sweeps):
+    store = SessionStore(directory=str(tmp_path), max_bytes=2**20, ttl=60, sweep_interval=sweep_interval)
+
+    sweeps = []
+    sweep_directory = store._sweep_directory
+    monkeypatch.setattr(store, '_sweep_directory', lambda: sweeps.append(sweep_directory()))
+
+    for _ in range(10):
+        store.create(dict(values=np.ones(4)))
+
+    assert len(sweeps) == n_sweeps
+
+def test_session_store_sweep_removes_expired_entries(tmp_path):
+    store = SessionStore(directory=str(tmp_path), max_bytes=2**20, ttl=60, sweep_interval=0)
+
+    expired_token = store.create(dict(values=np.ones(4)))
+    past = time.time() - 120
+    os.utime(os.path.join(str(tmp_path), expired_token, session.ACCESS_FILENAME), (past, past))
+
+    token = store.create(dict(values=np.ones(4)))
+
+    assert sorted(os.listdir(str(tmp_path))) == [token]
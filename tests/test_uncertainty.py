@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.evaluate import ValidationError
+from utils.uncertainty import UncertaintyEvaluator
+
+@pytest.fixture(scope='module')
+def uncertainty_evaluator(accuracy_evaluator):
+    return UncertaintyEvaluator(accuracy_evaluator)
+
+def get_abs_scaling_factors_reference(sales_values_agg: np.array) -> np.array:
+    """
+    Lag-1 MAE of each series, from its first non-zero day
+    """
+    scaling_factors = []
+    for values in np.asarray(sales_values_agg, dtype=np.float64):
+        start = np.argmax(values > 0)
+        scaling_factors.append(np.mean(np.abs(np.diff(values[start:]))))
+    return np.array(scaling_factors)
+
+def wspl_reference(uncertainty_evaluator, pred_values: np.array) -> float:
+    """
+    WSPL computed one series and quantile at a time
+    """
+    accuracy_evaluator = uncertainty_evaluator.accuracy_evaluator
+    gt_values = accuracy_evaluator.rolled_up_groundtruth_values
+
+    wspl = 0.
+    for k in range(len(uncertainty_evaluator.series_ids)):
+        pinball_loss = 0.
+        for j, quantile in enumerate(uncertainty_evaluator.quantiles):
+            diffs = gt_values[k] - pred_values[k, j]
+            pinball_loss += np.mean(np.where(diffs >= 0, quantile * diffs, (quantile - 1) * diffs))
+        spl = pinball_loss / len(uncertainty_evaluator.quantiles) / accuracy_evaluator.abs_scaling_factors[k]
+        wspl += spl * accuracy_evaluator.sales_usd_weights[k] / accuracy_evaluator.n_agg_levels
+
+    return wspl
+
+def get_quantile_predictions(uncertainty_evaluator, seed: int=0) -> np.array:
+    rng = np.random.default_rng(seed)
+    gt_values = uncertainty_evaluator.accuracy_evaluator.rolled_up_groundtruth_values
+    spread = rng.uniform(0.5, 1.5, (gt_values.shape[0], 1, 1)) * np.sqrt(gt_values.mean(axis=1) + 1)[:, None, None]
+    return gt_values[:, None, :] + spread * (uncertainty_evaluator.quantiles[None, :, None] - 0.5) * 4
+
+def test_abs_scaling_factors_match_reference(synthetic_m5, accuracy_evaluator):
+    sales_df, _, _ = synthetic_m5
+    d_cols = [col for col in sales_df.columns if col.startswith('d_')][:-accuracy_evaluator.n_validation_days]
+    sales_values_agg = accuracy_evaluator.rollup_matrix.astype(np.float64) * sales_df[d_cols].values.astype(np.float64)
+
+    np.testing.assert_allclose(
+        accuracy_evaluator.abs_scaling_factors,
+        get_abs_scaling_factors_reference(sales_values_agg),
+        rtol=1e-10
+    )
+
+@pytest.mark.parametrize('chunk_size', [1, 50, 4096])
+def test_wspl_matches_per_quantile_reference(uncertainty_evaluator, chunk_size):
+    pred_values = get_quantile_predictions(uncertainty_evaluator)
+
+    wspl, residuals, results_df = uncertainty_evaluator.evaluate_detailed_from_values(pred_values, chunk_size=chunk_size)
+
+    assert wspl == pytest.approx(wspl_reference(uncertainty_evaluator, pred_values), rel=1e-10)
+    np.testing.assert_allclose(
+        residuals,
+        pred_values[:, uncertainty_evaluator.median_index] - uncertainty_evaluator.accuracy_evaluator.rolled_up_groundtruth_values
+    )
+    assert results_df['wspl'].sum() == pytest.approx(wspl, rel=1e-12)
+
+def test_evaluate_from_submission(uncertainty_evaluator):
+    pred_values = get_quantile_predictions(uncertainty_evaluator)
+    n_days = pred_values.shape[2]
+
+    predictions_df = pd.DataFrame(pred_values.reshape(-1, n_days), columns=[f'F{k + 1}' for k in range(n_days)])
+    predictions_df.insert(0, 'id', uncertainty_evaluator.ids)
+    predictions_df = predictions_df.sample(frac=1, random_state=0)
+
+    assert uncertainty_evaluator.evaluate(predictions_df) == pytest.approx(
+        wspl_reference(uncertainty_evaluator, pred_values),
+        rel=1e-10
+    )
+
+    with pytest.raises(ValidationError):
+        uncertainty_evaluator.evaluate(predictions_df.iloc[1:])
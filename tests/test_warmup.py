@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pytest
+
+import utils.warmup
+from utils.evaluate import AccuracyEvaluator
+from utils.warmup import InputFrames, warmup_accuracy_evaluator
+
+ALL_COMPONENTS = {component['name'] for component in AccuracyEvaluator.COMPONENTS}
+
+class SyntheticInputFrames(InputFrames):
+
+    def __init__(self, frames: dict, fingerprints: dict):
+        """
+        Input dataframes given in memory, with given fingerprints instead of those of the input files
+        """
+        super().__init__(content_hash=False)
+        self.frames = frames
+        self.fingerprints = fingerprints
+
+    def get(self, name: str):
+        return self.frames[name]
+
+    def fingerprint(self, name: str) -> dict:
+        return self.fingerprints[name]
+
+def get_fingerprints(**changed) -> dict:
+    fingerprints = {
+        name : dict(path=name, size=1, mtime=0.) for name in ['sales_df', 'sell_prices_df', 'calendar_df']
+    }
+    for name, mtime in changed.items():
+        fingerprints[name]['mtime'] = mtime
+    return fingerprints
+
+@pytest.fixture
+def rebuilt_components(monkeypatch):
+    """
+    Names of the accuracy evaluator components rebuilt by `utils.artifacts.load_or_build`
+    """
+
+    rebuilt_components = set()
+    load_or_build = utils.warmup.load_or_build
+
+    def _load_or_build(directory, key, build, **kwargs):
+        arrays, metadata, rebuilt = load_or_build(directory, key, build, **kwargs)
+        if rebuilt:
+            rebuilt_components.add(os.path.basename(directory))
+        return arrays, metadata, rebuilt
+
+    monkeypatch.setattr(utils.warmup, 'load_or_build', _load_or_build)
+
+    return rebuilt_components
+
+@pytest.mark.parametrize('changed_input, expected_rebuilt', [
+    ('sell_prices_df', {'prices', 'weights'}),
+    ('calendar_df', {'prices', 'weights'}),
+    ('sales_df', ALL_COMPONENTS),
+])
+def test_warmup_rebuilds_only_stale_components(
+    tmp_path, synthetic_m5, accuracy_evaluator, rebuilt_components, changed_input, expected_rebuilt
+):
+    frames = dict(zip(['sales_df', 'sell_prices_df', 'calendar_df'], synthetic_m5))
+    directory = str(tmp_path)
+
+    warmup_accuracy_evaluator(directory, SyntheticInputFrames(frames, get_fingerprints()))
+    assert rebuilt_components == ALL_COMPONENTS
+
+    # same fingerprints: everything is loaded
+    rebuilt_components.clear()
+    warmup_accuracy_evaluator(directory, SyntheticInputFrames(frames, get_fingerprints()))
+    assert rebuilt_components == set()
+
+    # changed input file: only the components depending on it, directly or upstream
+    rebuilt_components.clear()
+    evaluator = warmup_accuracy_evaluator(
+        directory,
+        SyntheticInputFrames(frames, get_fingerprints(**{changed_input : 1.}))
+    )
+    assert rebuilt_components == expected_rebuilt
+
+    pred_values = np.asarray(accuracy_evaluator.groundtruth_values) + 1.
+    assert evaluator.evaluate_many(pred_values[None])[0][0] == pytest.approx(
+        accuracy_evaluator.evaluate_many(pred_values[None])[0][0], rel=1e-12
+    )
+
+def test_warmup_rebuilds_on_setting_change(tmp_path, synthetic_m5, rebuilt_components, monkeypatch):
+    frames = dict(zip(['sales_df', 'sell_prices_df', 'calendar_df'], synthetic_m5))
+    directory = str(tmp_path)
+
+    warmup_accuracy_evaluator(directory, SyntheticInputFrames(frames, get_fingerprints()))
+
+    settings = utils.warmup.get_settings()
+    monkeypatch.setattr(
+        utils.warmup, 'get_settings', lambda: dict(settings, aggregation_levels=settings['aggregation_levels'][:-1])
+    )
+
+    rebuilt_components.clear()
+    warmup_accuracy_evaluator(directory, SyntheticInputFrames(frames, get_fingerprints()))
+
+    # the rollup matrix and every component downstream of it
+    assert rebuilt_components == ALL_COMPONENTS - {'values', 'prices'}
@@ -0,0 +1,337 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Tuple
+
+import numpy as np
+
+MANIFEST_FILENAME = 'manifest.json'
+ARRAY_FILE_EXTENSION = '.npy'
+TEMPORARY_FILE_EXTENSION = '.tmp'
+
+# To be bumped whenever the content or layout of saved artifacts changes
+SCHEMA_VERSION = 4
+
+# array files no longer listed in the manifest are removed by later saves once older than this,
+# so that processes which read the previous manifest can still open them
+STALE_FILES_GRACE_PERIOD = 60 # s
+
+HASH_CHUNK_SIZE = 2**20 # bytes
+
+def file_fingerprint(
+    path: str,
+    content_hash: bool=False
+) -> dict:
+    """
+    Return a cheap fingerprint of a file: its size and modification time,
+    and optionally the sha256 of its content
+
+    Parameters
+    ----------
+    path : str
+        File path
+    content_hash : bool
+        if True, add the sha256 of the file content. 
+        Slower, but robust to files rewritten with the same size and mtime
+
+    Returns
+    -------
+    dict
+        fingerprint
+    """
+
+    stat = os.stat(path)
+
+    fingerprint = dict(
+        name=os.path.basename(path),
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns
+    )
+
+    if content_hash:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        fingerprint['sha256'] = sha256.hexdigest()
+
+    return fingerprint
+
+def cache_key(**parts) -> str:
+    """
+    Return a content-addressed key: the sha256 of the canonical json of `parts`,
+    prefixed with the artifacts schema version
+
+    Parameters
+    ----------
+    parts
+        json-serializable values the cached artifacts depend on
+
+    Returns
+    -------
+    str
+        cache key
+    """
+
+    canonical = json.dumps(
+        dict(schema_version=SCHEMA_VERSION, **parts),
+        sort_keys=True,
+        default=list
+    )
+
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def artifacts_exist(
+    directory: str,
+    key: str=None
+) -> bool:
+    """
+    Return True if `directory` holds a complete set of artifacts
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory
+    key : str
+        if provided, artifacts must also have been saved with this cache key
+
+    Returns
+    -------
+    bool
+        presence of a manifest of the current schema version, which is written last by `save_artifacts`
+    """
+
+    try:
+        with open(os.path.join(directory, MANIFEST_FILENAME), 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return False
+
+    if manifest.get('schema_version') != SCHEMA_VERSION:
+        return False
+
+    return key is None or manifest.get('key') == key
+
+def save_artifacts(
+    directory: str,
+    arrays: Dict[str, np.ndarray],
+    metadata: dict=None,
+    key: str=None
+):
+    """
+    Save each array in its own `.npy` file, and metadata in a small json manifest.
+    Object arrays (e.g. string ids) are stored as fixed-width unicode,
+    so that every array can be memory-mapped at load time.
+
+    Safe with concurrent readers and writers of the same directory, e.g. several workers:
+    array files are never overwritten, each save writes new ones,
+    and the manifest listing them is replaced last and atomically.
+    Readers see either the previous or the new artifacts, never a directory without manifest.
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory, created if needed
+    arrays : Dict[str, np.ndarray]
+        arrays to save, by name
+    metadata : dict
+        json-serializable metadata (ids, level names, shapes...)
+    key : str
+        cache key the artifacts were computed for, see `cache_key`
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    _publish_manifest(
+        directory,
+        _write_arrays(directory, arrays),
+        metadata if metadata is not None else {},
+        key
+    )
+
+def update_artifacts(
+    directory: str,
+    arrays: Dict[str, np.ndarray],
+    metadata: dict=None
+):
+    """
+    Add or replace arrays and metadata of artifacts saved with `save_artifacts`.
+    Only the given arrays are written, the other ones are kept as they are.
+
+    Concurrent updates of the same directory are not merged: the last manifest replaced wins.
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory
+    arrays : Dict[str, np.ndarray]
+        arrays to add or replace, by name
+    metadata : dict
+        json-serializable metadata to add or replace
+    """
+
+    manifest = _read_manifest(directory)
+
+    _publish_manifest(
+        directory,
+        dict(manifest['files'], **_write_arrays(directory, arrays)),
+        dict(manifest['metadata'], **(metadata if metadata is not None else {})),
+        manifest['key']
+    )
+
+def _read_manifest(directory: str) -> dict:
+    with open(os.path.join(directory, MANIFEST_FILENAME), 'r') as f:
+        return json.load(f)
+
+def _write_arrays(
+    directory: str,
+    arrays: Dict[str, np.ndarray]
+) -> Dict[str, str]:
+    """
+    Write each array to a new file, and return their file names by array name
+    """
+
+    # unique per call: concurrent writers never write to the same file,
+    # and processes memory-mapping previous files are not affected
+    suffix = uuid.uuid4().hex
+
+    files = {}
+
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        if array.dtype == object:
+            array = array.astype(str)
+
+        files[name] = f'{name}.{suffix}{ARRAY_FILE_EXTENSION}'
+        with open(os.path.join(directory, files[name]), 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+
+    return files
+
+def _publish_manifest(
+    directory: str,
+    files: Dict[str, str],
+    metadata: dict,
+    key: str
+):
+    """
+    Atomically replace the manifest of `directory`, then remove stale array files
+    """
+
+    manifest = dict(
+        schema_version=SCHEMA_VERSION,
+        key=key,
+        files=files,
+        metadata=metadata
+    )
+
+    fd, temporary_path = tempfile.mkstemp(dir=directory, prefix=MANIFEST_FILENAME, suffix=TEMPORARY_FILE_EXTENSION)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary_path, os.path.join(directory, MANIFEST_FILENAME))
+
+    _remove_stale_files(directory, keep=files.values())
+
+def _remove_stale_files(
+    directory: str,
+    keep: Iterable[str]
+):
+    """
+    Remove array and temporary files of `directory` not in `keep`, once older than `STALE_FILES_GRACE_PERIOD`.
+    Recent ones may belong to a save in progress, or to a manifest just replaced
+    """
+
+    keep = set(keep)
+    now = time.time()
+
+    for filename in os.listdir(directory):
+        if filename in keep or not filename.endswith((ARRAY_FILE_EXTENSION, TEMPORARY_FILE_EXTENSION)):
+            continue
+
+        path = os.path.join(directory, filename)
+        try:
+            if now - os.path.getmtime(path) > STALE_FILES_GRACE_PERIOD:
+                os.remove(path)
+        except OSError:
+            # removed by another writer
+            pass
+
+def load_artifacts(
+    directory: str,
+    mmap_mode: str='r'
+) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    Load arrays and metadata saved with `save_artifacts`
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory
+    mmap_mode : str
+        np.load mmap_mode, read-only memory map by default.
+        Memory-mapped files are shared across processes through the OS page cache.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        arrays, by name
+    dict
+        metadata
+    """
+
+    manifest = _read_manifest(directory)
+
+    arrays = {
+        name : np.load(
+            os.path.join(directory, filename),
+            mmap_mode=mmap_mode,
+            allow_pickle=False
+        )
+        for name, filename in manifest['files'].items()
+    }
+
+    return arrays, manifest['metadata']
+
+def load_or_build(
+    directory: str,
+    key: str,
+    build: Callable[[], Tuple[Dict[str, np.ndarray], dict]],
+    mmap_mode: str='r'
+) -> Tuple[Dict[str, np.ndarray], dict, bool]:
+    """
+    Load artifacts from `directory` if they were saved with `key`,
+    otherwise build, save and load them
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory
+    key : str
+        expected cache key, see `cache_key`
+    build : Callable
+        returns the arrays and metadata to save, called on cache miss only
+    mmap_mode : str
+        np.load mmap_mode, read-only memory map by default
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        arrays, by name
+    dict
+        metadata
+    bool
+        True if the artifacts were rebuilt
+    """
+
+    rebuilt = not artifacts_exist(directory, key=key)
+
+    if rebuilt:
+        arrays, metadata = build()
+        save_artifacts(directory, arrays, metadata, key=key)
+
+    arrays, metadata = load_artifacts(directory, mmap_mode=mmap_mode)
+
+    return arrays, metadata, rebuilt
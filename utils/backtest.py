@@ -0,0 +1,331 @@
+import re
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.evaluate import (
+    AccuracyEvaluator,
+    get_price_cube,
+    get_rollup_matrix,
+    roll_up
+)
+from utils.settings import (
+    BACKTEST_CHUNK_SIZE,
+    BACKTEST_N_FOLDS,
+    N_VALIDATION_DAYS,
+    PRECISION
+)
+
+def get_scaling_factors_per_cutoff(
+    sales_values_agg: np.array,
+    cutoffs: List[int]
+    ) -> np.array:
+    """
+    Return the lag-1 MSE of each row of `sales_values_agg` over the days before each cutoff,
+    ignoring the days before the first non-zero value of the row.
+    Same as `utils.evaluate.get_scaling_factors_from_values` on `sales_values_agg[:, :cutoff]`,
+    for all cutoffs at once, from the cumulative sums of squared diffs.
+
+    Parameters
+    ----------
+    sales_values_agg : np.array
+        aggregated sales, of shape `(n_aggregated_time_series, n_days)`
+    cutoffs : List[int]
+        number of train days of each fold
+
+    Returns
+    -------
+    np.array
+        scaling factors, of shape `(n_aggregated_time_series, len(cutoffs))`
+    """
+
+    n_series, n_days = sales_values_agg.shape
+    cutoffs = np.asarray(cutoffs)
+
+    # first non-zero day of each row, 0 for rows without sales
+    first_sale_index = np.argmax(sales_values_agg > 0, axis=1)
+
+    # cum_squared_diffs[:, k] is the sum of the first k squared diffs
+    cum_squared_diffs = np.zeros((n_series, n_days), dtype=np.float64)
+    np.cumsum(
+        np.diff(sales_values_agg, axis=1).astype(np.float64)**2,
+        axis=1,
+        out=cum_squared_diffs[:, 1:]
+        )
+
+    # rows without sales before a cutoff count their diffs from day 0, as in the single cutoff case
+    start_index = np.where(
+        first_sale_index[:, None] < cutoffs[None, :],
+        first_sale_index[:, None],
+        0
+        )
+
+    squared_diffs_sum = cum_squared_diffs[:, cutoffs - 1] \
+        - np.take_along_axis(cum_squared_diffs, start_index, axis=1)
+
+    return squared_diffs_sum / (cutoffs[None, :] - 1 - start_index)
+
+def get_sales_usd_per_window(
+    sales_values: np.array,
+    prices: np.array,
+    day_week_index: np.array,
+    windows: List[Tuple[int, int]],
+    chunk_size: int=None
+    ) -> np.array:
+    """
+    Return the cumulative USD sales of each id over each window of days,
+    from the cumulative sums of daily USD sales
+
+    Parameters
+    ----------
+    sales_values : np.array
+        sales, of shape `(n_ids, n_days)`
+    prices : np.array
+        price cube, of shape `(n_ids, n_weeks)`, see `utils.evaluate.get_price_cube`
+    day_week_index : np.array
+        price cube column index for each of the `n_days` days
+    windows : List[Tuple[int, int]]
+        `(first_day, last_day + 1)` of each window
+    chunk_size : int
+        Number of ids processed at once, all of them by default
+
+    Returns
+    -------
+    np.array
+        USD sales, of shape `(n_ids, len(windows))`
+    """
+
+    n_ids, n_days = sales_values.shape
+
+    if chunk_size is None:
+        chunk_size = max(n_ids, 1)
+
+    starts, ends = np.asarray(windows).T
+
+    sales_usd = np.empty((n_ids, len(windows)), dtype=np.float64)
+
+    for chunk_start in range(0, n_ids, chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+
+        # days without a sell price do not generate USD sales
+        daily_sales_usd = np.nan_to_num(sales_values[chunk] * prices[chunk][:, day_week_index])
+
+        cum_sales_usd = np.zeros((daily_sales_usd.shape[0], n_days + 1), dtype=np.float64)
+        np.cumsum(daily_sales_usd, axis=1, out=cum_sales_usd[:, 1:])
+
+        sales_usd[chunk] = cum_sales_usd[:, ends] - cum_sales_usd[:, starts]
+
+    return sales_usd
+
+class BacktestEvaluator(object):
+
+    def __init__(
+        self,
+        sales_df: pd.DataFrame,
+        sell_prices_df: pd.DataFrame,
+        calendar_df: pd.DataFrame,
+        cutoffs: List[int]=None,
+        horizon: int=N_VALIDATION_DAYS,
+        chunk_size: int=BACKTEST_CHUNK_SIZE,
+        precision: str=PRECISION):
+        """
+        Rolling-origin evaluator: one `AccuracyEvaluator` per fold, whose validation period is
+        the `horizon` days following the fold cutoff.
+
+        The rollup matrix and price cube are computed once and shared by all folds.
+        Scaling factors and USD sales weights of all folds are computed in one pass each,
+        from cumulative sums over the days. As in `AccuracyEvaluator`, weights are computed on
+        each fold's validation period.
+
+        Parameters
+        ----------
+        sales_df : pd.DataFrame
+            Sales dataframe
+        sell_prices_df : pd.DataFrame
+            Sell prices dataframe
+        calendar_df : pd.DataFrame
+            Calendar dataframe
+        cutoffs : List[int]
+            number of train days of each fold. By default, `BACKTEST_N_FOLDS` consecutive folds
+            ending with the last day of `sales_df`, the last one being the `AccuracyEvaluator` validation period
+        horizon : int
+            Number of validation days of each fold
+        chunk_size : int
+            Number of rows processed at once when computing scaling factors and weights
+        precision : str
+            'double' or 'single', see `AccuracyEvaluator`
+        """
+
+        d_cols = [col for col in sales_df.columns if re.match(r'd_[0-9]+', col)]
+        d_cols = sorted(
+            d_cols,
+            key=lambda elt : int(elt.rsplit('_', 1)[-1]),
+            reverse=False)
+
+        n_days = len(d_cols)
+
+        if cutoffs is None:
+            cutoffs = [n_days - horizon * (BACKTEST_N_FOLDS - k) for k in range(BACKTEST_N_FOLDS)]
+
+        if any(cutoff < 2 or cutoff + horizon > n_days for cutoff in cutoffs):
+            raise ValueError(f"Cutoffs must be in [2, {n_days - horizon}], got {cutoffs}")
+
+        self.cutoffs = list(cutoffs)
+        self.horizon = horizon
+
+        sales_values = sales_df[d_cols].values
+
+        #
+        # 1. shared components
+        #
+
+        rollup = AccuracyEvaluator.__new__(AccuracyEvaluator)
+        rollup.n_agg_levels, rollup.ids, rollup.agg_level_ids, rollup.rollup_matrix = get_rollup_matrix(
+            sales_df
+            )
+        rollup_arrays, rollup_metadata = rollup.get_component_artifacts('rollup')
+        rollup_matrix = rollup.rollup_matrix
+
+        price_cube, price_cube_weeks, day_week_index = get_price_cube(
+            sales_df,
+            sell_prices_df,
+            calendar_df
+            )
+
+        id_df = sales_df[
+            [col for col in sales_df.columns if not re.match(r'd_[0-9]+', col)]
+            ].reset_index(drop=True)
+
+        #
+        # 2. scaling factors and weights of all folds
+        #
+
+        n_series = rollup_matrix.shape[0]
+
+        scaling_factors = np.concatenate([
+            get_scaling_factors_per_cutoff(
+                roll_up(rollup_matrix[chunk_start:chunk_start + chunk_size], sales_values),
+                self.cutoffs
+                )
+            for chunk_start in range(0, n_series, chunk_size)
+            ])
+
+        sales_usd_per_id = get_sales_usd_per_window(
+            sales_values,
+            price_cube,
+            day_week_index,
+            [(cutoff, cutoff + horizon) for cutoff in self.cutoffs],
+            chunk_size=chunk_size
+            )
+        sales_usd = roll_up(rollup_matrix, sales_usd_per_id)
+
+        #
+        # 3. one evaluator per fold
+        #
+
+        self.folds = []
+
+        for k, cutoff in enumerate(self.cutoffs):
+
+            fold = AccuracyEvaluator.__new__(AccuracyEvaluator)
+
+            groundtruth_d_cols = d_cols[cutoff:cutoff + horizon]
+            lookback_d_cols = d_cols[max(cutoff - 2*horizon, 0):cutoff]
+
+            fold.set_component_artifacts('rollup', rollup_arrays, rollup_metadata)
+            fold.id_df = id_df
+            fold.n_validation_days = horizon
+            fold.precision = precision
+            float_dtype = fold.float_dtype
+            fold.groundtruth_d_cols = groundtruth_d_cols
+            fold.lookback_d_cols = lookback_d_cols
+            fold.groundtruth_values = sales_values[:, cutoff:cutoff + horizon]
+            fold.lookback_values = sales_values[:, max(cutoff - 2*horizon, 0):cutoff]
+
+            fold.scaling_factors = scaling_factors[:, k].astype(float_dtype)
+            fold.price_cube = price_cube
+            fold.price_cube_weeks = price_cube_weeks
+            fold.day_week_index = day_week_index
+            fold.sales_usd_per_id = sales_usd_per_id[:, k].astype(float_dtype)
+            fold.sales_usd = sales_usd[:, k].astype(float_dtype)
+            fold.sales_usd_weights = (sales_usd[:, k] / sales_usd[0, k]).astype(float_dtype)
+
+            fold.build_component('rolled_up_values')
+
+            self.folds.append(fold)
+
+    def evaluate(
+        self,
+        predictions_dfs: List[pd.DataFrame]
+    ) -> Tuple:
+        """
+        Compute the WRMSSE of each fold, given one predictions dataframe per fold
+
+        Parameters
+        ----------
+        predictions_dfs : List[pd.DataFrame]
+            Predictions of each fold, for each `id`, in wide format (shape [n_ids, horizon])
+            Expected column
+                id
+
+        Returns
+        -------
+        float
+            WRMSSE, averaged over folds
+        pd.DataFrame
+            results per fold, see `evaluate_from_values`
+        """
+
+        if len(predictions_dfs) != len(self.folds):
+            raise ValueError(f"Expected {len(self.folds)} predictions dataframes, got {len(predictions_dfs)}")
+
+        return self.evaluate_from_values(np.stack([
+            fold.align_values(predictions_df, n_value_columns=self.horizon)
+            for fold, predictions_df in zip(self.folds, predictions_dfs)
+            ]))
+
+    def evaluate_from_values(
+        self,
+        pred_values: np.array
+    ) -> Tuple:
+        """
+        Same as `evaluate`, given values already aligned with the evaluator ids
+
+        Parameters
+        ----------
+        pred_values : np.array
+            Predictions, of shape `(n_folds, n_ids, horizon)`
+
+        Returns
+        -------
+        float
+            WRMSSE, averaged over folds
+        pd.DataFrame
+            results per fold
+                "fold"
+                "cutoff" : number of train days
+                "first_d", "last_d" : validation period
+                "wrmsse"
+                WRMSSE contribution of each aggregation level
+        """
+
+        results = []
+
+        for k, fold in enumerate(self.folds):
+            wrmsse, wrmsse_per_agg_level_df = fold.evaluate_many(pred_values[k:k + 1])
+
+            result = dict(
+                fold=k,
+                cutoff=self.cutoffs[k],
+                first_d=fold.groundtruth_d_cols[0],
+                last_d=fold.groundtruth_d_cols[-1],
+                wrmsse=wrmsse[0]
+            )
+            result.update(wrmsse_per_agg_level_df.iloc[0].to_dict())
+
+            results.append(result)
+
+        results_df = pd.DataFrame(results)
+
+        return results_df['wrmsse'].mean(), results_df
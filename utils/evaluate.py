@@ -1,16 +1,48 @@
+import os
 import re
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy.sparse import csr_matrix
+from scipy.sparse import csc_matrix, csr_matrix
 
+from utils.artifacts import load_artifacts, save_artifacts
 from utils.settings import (
     AGGREGATION_LEVEL_NAMES,
     AGGREGATION_LEVELS,
-    N_VALIDATION_DAYS
+    BOOTSTRAP_BLOCK_SIZE,
+    BOOTSTRAP_CHUNK_SIZE,
+    BOOTSTRAP_CONFIDENCE,
+    BOOTSTRAP_N_REPLICATES,
+    EVALUATE_MANY_CHUNK_SIZE,
+    N_VALIDATION_DAYS,
+    PRECISION
 )
 
+VALUE_COL_PATTERN = r'(F|d_)[0-9]+'
+
+# floating point dtype of each precision, see `PRECISION`
+FLOAT_DTYPES = {
+    'double': np.float64,
+    'single': np.float32,
+}
+
+MAX_REPORTED_IDS = 5
+
+class ValidationError(ValueError):
+
+    def __init__(self, report: dict):
+        """
+        Raised when input values cannot be aligned with the evaluator ids
+
+        Parameters
+        ----------
+        report : dict
+            validation report, see `align_to_ids`
+        """
+        super().__init__(' '.join(report['errors']))
+        self.report = report
+
 def get_rollup_matrix(
     sales_df: pd.DataFrame,
     ) -> csr_matrix:
@@ -18,6 +50,9 @@ def get_rollup_matrix(
     Return a sparse matrix of shape `(n_aggregated_time_series, len(sales_df))`.
     The sparse matrix is made of empty values and ones.
     A value is not null if the associated `id` in `sales_df` is considered is the associated time series
+
+    The matrix is assembled directly from the factorized keys of each aggregation level,
+    so that no dense dummy matrix is ever allocated. `sales_df` is left untouched.
     
     Parameters
     ----------
@@ -28,64 +63,102 @@ def get_rollup_matrix(
     -------
     int
         Number of aggregation levels
-    List[str]
+    np.array
         Sales DataFrame ids
-    List[str] #TODO change type to List[str] in the code
-        Aggregated time series ids
+    pd.DataFrame
+        Aggregated time series ids, with columns `agg_level` and `agg_level_id`
     csr_matrix
         Rollup utils matrix
     """
        
     def _aggregate_ids(df, agg_level):
         """
-        Get the pd.Series of ids reflecting aggregation level
+        Get the np.array of ids reflecting aggregation level
         """
         ids = None
 
         for col in agg_level:
+            values = np.full(len(df), col, dtype=object) if col == "all" else df[col].astype(str).values
             if ids is None:
-                ids = df[col]
+                ids = values
             else:
-                ids = ids + ":" + df[col]
+                ids = ids + ":" + values
         
         return ids
 
-    sales_df["all"] = "all"
+    n_ids = len(sales_df)
+    id_positions = np.arange(n_ids, dtype=np.int32)
 
-    dummies_list = [
-        _aggregate_ids(sales_df, agg_level)
-        for agg_level in AGGREGATION_LEVELS
-        ]
-    
-    # List of dummy dataframes:
-    dummies_df_list = [
-        pd.get_dummies(cats, drop_first=False, dtype=np.int8).T 
-        for cats in dummies_list
-        ]
-    
-    # Concat dummy dataframes in one go:
-    ## Level is constructed for free.
-    roll_mat_df = pd.concat(
-        dummies_df_list, 
-        keys=AGGREGATION_LEVEL_NAMES,
-        names=['agg_level', 'agg_level_id']
-        )
+    row_offset = 0
+    rows_list = []
+    agg_level_list = []
+    agg_level_id_list = []
+
+    for agg_level, agg_level_name in zip(AGGREGATION_LEVELS, AGGREGATION_LEVEL_NAMES):
+        # np.unique sorts the keys, which matches the row order of pd.get_dummies
+        keys, codes = np.unique(_aggregate_ids(sales_df, agg_level), return_inverse=True)
+
+        rows_list.append(row_offset + codes.reshape(-1))
+        agg_level_list.append(np.full(len(keys), agg_level_name, dtype=object))
+        agg_level_id_list.append(keys)
+        row_offset += len(keys)
 
-    n_agg_levels = len(dummies_list)
+    n_agg_levels = len(AGGREGATION_LEVELS)
     ids = sales_df['id'].values
-    agg_level_ids = roll_mat_df.index.to_frame().reset_index(drop=True)
-    roll_mat_csr = csr_matrix(roll_mat_df.values)
+    agg_level_ids = pd.DataFrame({
+        'agg_level': np.concatenate(agg_level_list),
+        'agg_level_id': np.concatenate(agg_level_id_list)
+    })
+
+    rows = np.concatenate(rows_list).astype(np.int32)
+    cols = np.tile(id_positions, n_agg_levels)
+    data = np.ones(len(rows), dtype=np.int8)
+
+    roll_mat_csr = csr_matrix((data, (rows, cols)), shape=(row_offset, n_ids))
 
     return n_agg_levels, ids, agg_level_ids, roll_mat_csr
 
+def roll_up(
+    rollup_matrix: csr_matrix,
+    values: np.array,
+    dtype: np.dtype=None
+    ) -> np.array:
+    """
+    Return `rollup_matrix * values`, computed with at least 64 bits by default.
+    scipy keeps the narrowest common dtype of both operands,
+    which would overflow when summing compact (e.g. int16) sales.
+
+    Parameters
+    ----------
+    rollup_matrix : scipy.sparse.csr_matrix
+        Rollup matrix, see `utils.evaluation.get_rollup_matrix`
+    values : np.array
+        values for each id, of shape `(n_ids,)` or `(n_ids, n_days)`
+    dtype : np.dtype
+        dtype of the product, e.g. np.float32 in single precision (exact for daily unit sales sums below 2**24)
+
+    Returns
+    -------
+    np.array
+        sum-aggregated values
+    """
+
+    if dtype is None:
+        dtype = np.result_type(values.dtype, np.int64)
+
+    # the matrix is copied unless already of `dtype`, see `AccuracyEvaluator.get_rollup_matrix_as`
+    return rollup_matrix.astype(dtype, copy=False) * np.asarray(values).astype(dtype, copy=False)
+
 def get_scaling_factors(
     sales_df: pd.DataFrame,
     rollup_matrix: csr_matrix,
-    n_validation_days : int=N_VALIDATION_DAYS
+    n_validation_days : int=N_VALIDATION_DAYS,
+    chunk_size : int=None,
+    power : int=2
     ) -> np.array:
     """
     Return scaling factors for each aggregated time series.
-    The scaling factors are the MSE for a lag-1 forecast in the train period
+    The scaling factors are the MSE (or MAE, with `power=1`) for a lag-1 forecast in the train period
 
     Parameters
     ----------
@@ -95,6 +168,10 @@ def get_scaling_factors(
         Rollup matrix, see `utils.evaluation.get_rollup_matrix`
     n_validation_days : int
         Number of validation days to remove from the end of the time series
+    chunk_size : int
+        Number of aggregated time series processed at once, all of them by default
+    power : int
+        2 for the mean squared error (accuracy track), 1 for the mean absolute error (uncertainty track)
 
     Returns
     -------
@@ -108,40 +185,144 @@ def get_scaling_factors(
         key=lambda elt : int(elt.rsplit('_', 1)[-1]),
         reverse=False
         )[:-n_validation_days]
-    n_days = len(d_cols)
 
     sales_values = sales_df[d_cols].values
-    sales_values_agg = rollup_matrix * sales_values
-
-    # find sales start index for each aggregation
-    start_index_per_ts = np.argmax(sales_values_agg>0, axis=1)
-
-    # replace days less than min day number with np.nan
-    # important, so that the diff from 0 to the first non-zero value is not counted
-    # in np.nansum
-    shape_sales_values_agg = sales_values_agg.shape
-    flag = np.dot(
-        np.diag(1/(start_index_per_ts+1)),
-        np.tile(
-            np.arange(1, sales_values_agg.shape[1] + 1),
-            (sales_values_agg.shape[0],1)
+
+    n_series = rollup_matrix.shape[0]
+    if chunk_size is None:
+        chunk_size = max(n_series, 1)
+
+    # roll up and scale by chunks of aggregated time series
+    scaling_factors = np.concatenate([
+        get_scaling_factors_from_values(
+            roll_up(rollup_matrix[chunk_start:chunk_start + chunk_size], sales_values),
+            power=power
             )
-        ) < 1
-    sales_values_agg = np.where(flag, np.nan, sales_values_agg)
+        for chunk_start in range(0, n_series, chunk_size)
+        ])
+
+    return scaling_factors
+
+def get_scaling_factors_from_values(
+    sales_values_agg: np.array,
+    chunk_size: int=None,
+    power: int=2
+    ) -> np.array:
+    """
+    Return the lag-1 MSE (or MAE, with `power=1`) of each row of `sales_values_agg`,
+    ignoring the days before the first non-zero value of the row.
+
+    Memory is `O(chunk_size x n_days)`: rows are processed by chunks of `chunk_size`.
+
+    Parameters
+    ----------
+    sales_values_agg : np.array
+        aggregated sales, of shape `(n_aggregated_time_series, n_days)`
+    chunk_size : int
+        Number of rows processed at once, all rows by default
+    power : int
+        exponent of the absolute diffs
+
+    Returns
+    -------
+    np.array
+        scaling factors for each row
+    """
+
+    n_series, n_days = sales_values_agg.shape
+
+    if chunk_size is None:
+        chunk_size = max(n_series, 1)
+
+    scaling_factors = np.empty(n_series, dtype=np.float64)
+    day_index = np.arange(n_days - 1)
+
+    for chunk_start in range(0, n_series, chunk_size):
+        values = sales_values_agg[chunk_start:chunk_start + chunk_size]
+
+        # find sales start index for each aggregation
+        start_index_per_ts = np.argmax(values > 0, axis=1)
+
+        # only count the diffs starting from the first non-zero value,
+        # so that the diff from 0 to the first non-zero value is not counted
+        abs_diffs = np.abs(np.diff(values, axis=1).astype(np.float64))**power
+        abs_diffs[day_index[None, :] < start_index_per_ts[:, None]] = 0
+
+        scaling_factors[chunk_start:chunk_start + chunk_size] = np.sum(
+            abs_diffs,
+            axis=1
+            ) / (n_days - 1 - start_index_per_ts)
 
-    scaling_factors = np.nansum(
-        np.diff(sales_values_agg, axis=1)**2,
-        axis=1
-        ) / (n_days - 1 - start_index_per_ts)
-    
     return scaling_factors
 
+def get_price_cube(
+    sales_df : pd.DataFrame,
+    sell_prices_df : pd.DataFrame,
+    calendar_df : pd.DataFrame
+) -> Tuple:
+    """
+    Return a dense lookup of sell prices, with one row per `id` of `sales_df`
+    and one column per `wm_yr_wk` of `calendar_df`, and the day to week index vector.
+    Missing prices are set to np.nan.
+
+    Parameters
+    ----------
+    sales_df : pd.DataFrame
+        Sales dataframe
+    sell_prices_df : pd.DataFrame
+        Sell prices dataframe
+    calendar_df : pd.DataFrame
+        Calendar dataframe
+
+    Returns
+    -------
+    np.array
+        sell prices, of shape `(len(sales_df), n_weeks)`
+    np.array
+        `wm_yr_wk` value of each column of the price cube
+    np.array
+        column index in the price cube for each `d_*` column of `sales_df`, in day order
+    """
+
+    weeks = np.unique(calendar_df['wm_yr_wk'].values)
+
+    item_store_index = pd.MultiIndex.from_arrays(
+        [sales_df['item_id'].values, sales_df['store_id'].values]
+        )
+
+    rows = item_store_index.get_indexer(
+        pd.MultiIndex.from_arrays(
+            [sell_prices_df['item_id'].values, sell_prices_df['store_id'].values]
+            )
+        )
+    cols = np.searchsorted(weeks, sell_prices_df['wm_yr_wk'].values)
+
+    # drop prices of item-store pairs or weeks unknown to sales_df and calendar_df
+    known = (rows >= 0) & (cols < len(weeks))
+    known[known] = weeks[cols[known]] == sell_prices_df['wm_yr_wk'].values[known]
+
+    price_cube = np.full((len(sales_df), len(weeks)), np.nan)
+    price_cube[rows[known], cols[known]] = sell_prices_df['sell_price'].values[known]
+
+    d_cols = [col for col in sales_df.columns if re.match(r'd_[0-9]+', col)]
+    d_cols = sorted(
+        d_cols, 
+        key=lambda elt : int(elt.rsplit('_', 1)[-1]),
+        reverse=False
+        )
+
+    week_per_day = calendar_df.set_index('d')['wm_yr_wk'].loc[d_cols].values
+    day_week_index = np.searchsorted(weeks, week_per_day)
+
+    return price_cube, weeks, day_week_index
+
 def get_sales_usd_weights(
     sales_df : pd.DataFrame,
     sell_prices_df : pd.DataFrame,
     calendar_df : pd.DataFrame,
     rollup_matrix : csr_matrix,
-    n_validation_days : int=N_VALIDATION_DAYS
+    n_validation_days : int=N_VALIDATION_DAYS,
+    price_cube : Tuple=None
 ) -> Tuple:
     """
     Return weight factor for each aggregated time series.
@@ -160,6 +341,8 @@ def get_sales_usd_weights(
         Rollup matrix, see `utils.evaluation.get_rollup_matrix`
     n_validation_days : int
         Number of validation days to remove from the end of the time series
+    price_cube : Tuple
+        Output of `get_price_cube`, computed from the other arguments if not provided
 
     Returns
     -------
@@ -171,74 +354,208 @@ def get_sales_usd_weights(
         weight factors for each of the aggregated time series
     """
 
-    #
-    # 1. merge sales table with calendar table
-    #
+    if price_cube is None:
+        price_cube = get_price_cube(sales_df, sell_prices_df, calendar_df)
+
+    prices, _, day_week_index = price_cube
 
     d_cols = [col for col in sales_df.columns if re.match(r'd_[0-9]+', col)]
     d_cols = sorted(
         d_cols, 
         key=lambda elt : int(elt.rsplit('_', 1)[-1]),
         reverse=False
-        )[-n_validation_days:]
-
-    sales_melt_df = pd.melt(
-        sales_df,
-        id_vars=['id', 'item_id', 'store_id'],
-        value_vars=d_cols,
-        var_name='d',
-        value_name='sales'
-    )
-
-    sales_melt_df = pd.merge(
-        sales_melt_df,
-        calendar_df[['wm_yr_wk', 'd']],
-        on='d',
-        validate='m:1'
-    )
+        )
 
-    #
-    # 2. merge sales table with sell prices table
-    #
+    return get_sales_usd_weights_from_price_cube(
+        sales_df[d_cols[-n_validation_days:]].values,
+        prices,
+        day_week_index[-n_validation_days:],
+        rollup_matrix
+        )
 
-    sales_melt_df = sales_melt_df.merge(
-        sell_prices_df,
-        on=['store_id', 'item_id', 'wm_yr_wk'],
-        validate='m:1'
-    )
+def get_sales_usd_weights_from_price_cube(
+    sales_values : np.array,
+    prices : np.array,
+    day_week_index : np.array,
+    rollup_matrix : csr_matrix
+) -> Tuple:
+    """
+    Return weight factor for each aggregated time series,
+    given sales values over a window of days and the matching price cube columns
 
-    #
-    # 3. compute daily sales per id
-    #
+    Parameters
+    ----------
+    sales_values : np.array
+        sales of shape `(n_ids, n_days)`
+    prices : np.array
+        price cube of shape `(n_ids, n_weeks)`, see `get_price_cube`
+    day_week_index : np.array
+        price cube column index for each of the `n_days` days
+    rollup_matrix : scipy.sparse.csr_matrix
+        Rollup matrix, see `utils.evaluation.get_rollup_matrix`
 
-    sales_melt_df['sales_usd'] = sales_melt_df['sales'] * sales_melt_df['sell_price']
+    Returns
+    -------
+    np.array
+        cumulative USD sales for each id
+    np.array
+        cumulative USD sales for each of the aggregated time series
+    np.array
+        weight factors for each of the aggregated time series
+    """
 
-    # Calculate the total sales in USD for each id:
-    total_sales_usd_per_id = sales_melt_df. \
-        groupby(['id'], sort=False)['sales_usd']. \
-        apply(np.sum).values
+    # days without a sell price do not generate USD sales
+    total_sales_usd_per_id = np.nansum(
+        sales_values * prices[:, day_week_index],
+        axis=1
+        )
     
     # Roll up total sales by ids to higher levels:
-    total_sales_usd_per_agg_level_id = rollup_matrix * total_sales_usd_per_id.reshape(-1)
+    total_sales_usd_per_agg_level_id = roll_up(rollup_matrix, total_sales_usd_per_id.reshape(-1))
 
     return total_sales_usd_per_id, total_sales_usd_per_agg_level_id, total_sales_usd_per_agg_level_id / total_sales_usd_per_agg_level_id[0]
 
+def align_to_ids(
+    ids : np.array,
+    id_index : pd.Index,
+    df : pd.DataFrame,
+    n_value_columns : int=None
+) -> Tuple:
+    """
+    Align the values of `df` with `ids` in one vectorized lookup,
+    and validate its schema in the same pass
+
+    Parameters
+    ----------
+    ids : np.array
+        expected ids, in row order
+    id_index : pd.Index
+        `pd.Index(ids)`, whose hash table is built once and reused across calls
+    df : pd.DataFrame
+        Values for each `id`, in wide format
+        Expected columns
+            id
+            F1, F2... or d_1, d_2...
+    n_value_columns : int
+        expected number of value columns, not checked if None
+
+    Returns
+    -------
+    np.array
+        values, of shape `(len(ids), n_value_columns)`, rows in the order of `ids`.
+        None if the report has errors
+    dict
+        validation report
+            n_missing_ids, missing_ids : expected ids absent from `df` (first ones only)
+            n_unknown_ids, unknown_ids : ids of `df` not in `ids`, ignored
+            n_duplicate_ids, duplicate_ids : expected ids present several times in `df`
+            value_columns : `F*` / `d_*` columns found
+            n_value_columns, expected_n_value_columns
+            non_numeric_columns : value columns with non-numeric values
+            errors : human-readable error messages, empty if valid
+    """
+
+    value_cols = [col for col in df.columns if re.fullmatch(VALUE_COL_PATTERN, str(col))]
+
+    report = dict(
+        n_missing_ids=0,
+        missing_ids=[],
+        n_unknown_ids=0,
+        unknown_ids=[],
+        n_duplicate_ids=0,
+        duplicate_ids=[],
+        value_columns=value_cols,
+        n_value_columns=len(value_cols),
+        expected_n_value_columns=n_value_columns,
+        non_numeric_columns=[],
+        errors=[]
+    )
+
+    if 'id' not in df.columns:
+        report['errors'].append("Missing `id` column.")
+        return None, report
+
+    df_ids = df['id'].values
+    positions = id_index.get_indexer(df_ids)
+
+    known = positions >= 0
+    counts = np.bincount(positions[known], minlength=len(ids))
+
+    missing = np.flatnonzero(counts == 0)
+    duplicates = np.flatnonzero(counts > 1)
+    unknown = df_ids[~known]
+
+    report.update(
+        n_missing_ids=len(missing),
+        missing_ids=[str(elt) for elt in ids[missing[:MAX_REPORTED_IDS]]],
+        n_unknown_ids=len(unknown),
+        unknown_ids=[str(elt) for elt in unknown[:MAX_REPORTED_IDS]],
+        n_duplicate_ids=len(duplicates),
+        duplicate_ids=[str(elt) for elt in ids[duplicates[:MAX_REPORTED_IDS]]],
+        non_numeric_columns=[
+            col for col in value_cols if not pd.api.types.is_numeric_dtype(df[col])
+        ]
+    )
+
+    if report['n_missing_ids'] > 0:
+        report['errors'].append(
+            f"{report['n_missing_ids']} missing ids, e.g. {', '.join(report['missing_ids'])}."
+        )
+    if report['n_duplicate_ids'] > 0:
+        report['errors'].append(
+            f"{report['n_duplicate_ids']} duplicate ids, e.g. {', '.join(report['duplicate_ids'])}."
+        )
+    if n_value_columns is not None and len(value_cols) != n_value_columns:
+        report['errors'].append(
+            f"Expected {n_value_columns} F*/d_* columns, found {len(value_cols)}."
+        )
+    if len(report['non_numeric_columns']) > 0:
+        report['errors'].append(
+            f"Non-numeric columns: {', '.join(report['non_numeric_columns'])}."
+        )
+
+    if len(report['errors']) > 0:
+        return None, report
+
+    values = np.empty((len(ids), len(value_cols)), dtype=np.float64)
+    values[positions[known]] = df[value_cols].values[known]
+
+    return values, report
+
 class AccuracyEvaluator(object):
 
+    # Pre-computed components, in build order.
+    # Each component is persisted in its own artifacts sub-directory, and depends on
+    #   inputs : input dataframes it is computed from
+    #   upstream : components it is computed from
+    #   settings : settings it is computed with
+    COMPONENTS = [
+        dict(name='rollup', inputs=['sales_df'], upstream=[], settings=['aggregation_levels']),
+        dict(name='values', inputs=['sales_df'], upstream=[], settings=['n_validation_days', 'precision']),
+        dict(name='scaling', inputs=['sales_df'], upstream=['rollup'], settings=['n_validation_days', 'precision']),
+        dict(name='abs_scaling', inputs=['sales_df'], upstream=['rollup'], settings=['n_validation_days', 'precision']),
+        dict(name='prices', inputs=['sales_df', 'sell_prices_df', 'calendar_df'], upstream=[], settings=['precision']),
+        dict(name='weights', inputs=['sales_df'], upstream=['rollup', 'prices'], settings=['n_validation_days', 'precision']),
+        dict(name='rolled_up_values', inputs=[], upstream=['rollup', 'values'], settings=[]),
+    ]
+
     def __init__(
         self, 
         sales_df: pd.DataFrame,
         sell_prices_df: pd.DataFrame, 
         calendar_df: pd.DataFrame, 
-        n_validation_days: int = N_VALIDATION_DAYS):
+        n_validation_days: int = N_VALIDATION_DAYS,
+        precision: str = PRECISION):
         """
         Initiate the AccuracyEvaluator with all provided data and validation number of days.
         Pre-computes
             the rollup matrix
-            Lag1 MSE scale factors
-            USD sales weight factors
             groundtruth values on the validation time range
             lookback values close to the cut-off train/validation date
+            Lag1 MSE scale factors, and Lag1 MAE scale factors for the uncertainty track
+            the sell price cube
+            USD sales weight factors
+            rolled-up groundtruth and lookback values
 
         Parameters
         ----------
@@ -250,38 +567,441 @@ class AccuracyEvaluator(object):
             Calendar dataframe
         n_validation_days : int
             Number of validation days to remove from the end of the time series
+        precision : str
+            'double' or 'single', floating point precision of pre-computed arrays, predictions and residuals
         """
 
-        self.sales_df = sales_df
-
         self.n_validation_days = n_validation_days
-            
-        self.n_agg_levels, self.ids, self.agg_level_ids, self.rollup_matrix = get_rollup_matrix(
-            sales_df
+        self.precision = precision
+
+        inputs = dict(
+            sales_df=sales_df,
+            sell_prices_df=sell_prices_df,
+            calendar_df=calendar_df
+        )
+
+        for component in self.COMPONENTS:
+            self.build_component(
+                component['name'],
+                **{name : inputs[name] for name in component['inputs']}
             )
+
+    def build_component(
+        self,
+        name : str,
+        sales_df : pd.DataFrame=None,
+        sell_prices_df : pd.DataFrame=None,
+        calendar_df : pd.DataFrame=None
+    ):
+        """
+        Compute one of `COMPONENTS`, given its inputs.
+        Its upstream components must already be set.
+
+        Parameters
+        ----------
+        name : str
+            component name
+        sales_df : pd.DataFrame
+            Sales dataframe
+        sell_prices_df : pd.DataFrame
+            Sell prices dataframe
+        calendar_df : pd.DataFrame
+            Calendar dataframe
+        """
+
+        if name == 'rollup':
+            self.n_agg_levels, self.ids, self.agg_level_ids, self.rollup_matrix = get_rollup_matrix(
+                sales_df
+                )
+            # id -> row hash index, for alignment of input values
+            self.id_index = pd.Index(self.ids)
+            self._rollup_matrix_csc = None
+            self._rollup_matrices = {}
+
+        elif name == 'values':
+            # row identifier columns, without sales values
+            self.id_df = sales_df[
+                [col for col in sales_df.columns if not re.match(r'd_[0-9]+', col)]
+                ].reset_index(drop=True)
+
+            d_cols = [col for col in sales_df.columns if re.match(r'd_[0-9]+', col)]
+            d_cols = sorted(
+                d_cols, 
+                key=lambda elt : int(elt.rsplit('_', 1)[-1]),
+                reverse=False) 
             
-        self.scaling_factors = get_scaling_factors(
-            sales_df, 
-            self.rollup_matrix,
-            n_validation_days=self.n_validation_days
+            self.groundtruth_d_cols = d_cols[-self.n_validation_days:]
+            self.lookback_d_cols = d_cols[-3*self.n_validation_days:-self.n_validation_days]
+
+            self.groundtruth_values = sales_df[self.groundtruth_d_cols].values
+            self.lookback_values = sales_df[self.lookback_d_cols].values
+
+        elif name == 'scaling':
+            self.scaling_factors = get_scaling_factors(
+                sales_df, 
+                self.rollup_matrix,
+                n_validation_days=self.n_validation_days
+                ).astype(self.float_dtype)
+
+        elif name == 'abs_scaling':
+            self.abs_scaling_factors = get_scaling_factors(
+                sales_df, 
+                self.rollup_matrix,
+                n_validation_days=self.n_validation_days,
+                power=1
+                ).astype(self.float_dtype)
+
+        elif name == 'prices':
+            self.price_cube, self.price_cube_weeks, self.day_week_index = get_price_cube(
+                sales_df,
+                sell_prices_df,
+                calendar_df
+                )
+            self.price_cube = self.price_cube.astype(self.float_dtype)
+
+        elif name == 'weights':
+            self.sales_usd_per_id, self.sales_usd, self.sales_usd_weights = get_sales_usd_weights(
+                sales_df,
+                sell_prices_df,
+                calendar_df,
+                self.rollup_matrix,
+                n_validation_days=self.n_validation_days,
+                price_cube=(self.price_cube, self.price_cube_weeks, self.day_week_index)
+                )
+            self.sales_usd_per_id = self.sales_usd_per_id.astype(self.float_dtype)
+            self.sales_usd = self.sales_usd.astype(self.float_dtype)
+            self.sales_usd_weights = self.sales_usd_weights.astype(self.float_dtype)
+
+        elif name == 'rolled_up_values':
+            self.rolled_up_groundtruth_values = roll_up(self.rollup_matrix, self.groundtruth_values, self.float_dtype)
+            self.rolled_up_lookback_values = roll_up(self.rollup_matrix, self.lookback_values, self.float_dtype)
+
+        else:
+            raise ValueError(f"Unknown component `{name}`")
+
+    def get_component_artifacts(
+        self,
+        name : str
+    ) -> Tuple:
+        """
+        Return arrays and metadata of one of `COMPONENTS`, see `utils.artifacts.save_artifacts`
+
+        Parameters
+        ----------
+        name : str
+            component name
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            arrays, by name
+        dict
+            metadata
+        """
+
+        if name == 'rollup':
+            arrays = dict(
+                ids=self.ids,
+                agg_level=self.agg_level_ids['agg_level'].values,
+                agg_level_id=self.agg_level_ids['agg_level_id'].values,
+                rollup_data=self.rollup_matrix.data,
+                rollup_indices=self.rollup_matrix.indices,
+                rollup_indptr=self.rollup_matrix.indptr,
+            )
+            metadata = dict(
+                n_agg_levels=self.n_agg_levels,
+                rollup_shape=list(self.rollup_matrix.shape),
             )
 
-        self.sales_usd_per_id, self.sales_usd, self.sales_usd_weights = get_sales_usd_weights(
-            sales_df,
-            sell_prices_df,
-            calendar_df,
-            self.rollup_matrix,
-            n_validation_days=self.n_validation_days
+        elif name == 'values':
+            arrays = dict(
+                groundtruth_values=self.groundtruth_values,
+                lookback_values=self.lookback_values,
             )
-            
-        d_cols = [col for col in sales_df.columns if re.match(r'd_[0-9]+', col)]
-        d_cols = sorted(
-            d_cols, 
-            key=lambda elt : int(elt.rsplit('_', 1)[-1]),
-            reverse=False) 
-        
-        self.groundtruth_df = sales_df.set_index(['id'])[d_cols[-self.n_validation_days:]].reset_index()
-        self.lookback_df = sales_df.set_index(['id'])[d_cols[-3*self.n_validation_days:-self.n_validation_days]].reset_index()
+            arrays.update({
+                'id_df.' + col : self.id_df[col].values for col in self.id_df.columns
+            })
+            metadata = dict(
+                n_validation_days=self.n_validation_days,
+                precision=self.precision,
+                id_cols=list(self.id_df.columns),
+                groundtruth_d_cols=list(self.groundtruth_d_cols),
+                lookback_d_cols=list(self.lookback_d_cols),
+            )
+
+        elif name == 'scaling':
+            arrays = dict(
+                scaling_factors=self.scaling_factors,
+            )
+            metadata = {}
+
+        elif name == 'abs_scaling':
+            arrays = dict(
+                abs_scaling_factors=self.abs_scaling_factors,
+            )
+            metadata = {}
+
+        elif name == 'prices':
+            arrays = dict(
+                price_cube=self.price_cube,
+                price_cube_weeks=self.price_cube_weeks,
+                day_week_index=self.day_week_index,
+            )
+            metadata = {}
+
+        elif name == 'weights':
+            arrays = dict(
+                sales_usd_per_id=self.sales_usd_per_id,
+                sales_usd=self.sales_usd,
+                sales_usd_weights=self.sales_usd_weights,
+            )
+            metadata = {}
+
+        elif name == 'rolled_up_values':
+            arrays = dict(
+                rolled_up_groundtruth_values=self.rolled_up_groundtruth_values,
+                rolled_up_lookback_values=self.rolled_up_lookback_values,
+            )
+            metadata = {}
+
+        else:
+            raise ValueError(f"Unknown component `{name}`")
+
+        return arrays, metadata
+
+    def set_component_artifacts(
+        self,
+        name : str,
+        arrays : dict,
+        metadata : dict
+    ):
+        """
+        Set one of `COMPONENTS` from arrays and metadata returned by `get_component_artifacts`
+
+        Parameters
+        ----------
+        name : str
+            component name
+        arrays : Dict[str, np.ndarray]
+            arrays, by name
+        metadata : dict
+            metadata
+        """
+
+        if name == 'rollup':
+            self.n_agg_levels = metadata['n_agg_levels']
+            self.ids = arrays['ids']
+            self.agg_level_ids = pd.DataFrame({
+                'agg_level': arrays['agg_level'],
+                'agg_level_id': arrays['agg_level_id']
+            })
+            self.rollup_matrix = csr_matrix(
+                (arrays['rollup_data'], arrays['rollup_indices'], arrays['rollup_indptr']),
+                shape=tuple(metadata['rollup_shape'])
+            )
+            self.id_index = pd.Index(np.asarray(self.ids))
+            self._rollup_matrix_csc = None
+            self._rollup_matrices = {}
+
+        elif name == 'values':
+            self.n_validation_days = metadata['n_validation_days']
+            self.precision = metadata['precision']
+            self.id_df = pd.DataFrame({
+                col : arrays['id_df.' + col] for col in metadata['id_cols']
+            })
+            self.groundtruth_d_cols = metadata['groundtruth_d_cols']
+            self.lookback_d_cols = metadata['lookback_d_cols']
+            self.groundtruth_values = arrays['groundtruth_values']
+            self.lookback_values = arrays['lookback_values']
+
+        elif name in ['scaling', 'abs_scaling', 'prices', 'weights', 'rolled_up_values']:
+            for array_name, array in arrays.items():
+                setattr(self, array_name, array)
+
+        else:
+            raise ValueError(f"Unknown component `{name}`")
+
+    def get_rolled_up_groundtruth(
+        self,
+        index : np.array=None
+    ) -> np.array:
+        """
+        Return pre-computed rolled-up groundtruth values
+
+        Parameters
+        ----------
+        index : np.array
+            row indices of the aggregated time series to return, in `self.agg_level_ids`. All of them by default
+
+        Returns
+        -------
+        np.array
+            rolled-up groundtruth values, of shape `(len(index), n_validation_days)`
+        """
+
+        if index is None:
+            return self.rolled_up_groundtruth_values
+
+        return self.rolled_up_groundtruth_values[index]
+
+    def get_rolled_up_lookback(
+        self,
+        index : np.array=None
+    ) -> np.array:
+        """
+        Return pre-computed rolled-up lookback values
+
+        Parameters
+        ----------
+        index : np.array
+            row indices of the aggregated time series to return, in `self.agg_level_ids`. All of them by default
+
+        Returns
+        -------
+        np.array
+            rolled-up lookback values, of shape `(len(index), 2*n_validation_days)`
+        """
+
+        if index is None:
+            return self.rolled_up_lookback_values
+
+        return self.rolled_up_lookback_values[index]
+
+    @property
+    def groundtruth_df(self) -> pd.DataFrame:
+        """
+        Groundtruth values on the validation time range, in wide format
+        """
+        return self._values_to_df(self.groundtruth_values, self.groundtruth_d_cols)
+
+    @property
+    def lookback_df(self) -> pd.DataFrame:
+        """
+        Lookback values close to the cut-off train/validation date, in wide format
+        """
+        return self._values_to_df(self.lookback_values, self.lookback_d_cols)
+
+    def _values_to_df(
+        self,
+        values : np.array,
+        d_cols : List[str]
+    ) -> pd.DataFrame:
+
+        df = pd.DataFrame(np.asarray(values), columns=d_cols)
+        df.insert(0, 'id', self.ids)
+
+        return df
+
+    def save(
+        self,
+        directory : str
+    ):
+        """
+        Save the evaluator as memory-mappable artifacts, one sub-directory per component.
+        See `utils.artifacts.save_artifacts`
+
+        Parameters
+        ----------
+        directory : str
+            Artifacts directory
+        """
+
+        for component in self.COMPONENTS:
+            arrays, metadata = self.get_component_artifacts(component['name'])
+            save_artifacts(
+                os.path.join(directory, component['name']),
+                arrays,
+                metadata
+            )
+
+    @classmethod
+    def load(
+        cls,
+        directory : str,
+        mmap_mode : str='r'
+    ) -> 'AccuracyEvaluator':
+        """
+        Load an evaluator saved with `AccuracyEvaluator.save`, without recomputing anything
+
+        Parameters
+        ----------
+        directory : str
+            Artifacts directory
+        mmap_mode : str
+            np.load mmap_mode, read-only memory map by default
+
+        Returns
+        -------
+        AccuracyEvaluator
+            loaded evaluator
+        """
+
+        evaluator = cls.__new__(cls)
+
+        for component in cls.COMPONENTS:
+            arrays, metadata = load_artifacts(
+                os.path.join(directory, component['name']),
+                mmap_mode=mmap_mode
+            )
+            evaluator.set_component_artifacts(component['name'], arrays, metadata)
+
+        return evaluator
+
+    def validate_and_align(
+        self,
+        df : pd.DataFrame,
+        n_value_columns : int=None
+    ) -> Tuple:
+        """
+        Align the values of `df` with `self.ids`, and validate its schema, see `align_to_ids`
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Values for each `id`, in wide format
+        n_value_columns : int
+            expected number of value columns, not checked if None
+
+        Returns
+        -------
+        np.array
+            values, of shape `(len(self.ids), n_value_columns)`. None if the report has errors
+        dict
+            validation report
+        """
+
+        return align_to_ids(self.ids, self.id_index, df, n_value_columns=n_value_columns)
+
+    def align_values(
+        self,
+        df : pd.DataFrame,
+        n_value_columns : int=None
+    ) -> np.array:
+        """
+        Return the values of `df`, with rows in the order of `self.ids`.
+        Raises a `ValidationError` if they cannot be aligned, see `validate_and_align`
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Values for each `id`, in wide format
+            Expected column
+                id
+        n_value_columns : int
+            expected number of value columns, not checked if None
+
+        Returns
+        -------
+        np.array
+            values, of shape `(len(self.ids), n_value_columns)`
+        """
+
+        values, report = self.validate_and_align(df, n_value_columns=n_value_columns)
+
+        if values is None:
+            raise ValidationError(report)
+
+        return values.astype(self.float_dtype, copy=False)
 
     def get_rolled_up_values(
         self,
@@ -302,9 +1022,9 @@ class AccuracyEvaluator(object):
         np.array
             sum-aggregated values
         """
-        values = df.set_index(['id']).loc[self.ids].values
+        values = self.align_values(df)
 
-        rolled_up_values = self.rollup_matrix * values
+        rolled_up_values = roll_up(self.get_rollup_matrix_as(np.result_type(values.dtype, np.int64)), values)
 
         return rolled_up_values
 
@@ -322,7 +1042,7 @@ class AccuracyEvaluator(object):
             Predictions for each `id`, in wide format (shape [n_ids, n_prediction_dates])
             Expected column
                 id
-        predictions_df : pd.DataFrame
+        groundtruth_df : pd.DataFrame
             Groundtruth for each `id`, in wide format (shape [n_ids, n_prediction_dates])
             Expected column
                 id
@@ -334,17 +1054,21 @@ class AccuracyEvaluator(object):
         """
 
         if groundtruth_df is None:
-            groundtruth_df = self.groundtruth_df
-
-        pred_values = predictions_df.set_index(['id']).loc[self.ids].values
-        gt_values = groundtruth_df.set_index(['id']).loc[self.ids].values
+            gt_values = self.rolled_up_groundtruth_values
+        else:
+            gt_values = roll_up(self.get_rollup_matrix_as(self.float_dtype), self.align_values(groundtruth_df), self.float_dtype)
 
-        pred_values = self.rollup_matrix * pred_values
-        gt_values = self.rollup_matrix * gt_values
+        pred_values = roll_up(
+            self.get_rollup_matrix_as(self.float_dtype),
+            self.align_values(predictions_df, n_value_columns=self.n_validation_days),
+            self.float_dtype
+            )
 
+        # squared errors are summed in double precision, whatever `self.precision`
         mse_per_agg_level_id = np.mean(
             (pred_values - gt_values)**2,
-            axis=1
+            axis=1,
+            dtype=np.float64
             ).reshape(-1)
 
         rmsse_per_agg_level_id= np.sqrt(
@@ -371,7 +1095,7 @@ class AccuracyEvaluator(object):
             Predictions for each `id`, in wide format (shape [n_ids, n_prediction_dates])
             Expected column
                 id
-        predictions_df : pd.DataFrame
+        groundtruth_df : pd.DataFrame
             Groundtruth for each `id`, in wide format (shape [n_ids, n_prediction_dates])
             Expected column
                 id
@@ -389,30 +1113,383 @@ class AccuracyEvaluator(object):
                 "sales_usd_weight"
                 "wrmsse"
         """
+
         if groundtruth_df is None:
-            groundtruth_df = self.groundtruth_df
+            gt_values = None
+        else:
+            gt_values = self.align_values(groundtruth_df)
+
+        return self.evaluate_detailed_from_values(
+            self.align_values(predictions_df, n_value_columns=self.n_validation_days),
+            gt_values
+        )
+
+    def evaluate_detailed_from_values(
+        self,
+        pred_values: np.array,
+        gt_values: np.array=None
+    ) -> Tuple:
+        """
+        Same as `evaluate_detailed`, given values already aligned with `self.ids`
+
+        Parameters
+        ----------
+        pred_values : np.array
+            Predictions, of shape `(len(self.ids), n_prediction_dates)`
+        gt_values : np.array
+            Groundtruth, of shape `(len(self.ids), n_prediction_dates)`, `self.groundtruth_values` by default
+
+        Returns
+        -------
+        float
+            WRMSSE
+        np.array
+            residuals for each aggregated time series (for each `agg_level_id` in `self.agg_level_ids`)
+        pd.DataFrame
+            full results per `agg_level_id`, see `evaluate_detailed`
+        """
+
+        if gt_values is None:
+            gt_values = self.rolled_up_groundtruth_values
+        else:
+            gt_values = roll_up(self.get_rollup_matrix_as(self.float_dtype), gt_values, self.float_dtype)
 
-        pred_values = self.get_rolled_up_values(predictions_df)
-        gt_values = self.get_rolled_up_values(groundtruth_df)
+        pred_values = roll_up(self.get_rollup_matrix_as(self.float_dtype), pred_values, self.float_dtype)
 
         residuals_per_agg_level_id = pred_values - gt_values
 
         mse_per_agg_level_id = np.mean(
             (residuals_per_agg_level_id)**2,
-            axis=1
+            axis=1,
+            dtype=np.float64
             ).reshape(-1)
 
         rmsse_per_agg_level_id= np.sqrt(
             mse_per_agg_level_id / self.scaling_factors
             )
             
-        results_per_agg_df = self.agg_level_ids.copy()
+        results_per_agg_df = self._get_results_df(rmsse_per_agg_level_id)
+
+        wrmsse = results_per_agg_df['wrmsse'].sum()
+
+        return wrmsse, residuals_per_agg_level_id, results_per_agg_df
+
+    def evaluate_detailed_delta(
+        self,
+        residuals: np.array,
+        rmsse: np.array,
+        rows: np.array,
+        previous_values: np.array,
+        values: np.array
+    ) -> Tuple:
+        """
+        Update a previous `evaluate_detailed_from_values` result, when only the predictions of some ids change.
+
+        The rolled-up change of predictions is the product of the rollup matrix columns of the changed ids,
+        about one non-zero per aggregation level and id, with the change of their predictions.
+        Only the residual rows of the aggregated time series these ids roll up to are updated,
+        and their RMSSE recomputed from the updated residuals, in double precision:
+        rounding errors of chained updates stay at the level of the residuals precision, see `self.precision`.
+
+        Inputs are not modified, and may be read-only.
+
+        Parameters
+        ----------
+        residuals : np.array
+            Previous residuals, as returned by `evaluate_detailed_from_values`
+        rmsse : np.array
+            Previous RMSSE of each aggregated time series, column "rmsse" of the previous results
+        rows : np.array
+            rows of the changed ids, in `self.ids`
+        previous_values : np.array
+            previous predictions of the changed ids, of shape `(len(rows), n_prediction_dates)`
+        values : np.array
+            new predictions of the changed ids, of shape `(len(rows), n_prediction_dates)`
+
+        Returns
+        -------
+        float
+            WRMSSE
+        np.array
+            updated residuals
+        pd.DataFrame
+            full results per `agg_level_id`, see `evaluate_detailed`
+        """
+
+        rows = np.asarray(rows)
+
+        # columns of the changed ids: their non-zero rows are the affected aggregated time series
+        columns = self.rollup_matrix_csc[:, rows].tocsr()
+        affected = np.flatnonzero(np.diff(columns.indptr))
+
+        delta = roll_up(
+            columns[affected],
+            np.asarray(values, dtype=np.float64) - np.asarray(previous_values, dtype=np.float64),
+            np.float64
+            )
+
+        residuals = np.array(residuals, dtype=self.float_dtype)
+        residuals[affected] = residuals[affected] + delta
+
+        rmsse = np.array(rmsse, dtype=np.float64)
+        rmsse[affected] = np.sqrt(
+            np.mean(np.square(residuals[affected], dtype=np.float64), axis=1) / self.scaling_factors[affected]
+            )
+
+        results_per_agg_df = self._get_results_df(rmsse)
+
+        wrmsse = results_per_agg_df['wrmsse'].sum()
+
+        return wrmsse, residuals, results_per_agg_df
+
+    def bootstrap(
+        self,
+        residuals: np.array,
+        resample: str='days',
+        n_replicates: int=BOOTSTRAP_N_REPLICATES,
+        block_size: int=BOOTSTRAP_BLOCK_SIZE,
+        confidence: float=BOOTSTRAP_CONFIDENCE,
+        seed: int=0,
+        chunk_size: int=BOOTSTRAP_CHUNK_SIZE
+    ) -> dict:
+        """
+        Bootstrap confidence interval of the WRMSSE, given the residuals returned by `evaluate_detailed`.
+
+        Replicates are not re-evaluated one by one: each resampling is expressed as counts
+            days : moving blocks of `block_size` days, resampled with replacement.
+                Each replicate MSE is the product of the squared residuals matrix with its day counts
+            series : aggregated time series resampled with replacement within each aggregation level.
+                Each replicate WRMSSE is the product of its series counts with the WRMSSE contributions
+            both : days and series
+
+        Parameters
+        ----------
+        residuals : np.array
+            residuals for each aggregated time series, of shape `(n_aggregated_time_series, n_prediction_dates)`
+        resample : str
+            'days', 'series' or 'both'
+        n_replicates : int
+            number of bootstrap replicates
+        block_size : int
+            number of consecutive days resampled together
+        confidence : float
+            confidence level of the interval
+        seed : int
+            random seed, for reproducible intervals
+        chunk_size : int
+            number of replicates computed at once
+
+        Returns
+        -------
+        dict
+            wrmsse : point estimate
+            low, high : percentile interval bounds
+            std : standard deviation of the replicates
+            replicates : WRMSSE of each replicate
+        """
+
+        if resample not in ['days', 'series', 'both']:
+            raise ValueError(f"Unknown resampling `{resample}`")
+
+        rng = np.random.default_rng(seed)
+
+        squared_residuals = np.asarray(residuals, dtype=self.float_dtype)**2
+        n_series, n_days = squared_residuals.shape
+        block_size = min(block_size, n_days)
+        n_blocks = -(-n_days // block_size)
+
+        weights = self.sales_usd_weights / self.n_agg_levels
+        rmsse = np.sqrt(np.mean(squared_residuals, axis=1, dtype=np.float64) / self.scaling_factors)
+
+        # first row and number of rows of the aggregation level of each series, levels being contiguous
+        agg_levels = self.agg_level_ids['agg_level'].values
+        agg_level_bounds = np.flatnonzero(np.r_[True, agg_levels[1:] != agg_levels[:-1], True])
+        level_start = np.repeat(agg_level_bounds[:-1], np.diff(agg_level_bounds)).astype(np.int32)
+        level_size = np.repeat(np.diff(agg_level_bounds), np.diff(agg_level_bounds)).astype(np.int32)
+
+        replicates = np.empty(n_replicates, dtype=np.float64)
+
+        for chunk_start in range(0, n_replicates, chunk_size):
+            n_chunk = min(chunk_size, n_replicates - chunk_start)
+
+            if resample in ['days', 'both']:
+                # (n_chunk, n_days) number of times each day is drawn
+                block_starts = rng.integers(0, n_days - block_size + 1, size=(n_chunk, n_blocks))
+                days = (block_starts[:, :, None] + np.arange(block_size)).reshape(n_chunk, -1)[:, :n_days]
+                day_counts = np.bincount(
+                    (days + n_days * np.arange(n_chunk)[:, None]).reshape(-1),
+                    minlength=n_chunk * n_days
+                    ).reshape(n_chunk, n_days)
+
+                # (n_series, n_chunk)
+                rmsse_replicates = np.sqrt(
+                    (squared_residuals @ day_counts.T.astype(self.float_dtype)) / n_days / self.scaling_factors[:, None]
+                    )
+            else:
+                rmsse_replicates = rmsse[:, None]
+
+            if resample in ['series', 'both']:
+                # (n_chunk, n_series) number of times each series is drawn, within its aggregation level
+                draws = level_start + rng.integers(0, level_size, size=(n_chunk, n_series), dtype=np.int32)
+                series_counts = np.bincount(
+                    (draws + n_series * np.arange(n_chunk)[:, None]).reshape(-1),
+                    minlength=n_chunk * n_series
+                    ).reshape(n_chunk, n_series)
+
+                replicates[chunk_start:chunk_start + n_chunk] = np.einsum(
+                    'bs,sb->b',
+                    series_counts,
+                    np.broadcast_to(weights[:, None] * rmsse_replicates, (n_series, n_chunk))
+                    )
+            else:
+                replicates[chunk_start:chunk_start + n_chunk] = weights @ rmsse_replicates
+
+        alpha = 1 - confidence
+
+        return dict(
+            wrmsse=np.sum(weights * rmsse),
+            low=np.quantile(replicates, alpha / 2),
+            high=np.quantile(replicates, 1 - alpha / 2),
+            std=np.std(replicates),
+            replicates=replicates
+        )
+
+    @property
+    def float_dtype(self) -> np.dtype:
+        """
+        Floating point dtype of `self.precision`
+        """
+        return FLOAT_DTYPES[self.precision]
+
+    def get_rollup_matrix_as(
+        self,
+        dtype: np.dtype
+    ) -> csr_matrix:
+        """
+        Rollup matrix with `dtype` data, e.g. `self.float_dtype`, for `roll_up` products in that dtype.
+        Cast on first access and cached per dtype: only its data array is new,
+        indices are shared with the compact `self.rollup_matrix`
+        """
+
+        dtype = np.dtype(dtype)
+
+        if getattr(self, '_rollup_matrices', None) is None:
+            self._rollup_matrices = {}
+
+        if dtype not in self._rollup_matrices:
+            self._rollup_matrices[dtype] = csr_matrix(
+                (self.rollup_matrix.data.astype(dtype), self.rollup_matrix.indices, self.rollup_matrix.indptr),
+                shape=self.rollup_matrix.shape
+            )
+
+        return self._rollup_matrices[dtype]
+
+    @property
+    def rollup_matrix_csc(self) -> csc_matrix:
+        """
+        Rollup matrix in CSC format, for slicing by `id` columns. Computed on first access
+        """
+
+        if getattr(self, '_rollup_matrix_csc', None) is None:
+            self._rollup_matrix_csc = self.rollup_matrix.tocsc()
+
+        return self._rollup_matrix_csc
+
+    def _get_results_df(
+        self,
+        rmsse_per_agg_level_id: np.array
+    ) -> pd.DataFrame:
+
+        # shallow copy: columns are only added, `self.agg_level_ids` is left as is
+        results_per_agg_df = self.agg_level_ids.copy(deep=False)
         results_per_agg_df['rmsse'] = rmsse_per_agg_level_id
         results_per_agg_df['sales_usd'] = self.sales_usd
         results_per_agg_df['sales_usd_weight'] = self.sales_usd_weights / self.n_agg_levels
         results_per_agg_df['wrmsse'] = results_per_agg_df['sales_usd_weight'] * results_per_agg_df['rmsse']
 
-        wrmsse = results_per_agg_df['wrmsse'].sum()
+        return results_per_agg_df
+
+    def evaluate_many(
+        self,
+        pred_values: np.array,
+        chunk_size: int=EVALUATE_MANY_CHUNK_SIZE
+    ) -> Tuple:
+        """
+        Compute the WRMSSE of several submissions at once, given values already aligned with `self.ids`.
+        Each chunk of submissions is rolled up with a single sparse product,
+        with submissions stacked along the days axis.
+
+        Memory is `O(chunk_size x n_aggregated_time_series x n_prediction_dates)`,
+        `pred_values` may be memory-mapped.
+
+        Parameters
+        ----------
+        pred_values : np.array
+            Predictions, of shape `(n_submissions, len(self.ids), self.n_validation_days)`.
+            Raises a ValueError otherwise
+        chunk_size : int
+            Number of submissions rolled up at once
+
+        Returns
+        -------
+        np.array
+            WRMSSE of each submission, of shape `(n_submissions,)`
+        pd.DataFrame
+            WRMSSE contribution of each aggregation level (columns) for each submission (rows).
+            Rows sum to the WRMSSE
+        """
+
+        expected_shape = (len(self.ids), self.n_validation_days)
+
+        if np.ndim(pred_values) != 3 or tuple(np.shape(pred_values)[1:]) != expected_shape:
+            raise ValueError(
+                f"Expected predictions of shape (n_submissions, n_ids={expected_shape[0]}, "
+                f"n_validation_days={expected_shape[1]}), got {np.shape(pred_values)}"
+            )
+
+        n_submissions, n_ids, n_days = pred_values.shape
+
+        gt_values = self.rolled_up_groundtruth_values
+
+        # (n_agg_levels, n_aggregated_time_series) indicator, to sum contributions per aggregation level
+        agg_level_names = [
+            name for name in AGGREGATION_LEVEL_NAMES
+            if name in set(self.agg_level_ids['agg_level'])
+        ]
+        agg_level_codes = pd.Categorical(
+            self.agg_level_ids['agg_level'],
+            categories=agg_level_names
+        ).codes
+        agg_level_matrix = csr_matrix(
+            (
+                np.ones(len(agg_level_codes)),
+                (agg_level_codes, np.arange(len(agg_level_codes)))
+            ),
+            shape=(len(agg_level_names), len(agg_level_codes))
+        )
+
+        weights = self.sales_usd_weights / self.n_agg_levels
+
+        wrmsse_per_agg_level = np.empty((n_submissions, len(agg_level_names)), dtype=np.float64)
+
+        for chunk_start in range(0, n_submissions, chunk_size):
+            chunk = np.asarray(pred_values[chunk_start:chunk_start + chunk_size])
+            n_chunk = chunk.shape[0]
+
+            # (n_ids, n_chunk x n_days) block, rolled up in one product
+            block = np.moveaxis(chunk, 0, 1).reshape(n_ids, n_chunk * n_days)
+            block_agg = roll_up(self.get_rollup_matrix_as(self.float_dtype), block, self.float_dtype).reshape(-1, n_chunk, n_days)
+
+            mse = np.mean((block_agg - gt_values[:, None, :])**2, axis=2, dtype=np.float64)
+            rmsse = np.sqrt(mse / self.scaling_factors[:, None])
+
+            wrmsse_per_agg_level[chunk_start:chunk_start + n_chunk] = (
+                agg_level_matrix @ (rmsse * weights[:, None])
+            ).T
+
+        wrmsse_per_agg_level_df = pd.DataFrame(
+            wrmsse_per_agg_level,
+            columns=agg_level_names
+        )
 
-        return wrmsse, residuals_per_agg_level_id, results_per_agg_df 
-        
\ No newline at end of file
+        return wrmsse_per_agg_level.sum(axis=1), wrmsse_per_agg_level_df
@@ -1,8 +1,191 @@
 import re
-from typing import List
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
+from utils.artifacts import load_artifacts, save_artifacts
+from utils.settings import AGG_FUNCTIONS, EXPLORE_CHUNK_SIZE, EXPLORE_MAX_POINTS, EXPLORE_SAMPLING_SEED
+
+# number of set bits of each byte value
+BYTE_POPCOUNTS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+def groupby_agg(
+    values: np.array,
+    rows: np.array,
+    group_codes: np.array,
+    agg_function: str,
+    chunk_size: int=EXPLORE_CHUNK_SIZE
+) -> Tuple:
+    """
+    Aggregate `values[rows]` per group, column by column, with sorted-segment reductions:
+    rows are sorted by group once, and each group is a contiguous segment reduced along the rows.
+    Columns are processed `chunk_size` at a time, so that only a slice of the selected rows is copied at once.
+    Segments are reduced one at a time, which suits a few groups of many rows, as in the explore tab
+
+    Parameters
+    ----------
+    values : np.array
+        values, of shape `(n_rows, n_cols)`, e.g. memory-mapped sales
+    rows : np.array
+        selected row indices
+    group_codes : np.array
+        group code of each selected row
+    agg_function : str
+        one of `AGG_FUNCTIONS`: 'sum', 'mean', 'std' (with one degree of freedom, as pandas), 'min' or 'max'
+    chunk_size : int
+        Number of columns aggregated at once
+
+    Returns
+    -------
+    np.array
+        sorted group codes
+    np.array
+        aggregated values, of shape `(n_groups, n_cols)`
+    """
+
+    if agg_function not in AGG_FUNCTIONS:
+        raise ValueError(f"Unknown aggregation function {agg_function}, expected one of {AGG_FUNCTIONS}")
+
+    order = np.argsort(group_codes, kind='stable')
+    rows = np.asarray(rows)[order]
+    group_codes = np.asarray(group_codes)[order]
+
+    # [start, end) rows of each group segment
+    starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]]) if len(rows) > 0 else np.array([], dtype=int)
+    ends = np.r_[starts[1:], len(rows)].astype(int)
+    groups = group_codes[starts]
+
+    if agg_function in ['min', 'max']:
+        dtype = values.dtype
+    elif agg_function == 'sum':
+        dtype = np.result_type(values.dtype, np.int64)
+    else:
+        dtype = np.float64
+
+    n_cols = values.shape[1]
+    ret = np.empty((len(groups), n_cols), dtype=dtype)
+
+    for chunk_start in range(0, n_cols, chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        block = np.asarray(values[rows, chunk])
+
+        for k, (start, end) in enumerate(zip(starts, ends)):
+            segment = block[start:end]
+
+            if agg_function == 'min':
+                ret[k, chunk] = segment.min(axis=0)
+            elif agg_function == 'max':
+                ret[k, chunk] = segment.max(axis=0)
+            elif agg_function == 'sum':
+                ret[k, chunk] = segment.sum(axis=0, dtype=dtype)
+            elif agg_function == 'mean':
+                ret[k, chunk] = segment.mean(axis=0, dtype=dtype)
+            elif end - start > 1:
+                ret[k, chunk] = segment.std(axis=0, dtype=dtype, ddof=1)
+            else:
+                # single-row groups have no standard deviation, as in pandas
+                ret[k, chunk] = np.nan
+
+    return groups, ret
+
+def reduce_segments(
+    values: np.array,
+    starts: np.array,
+    agg_function: str
+) -> np.array:
+    """
+    Aggregate contiguous segments of columns of `values` with `np.ufunc.reduceat`,
+    e.g. the days of each week. Suits many short segments of a small matrix
+
+    Parameters
+    ----------
+    values : np.array
+        values, of shape `(n_rows, n_cols)`
+    starts : np.array
+        sorted first column of each segment, the first one being 0
+    agg_function : str
+        one of `AGG_FUNCTIONS`, see `groupby_agg`
+
+    Returns
+    -------
+    np.array
+        aggregated values, of shape `(n_rows, len(starts))`
+    """
+
+    if agg_function not in AGG_FUNCTIONS:
+        raise ValueError(f"Unknown aggregation function {agg_function}, expected one of {AGG_FUNCTIONS}")
+
+    if agg_function == 'min':
+        return np.minimum.reduceat(values, starts, axis=1)
+
+    if agg_function == 'max':
+        return np.maximum.reduceat(values, starts, axis=1)
+
+    counts = np.diff(np.r_[starts, values.shape[1]])
+
+    if agg_function == 'sum':
+        return np.add.reduceat(values, starts, axis=1, dtype=np.result_type(values.dtype, np.int64))
+
+    sums = np.add.reduceat(values, starts, axis=1, dtype=np.float64)
+
+    if agg_function == 'mean':
+        return sums / counts
+
+    squares_sums = np.add.reduceat(values.astype(np.float64)**2, starts, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variances = (squares_sums - sums**2 / counts) / (counts - 1)
+
+    # single-column segments have no standard deviation, as in pandas
+    return np.where(counts > 1, np.sqrt(np.maximum(variances, 0)), np.nan)
+
+def minmax_downsample(
+    values: np.array,
+    n_out: int
+) -> np.array:
+    """
+    Return the columns to keep in each row of `values` to draw it with at most about `n_out` points:
+    columns are split in `n_out // 2` buckets of consecutive columns, and the minimum and maximum
+    of each bucket are kept, so that peaks stay visible whatever the number of columns
+
+    Parameters
+    ----------
+    values : np.array
+        values, of shape `(n_rows, n_cols)`
+    n_out : int
+        maximum number of columns to keep per row
+
+    Returns
+    -------
+    np.array
+        sorted column indices of each row, of shape `(n_rows, n_kept)`, all of them if `n_cols <= n_out`
+    """
+
+    n_rows, n_cols = values.shape
+
+    if n_cols <= n_out:
+        return np.tile(np.arange(n_cols), (n_rows, 1))
+
+    n_buckets = max(n_out // 2, 1)
+    starts = np.arange(n_buckets) * n_cols // n_buckets
+    bucket_index = np.repeat(np.arange(n_buckets), np.diff(np.r_[starts, n_cols]))
+
+    column_index = np.broadcast_to(np.arange(n_cols), values.shape)
+
+    ret = []
+
+    for reduce in [np.fmin, np.fmax]:
+        extrema = reduce.reduceat(values, starts, axis=1)
+        # first column of each bucket reaching its extremum, bucket start for buckets of NaN only
+        columns = np.minimum.reduceat(
+            np.where(values == extrema[:, bucket_index], column_index, n_cols),
+            starts,
+            axis=1
+            )
+        ret.append(np.where(columns < n_cols, columns, starts[None, :]))
+
+    return np.sort(np.concatenate(ret, axis=1), axis=1)
+
 class SalesExplorer(object):
 
     def __init__(
@@ -15,55 +198,350 @@ class SalesExplorer(object):
         Pre-computes
             row identifier columns
             filter columns and value choices
+            a bitset index of the rows of each filter value
+            group codes of each identifier column
+            the period of each day, at each sampling frequency
 
         Parameters
         ----------
         sales_df : pd.DataFrame
             Sales dataframe
+        calendar_df : pd.DataFrame
+            Calendar dataframe
         """
 
+        self._init_constants()
+
+        # row identifier columns
+        self.id_cols = [col for col in sales_df.columns if not re.match(r'd_[0-9]+', col)] 
+
+        # value columns
+        self.d_cols = [col for col in sales_df.columns if re.match(r'd_[0-9]+', col)]  
+
+        # identifiers and sales values are kept apart, so that sales values can be memory-mapped
+        self.id_df = sales_df[self.id_cols].astype(str).reset_index(drop=True)
+        self.sales_values = sales_df[self.d_cols].values
+        self.calendar_df = calendar_df[['d', 'date']].reset_index(drop=True)
+
+        # cache key of the artifacts the explorer was loaded from, see `from_artifacts`
+        self.artifacts_key = None
+
+        self._init_filters()
+        self._init_filter_index()
+        self._init_groups()
+        self._init_date_buckets()
+
+    def _init_constants(self):
+
         self.DEFAULT_DATE_COL = 'date'
         self.DEFAULT_SALES_COL = 'sales'
-        self.DEFAULT_D_COL = 'd'
 
         self.MAX_N_GRAPH_TRACES = 15
 
-        self.sales_df = sales_df
-        self.calendar_df = calendar_df
+        self.SAMPLING_FREQUENCIES = [
+            dict(name='Daily', pd_freq_alias='D'),
+            dict(name='Weekly', pd_freq_alias='W'),
+            dict(name='Monthly', pd_freq_alias='M'),
+            dict(name='Quarterly', pd_freq_alias='Q')
+        ]
 
-        # row identifier columns
-        self.id_cols = [col for col in self.sales_df.columns if not re.match(r'd_[0-9]+', col)] 
+        # statistics of the daily values over each period, see `get_time_pyramid`
+        self.PYRAMID_STATISTICS = ['sum', 'mean', 'min', 'max']
 
-        # value columns
-        self.d_cols = [col for col in self.sales_df.columns if re.match(r'd_[0-9]+', col)]  
+    def _init_filters(self):
+        """
+        Pre-computes identifier columns statistics and filter value choices
+        """
 
         # number of unique values per identifier column
-        self.cols_nunique = {col : self.sales_df[col].nunique() for col in self.id_cols}
+        self.cols_nunique = {col : self.id_df[col].nunique() for col in self.id_cols}
 
         # columns suitable for row filtering
         MAX_NUNIQUE_PER_FILTER_COL = 20
         self.filter_possible_values_dict = [
             dict(
                 name=col,
-                options=self.sales_df[col].unique()
+                options=self.id_df[col].unique()
             )
             for col in self.id_cols 
-            if self.sales_df[col].nunique() < MAX_NUNIQUE_PER_FILTER_COL
+            if self.id_df[col].nunique() < MAX_NUNIQUE_PER_FILTER_COL
         ]
-    
-    def sales_filter_groupby_agg(
+
+    def _init_filter_index(
+        self,
+        filter_bitsets : dict=None
+    ):
+        """
+        Pre-computes the inverted index of filter columns: for each column, one bitset of rows per filter option,
+        packed in an array of shape `(n_options, ceil(n_rows / 8))`, see `get_filter_bitset`
+
+        Parameters
+        ----------
+        filter_bitsets : dict
+            bitsets by column, returned by `get_artifacts`. Built from the identifiers if not provided
+        """
+
+        n_rows = len(self.id_df)
+
+        self.all_rows_bitset = np.packbits(np.ones(n_rows, dtype=bool))
+
+        # filter column -> filter option -> bitset row
+        self.filter_option_index = {
+            f['name'] : {option : k for k, option in enumerate(f['options'])}
+            for f in self.filter_possible_values_dict
+        }
+
+        if filter_bitsets is None:
+            filter_bitsets = {}
+            for f in self.filter_possible_values_dict:
+                option_codes = pd.Index(f['options']).get_indexer(self.id_df[f['name']].values)
+                filter_bitsets[f['name']] = np.packbits(
+                    option_codes[None, :] == np.arange(len(f['options']))[:, None],
+                    axis=1
+                    )
+
+        self.filter_bitsets = filter_bitsets
+
+    def _init_groups(self):
+        """
+        Pre-computes the sorted group values of each identifier column, the group code of each row,
+        and the date of each value column
+        """
+
+        self.group_codes = {}
+        self.group_values = {}
+
+        for col in self.id_cols:
+            self.group_codes[col], self.group_values[col] = pd.factorize(self.id_df[col].values, sort=True)
+
+        self.d_dates = self.calendar_df.set_index('d')['date'].reindex(self.d_cols).values
+
+    def _init_date_buckets(self):
+        """
+        Pre-computes, for each sampling frequency, the value columns sorted by period (bucket),
+        the first sorted column of each period and the end date of each period, see `get_time_pyramid`
+        """
+
+        dates = pd.Series(pd.to_datetime(self.d_dates))
+
+        self.date_buckets = {}
+
+        for sf in self.SAMPLING_FREQUENCIES:
+            period_end_dates = dates.dt.to_period(sf['pd_freq_alias']).dt.to_timestamp(how='E')
+
+            # days without a date get bucket -1, and are left out
+            day_buckets, bucket_dates = pd.factorize(period_end_dates, sort=True)
+            days = np.flatnonzero(day_buckets >= 0)
+            days = days[np.argsort(day_buckets[days], kind='stable')]
+
+            starts = np.flatnonzero(np.r_[True, np.diff(day_buckets[days]) != 0]) if len(days) > 0 else days
+
+            self.date_buckets[sf['name']] = (days, starts, np.asarray(bucket_dates))
+
+    @property
+    def sales_df(self) -> pd.DataFrame:
+        """
+        Sales dataframe, rebuilt from identifiers and sales values
+        """
+        return pd.concat(
+            [
+                self.id_df,
+                pd.DataFrame(np.asarray(self.sales_values), columns=self.d_cols)
+            ],
+            axis=1
+        )
+
+    def get_artifacts(self) -> Tuple:
+        """
+        Return arrays and metadata of the explorer, see `utils.artifacts.save_artifacts`
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            arrays, by name
+        dict
+            metadata
+        """
+
+        arrays = dict(
+            sales_values=self.sales_values,
+            calendar_d=self.calendar_df['d'].values,
+            calendar_date=self.calendar_df['date'].values.astype('datetime64[ns]'),
+        )
+        arrays.update({
+            'id_df.' + col : self.id_df[col].values for col in self.id_cols
+        })
+        arrays.update({
+            'filter_bitsets.' + col : bitsets for col, bitsets in self.filter_bitsets.items()
+        })
+
+        metadata = dict(
+            id_cols=self.id_cols,
+            d_cols=self.d_cols,
+        )
+
+        return arrays, metadata
+
+    @classmethod
+    def from_artifacts(
+        cls,
+        arrays : dict,
+        metadata : dict,
+        key : str=None
+    ) -> 'SalesExplorer':
+        """
+        Return an explorer from arrays and metadata returned by `get_artifacts`
+
+        Parameters
+        ----------
+        arrays : Dict[str, np.ndarray]
+            arrays, by name
+        metadata : dict
+            metadata
+        key : str
+            cache key the artifacts were saved with, identifies the data of results derived from the explorer
+
+        Returns
+        -------
+        SalesExplorer
+            explorer
+        """
+
+        explorer = cls.__new__(cls)
+        explorer._init_constants()
+
+        explorer.id_cols = metadata['id_cols']
+        explorer.d_cols = metadata['d_cols']
+
+        explorer.id_df = pd.DataFrame({
+            col : arrays['id_df.' + col] for col in explorer.id_cols
+        })
+        explorer.sales_values = arrays['sales_values']
+        explorer.calendar_df = pd.DataFrame({
+            'd' : arrays['calendar_d'],
+            'date' : arrays['calendar_date']
+        })
+        explorer.artifacts_key = key
+
+        explorer._init_filters()
+        explorer._init_filter_index({
+            f['name'] : arrays['filter_bitsets.' + f['name']] for f in explorer.filter_possible_values_dict
+        })
+        explorer._init_groups()
+        explorer._init_date_buckets()
+
+        return explorer
+
+    def save(
+        self,
+        directory : str
+    ):
+        """
+        Save the explorer as memory-mappable artifacts, see `utils.artifacts.save_artifacts`
+
+        Parameters
+        ----------
+        directory : str
+            Artifacts directory
+        """
+
+        save_artifacts(directory, *self.get_artifacts())
+
+    @classmethod
+    def load(
+        cls,
+        directory : str,
+        mmap_mode : str='r'
+    ) -> 'SalesExplorer':
+        """
+        Load an explorer saved with `SalesExplorer.save`
+
+        Parameters
+        ----------
+        directory : str
+            Artifacts directory
+        mmap_mode : str
+            np.load mmap_mode, read-only memory map by default
+
+        Returns
+        -------
+        SalesExplorer
+            loaded explorer
+        """
+
+        return cls.from_artifacts(*load_artifacts(directory, mmap_mode=mmap_mode))
+
+    def get_filter_bitset(
+        self,
+        filter_values : List[List[str]]
+    ) -> np.array:
+        """
+        Return the bitset of rows matching filters, from the inverted index:
+        bitsets of the permitted values of a column are OR-ed, and columns are AND-ed.
+        Columns without permitted values do not filter rows, unknown values match no row
+
+        Parameters
+        ----------
+        filter_values : List[List[str]]
+            List of permitted values per identifier column, 
+            in the order of self.filter_possible_values_dict
+
+        Returns
+        -------
+        np.array
+            bitset of matching rows, packed with `np.packbits`
+        """
+
+        bitset = self.all_rows_bitset.copy()
+
+        for f, values in zip(self.filter_possible_values_dict, filter_values):
+            if len(values) == 0:
+                continue
+
+            option_index = self.filter_option_index[f['name']]
+            options = [option_index[value] for value in values if value in option_index]
+
+            bitset &= np.bitwise_or.reduce(
+                self.filter_bitsets[f['name']][options],
+                axis=0,
+                initial=0
+                ).astype(np.uint8)
+
+        return bitset
+
+    def count_rows(
+        self,
+        filter_values : List[List[str]]
+    ) -> int:
+        """
+        Return the number of rows matching filters, see `get_filter_bitset`
+        """
+        return int(BYTE_POPCOUNTS[self.get_filter_bitset(filter_values)].sum())
+
+    def get_filter_rows(
+        self,
+        filter_values : List[List[str]]
+    ) -> np.array:
+        """
+        Return the sorted indices of rows matching filters, see `get_filter_bitset`
+        """
+        return np.flatnonzero(np.unpackbits(self.get_filter_bitset(filter_values), count=len(self.id_df)))
+
+    def filter_groupby_agg(
         self,
         filter_values : List[List[str]],
         groupby_col : str,
         agg_function : str,
-        var_name : str=None,
-        value_name : str=None,
-        merge_date : bool=True 
-    ) -> pd.DataFrame:
+        seed : int=EXPLORE_SAMPLING_SEED
+    ) -> Tuple:
         """
-        Return sales in tidy format
-        after filtering, grouping and aggregation
-        
+        Return sales after filtering, grouping and aggregation, in wide format.
+
+        Rows are selected with the inverted index of filter columns, see `get_filter_bitset`,
+        and aggregated per group straight from the wide sales values, see `groupby_agg`.
+        When there are more than `MAX_N_GRAPH_TRACES` groups, that many groups are sampled at random,
+        with `seed`: the same query always plots the same groups.
+
         Parameters
         ----------
         filter_values : List[List[str]]
@@ -73,166 +551,173 @@ class SalesExplorer(object):
             id column to perform grouping on. Must be in self.id_cols
         agg_function : str
             aggregation operation to perform
-        var_name : str
-            pd.melt var_name parameter, by default 'd'
-        value_name : str
-            pd.melt value_name parameter, by default 'sales'
-        merge_date : bool
-            choice to merge a datetime column
+        seed : int
+            random seed of the sampling of groups
 
         Returns
         -------
-        pd.DataFrame
-            filtered and aggregated sales in tidy format
-        """  
+        int
+            number of rows
+        int
+            number of rows after filtering
+        int
+            number of groups after filtering
+        np.array
+            sorted `groupby_col` value of each (sampled) group
+        np.array
+            aggregated sales, of shape `(n_groups, len(self.d_cols))`
+        """
 
-        if not var_name:
-            var_name = self.DEFAULT_D_COL
-        
-        if not value_name:
-            value_name = self.DEFAULT_SALES_COL
+        id_count = len(self.id_df)
 
-        id_count = len(self.sales_df)
         #
         # 1. Filter
         #
 
-        filters = zip(
-            [f['name'] for f in self.filter_possible_values_dict],
-            filter_values 
-        )
-
-        filters = [
-            dict(
-                col=elt[0],
-                values=elt[1]
-            )
-            for elt in filters if len(elt[1]) > 0
-        ]
-
-        sales_df = self.sales_df.copy()
-
-        for f in filters:
-            try:
-                sales_df = sales_df.set_index(f['col']).loc[f['values']].reset_index()
-            except KeyError:
-                sales_df = sales_df.iloc[[]]
-                break
+        rows = self.get_filter_rows(filter_values)
 
-        id_count_after_filtering = len(sales_df)
+        id_count_after_filtering = len(rows)
 
         #
-        # 2. Melt sales_df into tidy format
+        # 2. Group, and sample groups
         #
 
-        sales_df = sales_df[self.d_cols + [groupby_col]]
+        group_codes = self.group_codes[groupby_col][rows]
+        groups = np.unique(group_codes)
 
-        n_agg_time_series = sales_df[groupby_col].nunique()
+        n_agg_time_series = len(groups)
 
         if n_agg_time_series > self.MAX_N_GRAPH_TRACES:
-            
-            n_samples = min(len(sales_df), self.MAX_N_GRAPH_TRACES)
-            
-            samples = sales_df[groupby_col].sample(n_samples)
-            cols_to_keep = self.d_cols + [groupby_col]
-            sales_df = sales_df.set_index([groupby_col]).loc[samples].reset_index()
-
-        sales_df = sales_df.melt(
-            id_vars=[groupby_col],
-            value_vars=self.d_cols,
-            var_name=var_name,
-            value_name=value_name
-        )
+
+            samples = np.random.default_rng(seed).choice(groups, self.MAX_N_GRAPH_TRACES, replace=False)
+
+            sampled = np.isin(group_codes, samples)
+            rows, group_codes = rows[sampled], group_codes[sampled]
 
         #
         # 3. Aggregate
         #
 
-        sales_df = sales_df\
-            .groupby([groupby_col, var_name])[value_name]\
-            .agg(agg_function)\
-            .reset_index()
-        
-        #
-        # 4. Merge date
-        #
+        groups, values = groupby_agg(self.sales_values, rows, group_codes, agg_function)
 
-        if merge_date:
+        return id_count, id_count_after_filtering, n_agg_time_series, self.group_values[groupby_col][groups], values
 
-            sales_df = pd.merge(
-                sales_df,
-                self.calendar_df[['d', 'date']],
-                left_on=var_name,
-                right_on='d',
-                validate='m:1'
-            )
+    def get_time_pyramid(
+        self,
+        values: np.array
+    ) -> Dict[str, np.array]:
+        """
+        Return the time pyramid of sales in wide format: at each of `SAMPLING_FREQUENCIES`, from daily to quarterly,
+        the end date of each period, and the `PYRAMID_STATISTICS` of the daily values over each period.
+        Computed once per query, so that viewport changes are served without aggregating sales again,
+        see `query_time_pyramid`
 
-        return id_count, id_count_after_filtering, n_agg_time_series, sales_df
-    
+        Parameters
+        ----------
+        values : np.array
+            sales, of shape `(n_groups, len(self.d_cols))`, see `filter_groupby_agg`
+
+        Returns
+        -------
+        Dict[str, np.array]
+            arrays, by `<sampling frequency>.date` and `<sampling frequency>.<statistic>`, e.g. `Weekly.max`,
+            of shape `(n_periods,)` and `(n_groups, n_periods)`
+        """
+
+        pyramid = {}
+
+        for sf in self.SAMPLING_FREQUENCIES:
+
+            days, starts, bucket_dates = self.date_buckets[sf['name']]
+
+            period_values = np.asarray(values)[:, days]
 
-    def resample_datetime(
+            pyramid[f"{sf['name']}.date"] = bucket_dates
+            for statistic in self.PYRAMID_STATISTICS:
+                pyramid[f"{sf['name']}.{statistic}"] = reduce_segments(period_values, starts, statistic)
+
+        return pyramid
+
+    def query_time_pyramid(
         self,
-        df: pd.DataFrame,
-        id_cols: List[str],
-        date_col: str=None,
-        value_col: str=None,
-        sampling_frequency_col: str='sampling_frequency',
-        agg_function: str='sum'
+        groups: np.array,
+        pyramid: Dict[str, np.array],
+        groupby_col: str,
+        start: pd.Timestamp=None,
+        end: pd.Timestamp=None,
+        max_points: int=EXPLORE_MAX_POINTS,
+        sampling_frequency_col: str='sampling_frequency'
     ) -> pd.DataFrame:
         """
-        Resamples time for a dataframe in tidy format
+        Return the time pyramid in tidy format, with a bounded number of points whatever the length of the history.
+        At each sampling frequency, periods ending within `[start, end]` are kept up to `max_points` per group,
+        and periods outside of it up to `max_points // 4` per group and side, as context for the range slider,
+        see `minmax_downsample`
 
         Parameters
         ----------
-        df: pd.DataFrame
-            input time series dataframe in tidy format
-        date_col : str
-            column with datetime values to resample, must be in df
-        value_col : str
-            column with values of interest, must be in df
-        id_cols : List[str]
-            group by columns, must be in df
+        groups : np.array
+            `groupby_col` value of each group
+        pyramid : Dict[str, np.array]
+            time pyramid, see `get_time_pyramid`
+        groupby_col : str
+            group column name in output dataframe
+        start : pd.Timestamp
+            first visible date, the first date by default
+        end : pd.Timestamp
+            last visible date, the last date by default
+        max_points : int
+            maximum number of visible points per group and sampling frequency
         sampling_frequency_col : str
             target column, indicates sampling frequency in output dataframe
-        agg_function : str
-            aggregation policy, set to sum by default
 
         Returns
         -------
         pd.DataFrame
-            resamples values in tidy format
-        """ 
-
-        if not date_col:
-            date_col = self.DEFAULT_DATE_COL
-        
-        if not value_col:
-            value_col = self.DEFAULT_SALES_COL
+            periods in tidy format, sorted by sampling frequency, group, then date
+                groupby_col
+                "date" : period end date
+                "sales" : sum over the period
+                "mean", "min", "max" : daily sales statistics over the period
+                sampling_frequency_col
+        """
 
+        n_groups = len(groups)
 
-        SAMPLING_FREQUENCIES = [
-            dict(name='Daily', col='date_day', pd_freq_alias='D'),
-            dict(name='Weekly', col='date_week', pd_freq_alias='W'),
-            dict(name='Monthly', col='date_month', pd_freq_alias='M')
-        ]
+        dfs = []
 
-        ret = pd.DataFrame()
+        for sf in self.SAMPLING_FREQUENCIES:
 
-        for sf in SAMPLING_FREQUENCIES:
+            dates = np.asarray(pyramid[f"{sf['name']}.date"])
+            statistics = {
+                statistic : np.asarray(pyramid[f"{sf['name']}.{statistic}"]).reshape(n_groups, len(dates))
+                for statistic in self.PYRAMID_STATISTICS
+            }
 
-            df[sf['col']] = df[date_col].dt.to_period(sf['pd_freq_alias']).dt.to_timestamp(how='E')
-            
-            groupby_cols = id_cols + [sf['col']]
-            tmp = df.groupby(groupby_cols)[value_col].agg(agg_function).reset_index()
-            tmp = tmp.rename(columns={sf['col'] : 'date'})
-            tmp[sampling_frequency_col] = sf['name']
+            first = 0 if start is None else np.searchsorted(dates, np.datetime64(start), side='left')
+            last = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end), side='right')
 
-            ret = pd.concat(
+            columns = np.concatenate(
                 [
-                    ret,
-                    tmp
+                    offset + minmax_downsample(statistics['sum'][:, offset:stop], n_out)
+                    for offset, stop, n_out in [
+                        (0, first, max_points // 4),
+                        (first, last, max_points),
+                        (last, len(dates), max_points // 4)
+                    ]
                 ],
-                axis=0
+                axis=1
             )
-            
-        return ret
+
+            df = pd.DataFrame({
+                groupby_col : np.repeat(groups, columns.shape[1]),
+                self.DEFAULT_DATE_COL : dates[columns].reshape(-1)
+            })
+            df[self.DEFAULT_SALES_COL] = np.take_along_axis(statistics['sum'], columns, axis=1).reshape(-1)
+            for statistic in ['mean', 'min', 'max']:
+                df[statistic] = np.take_along_axis(statistics[statistic], columns, axis=1).reshape(-1)
+            df[sampling_frequency_col] = sf['name']
+
+            dfs.append(df)
+
+        return pd.concat(dfs, axis=0)
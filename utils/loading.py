@@ -0,0 +1,159 @@
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+from utils.settings import (
+    CALENDAR_FILEPATH,
+    SELL_PRICES_FILEPATH,
+    SALES_FILEPATH,
+    CSV_ENGINE
+)
+
+ID_COLS_DTYPES = {
+    'item_id': 'category',
+    'dept_id': 'category',
+    'cat_id': 'category',
+    'store_id': 'category',
+    'state_id': 'category',
+}
+
+# daily unit sales fit in int16, and sums are computed with at least 64 bits,
+# see `utils.evaluate.roll_up`
+SALES_DTYPE = np.int16
+
+SELL_PRICES_DTYPES = {
+    'store_id': 'category',
+    'item_id': 'category',
+    'wm_yr_wk': np.int16,
+    'sell_price': np.float32,
+}
+
+CALENDAR_DTYPES = {
+    'wm_yr_wk': np.int16,
+    'weekday': 'category',
+    'wday': np.int8,
+    'month': np.int8,
+    'year': np.int16,
+    'event_name_1': 'category',
+    'event_type_1': 'category',
+    'event_name_2': 'category',
+    'event_type_2': 'category',
+    'snap_CA': np.int8,
+    'snap_TX': np.int8,
+    'snap_WI': np.int8,
+}
+
+def _read_csv(
+    path: str,
+    dtype: dict,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    pd.read_csv with explicit dtypes, restricted to the columns present in the file
+    """
+
+    columns = pd.read_csv(path, nrows=0).columns
+
+    if CSV_ENGINE is not None:
+        kwargs['engine'] = CSV_ENGINE
+
+    return pd.read_csv(
+        path,
+        dtype={col : col_dtype for col, col_dtype in dtype.items() if col in columns},
+        **kwargs
+    )
+
+def read_sales(path: str=SALES_FILEPATH) -> pd.DataFrame:
+    """
+    Read the sales file, with categorical identifiers and int16 daily sales
+    """
+
+    columns = pd.read_csv(path, nrows=0).columns
+
+    dtype = dict(ID_COLS_DTYPES)
+    dtype.update({col : SALES_DTYPE for col in columns if col.startswith('d_')})
+
+    return _read_csv(path, dtype)
+
+def read_sell_prices(path: str=SELL_PRICES_FILEPATH) -> pd.DataFrame:
+    """
+    Read the sell prices file, with categorical identifiers and float32 prices
+    """
+    return _read_csv(path, SELL_PRICES_DTYPES)
+
+def read_calendar(path: str=CALENDAR_FILEPATH) -> pd.DataFrame:
+    """
+    Read the calendar file, with parsed dates and compact dtypes
+    """
+    return _read_csv(path, CALENDAR_DTYPES, parse_dates=['date'])
+
+INPUT_READERS = dict(
+    sales_df=(read_sales, SALES_FILEPATH),
+    sell_prices_df=(read_sell_prices, SELL_PRICES_FILEPATH),
+    calendar_df=(read_calendar, CALENDAR_FILEPATH),
+)
+
+def get_peak_rss_mb() -> float:
+    """
+    Return the peak resident set size of the current process, in MB
+    """
+
+    if resource is None:
+        return float('nan')
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak_rss / 2**20
+
+    return peak_rss / 2**10
+
+def read_input(name: str) -> Tuple[pd.DataFrame, dict]:
+    """
+    Read one of the M5 input files, and report wall time and memory
+
+    Parameters
+    ----------
+    name : str
+        one of `INPUT_READERS`: 'sales_df', 'sell_prices_df' or 'calendar_df'
+
+    Returns
+    -------
+    pd.DataFrame
+        input dataframe
+    dict
+        report
+            name
+            seconds : wall time
+            peak_rss_mb : peak RSS of the process after reading
+            memory_mb : memory usage of the dataframe
+    """
+
+    reader, path = INPUT_READERS[name]
+
+    start = time.perf_counter()
+    df = reader(path)
+    seconds = time.perf_counter() - start
+
+    report = dict(
+        name=name,
+        seconds=seconds,
+        peak_rss_mb=get_peak_rss_mb(),
+        memory_mb=float(df.memory_usage(deep=True).sum()) / 2**20
+    )
+
+    print(
+        "Read {name}: {seconds:.2f}s, {memory_mb:.0f} MB dataframe, peak RSS {peak_rss_mb:.0f} MB".format(**report)
+    )
+
+    return df, report
@@ -81,25 +81,28 @@ def plot_sunburst(
 
     return fig
 
-def plot_samples(
+def plot_time_pyramid(
     sales_explorer: SalesExplorer,
+    groups: np.ndarray,
+    pyramid: dict,
     groupby_col: str,
-    agg_function: str,
-    *filter_values: str
-):
-
-    id_count, id_count_after_filtering, n_agg_time_series, df = sales_explorer.sales_filter_groupby_agg(
-        filter_values=filter_values,
-        groupby_col=groupby_col,
-        agg_function=agg_function,
-        merge_date=True
-    )
+    start: pd.Timestamp=None,
+    end: pd.Timestamp=None,
+    uirevision: str=None
+) -> go.Figure:
+    """
+    Plot sample sales at each sampling frequency, within the visible date range `[start, end]`,
+    see `SalesExplorer.query_time_pyramid`. `uirevision` keeps the zoom and legend state across updates
+    """
 
     sampling_frequency_col = 'sampling_frequency'
 
-    df = sales_explorer.resample_datetime(
-        df,
-        id_cols=[groupby_col],
+    df = sales_explorer.query_time_pyramid(
+        groups,
+        pyramid,
+        groupby_col=groupby_col,
+        start=start,
+        end=end,
         sampling_frequency_col=sampling_frequency_col
     )
 
@@ -110,6 +113,7 @@ def plot_samples(
                 y=sales_explorer.DEFAULT_SALES_COL,
                 color=groupby_col,
                 facet_row=sampling_frequency_col,
+                hover_data=['mean', 'min', 'max'],
                 color_discrete_sequence=px.colors.qualitative.Plotly
             )
     except KeyError:
@@ -128,27 +132,42 @@ def plot_samples(
                 visible=True
             ),
         ),
-        title='Sample sales at different sampling frequencies (Daily, Weekly, Monthly)'
+        uirevision=uirevision,
+        title='Sample sales at different sampling frequencies ({})'.format(
+            ', '.join(sf['name'] for sf in sales_explorer.SAMPLING_FREQUENCIES)
+        )
     )
 
-    return id_count, id_count_after_filtering, n_agg_time_series, fig
+    # sums over longer periods are on other scales
+    fig.update_yaxes(matches=None)
+
+    if start is not None and end is not None:
+        fig.update_xaxes(range=[start, end])
+
+    return fig
 
-def plot_evaluate_first_col(results_df: pd.DataFrame) -> List[go.Figure]:
+def plot_evaluate_first_col(
+    results_df: pd.DataFrame,
+    score_col: str=WRMSSE_COL,
+    error_col: str=RMSSE_COL
+    ) -> List[go.Figure]:
     """
-    Returns all plots for the first column of forecast accuracy tab
+    Returns all plots for the first column of forecast accuracy tab.
+    `score_col` and `error_col` are the weighted and per-series metric columns,
+    e.g. WSPL_COL and SPL_COL for the uncertainty track
     """
 
     color_discrete_map = AGGREGATION_LEVELS_COLOR_DISCRETE_MAP 
     
     tmp = results_df.groupby([AGG_LEVEL_COL]).\
-        agg({WRMSSE_COL : 'sum', RMSSE_COL : 'mean', SALES_USD_COL : 'mean'}).\
-            reset_index().sort_values(WRMSSE_COL, ascending=False)
+        agg({score_col : 'sum', error_col : 'mean', SALES_USD_COL : 'mean'}).\
+            reset_index().sort_values(score_col, ascending=False)
     #
     # WRMSSE pie chart
     #
     fig1 = px.pie(
         tmp,
-        values=WRMSSE_COL,
+        values=score_col,
         names=AGG_LEVEL_COL,
         color=AGG_LEVEL_COL,
         color_discrete_map=color_discrete_map
@@ -165,7 +184,7 @@ def plot_evaluate_first_col(results_df: pd.DataFrame) -> List[go.Figure]:
     #
     fig2 = px.bar(
         tmp,
-        y=RMSSE_COL,
+        y=error_col,
         x=AGG_LEVEL_COL,
         color=AGG_LEVEL_COL,
         color_discrete_map=color_discrete_map
@@ -185,8 +204,8 @@ def plot_evaluate_first_col(results_df: pd.DataFrame) -> List[go.Figure]:
     fig3.update_layout(yaxis_type="log")
 
     titles = [
-        "WRMSSE contribution of each aggregation level",
-        "Mean RMSSE of series in each aggregation level",
+        f"{score_col.upper()} contribution of each aggregation level",
+        f"Mean {error_col.upper()} of series in each aggregation level",
         "Mean USD sales per series in each aggregation level (logy scale)"
     ]
         
@@ -204,7 +223,8 @@ def plot_evaluate_first_col(results_df: pd.DataFrame) -> List[go.Figure]:
 def plot_evaluate_second_col(
     agg_level: str, 
     results_df: str,
-    residuals: np.ndarray
+    residuals: np.ndarray,
+    score_col: str=WRMSSE_COL
     ) -> List[go.Figure]:
 
     color = AGGREGATION_LEVELS_COLOR_DISCRETE_MAP[agg_level]
@@ -235,7 +255,7 @@ def plot_evaluate_second_col(
 
     if results_df[AGG_LEVEL_ID_COL].nunique()<=max_n_agg_level_id:
         
-        tmp = results_df[[AGG_LEVEL_ID_COL, WRMSSE_COL, SALES_USD_COL]]\
+        tmp = results_df[[AGG_LEVEL_ID_COL, score_col, SALES_USD_COL]]\
             .sort_values(SALES_USD_COL, ascending=False)
 
         fig2 = make_subplots(
@@ -247,7 +267,7 @@ def plot_evaluate_second_col(
             ],
             subplot_titles=[
                 "Sales USD",
-                "WRMSSE (ordered by sales USD)",
+                f"{score_col.upper()} (ordered by sales USD)",
             ]
         )
 
@@ -263,8 +283,8 @@ def plot_evaluate_second_col(
         fig2.add_trace(
             go.Bar(
                 x=tmp[AGG_LEVEL_ID_COL],
-                y=tmp[SALES_USD_COL],
-                name="WRMSSE"
+                y=tmp[score_col],
+                name=score_col.upper()
             ),
             2,1
         )
@@ -291,7 +311,9 @@ def plot_evaluate_second_col(
 
 def plot_evaluate_third_col(
     agg_level: str,
-    to_plot_df: pd.DataFrame
+    to_plot_df: pd.DataFrame,
+    score_col: str=WRMSSE_COL,
+    error_col: str=RMSSE_COL
     ) -> go.Figure:
         
     color = AGGREGATION_LEVELS_COLOR_DISCRETE_MAP[agg_level]
@@ -304,7 +326,7 @@ def plot_evaluate_third_col(
         y='sales',
         facet_row='agg_level_id',
         color='label',
-        hover_data=['wrmsse', 'rmsse'],
+        hover_data=[score_col, error_col],
         hover_name='agg_level_id',
         color_discrete_map=color_discrete_map
     )
@@ -316,7 +338,7 @@ def plot_evaluate_third_col(
 
     fig.update_layout(
         height=col_height,
-        title=f"Series with highest WRMSSE"
+        title=f"Series with highest {score_col.upper()}"
     )
 
     fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[1]))
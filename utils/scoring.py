@@ -0,0 +1,147 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List
+
+import pandas as pd
+
+from utils.evaluate import AccuracyEvaluator, ValidationError
+from utils.settings import ACCURACY_EVALUATOR_DIR
+
+SUBMISSION_FILE_EXTENSIONS = ['.csv', '.parquet']
+
+# evaluator of the current worker process, see `_init_worker`
+_evaluator = None
+
+def list_submission_files(paths: List[str]) -> List[str]:
+    """
+    Expand directories into the submission files they contain (non-recursive)
+
+    Parameters
+    ----------
+    paths : List[str]
+        submission files or directories
+
+    Returns
+    -------
+    List[str]
+        submission files, sorted within each directory
+    """
+
+    ret = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            ret += sorted(
+                os.path.join(path, filename) for filename in os.listdir(path)
+                if os.path.splitext(filename)[1].lower() in SUBMISSION_FILE_EXTENSIONS
+            )
+        else:
+            ret.append(path)
+
+    return ret
+
+def read_submission(path: str) -> pd.DataFrame:
+    """
+    Read a submission file, in CSV or Parquet format
+    """
+
+    if os.path.splitext(path)[1].lower() == '.parquet':
+        return pd.read_parquet(path)
+
+    return pd.read_csv(path)
+
+def score_file(
+    evaluator: AccuracyEvaluator,
+    path: str
+) -> dict:
+    """
+    Score one submission file
+
+    Parameters
+    ----------
+    evaluator : AccuracyEvaluator
+        evaluator
+    path : str
+        submission file
+
+    Returns
+    -------
+    dict
+        result
+            path
+            status : 'ok', 'invalid' (schema validation failed) or 'error'
+            wrmsse : None unless status is 'ok'
+            one WRMSSE contribution per aggregation level, if status is 'ok'
+            read_seconds, score_seconds : wall times
+            error : error message, if any
+    """
+
+    ret = dict(path=path, status='ok', wrmsse=None, read_seconds=None, score_seconds=None, error=None)
+
+    try:
+        start = time.perf_counter()
+        df = read_submission(path)
+        ret['read_seconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pred_values = evaluator.align_values(df, n_value_columns=evaluator.n_validation_days)
+        wrmsse, wrmsse_per_agg_level_df = evaluator.evaluate_many(pred_values[None])
+        ret['score_seconds'] = time.perf_counter() - start
+
+        ret['wrmsse'] = float(wrmsse[0])
+        ret.update(wrmsse_per_agg_level_df.iloc[0].to_dict())
+    except ValidationError as e:
+        ret.update(status='invalid', error=str(e))
+    except Exception as e:
+        ret.update(status='error', error=f'{type(e).__name__}: {e}')
+
+    return ret
+
+def _init_worker(directory: str):
+    global _evaluator
+    _evaluator = AccuracyEvaluator.load(directory, mmap_mode='r')
+
+def _score_file_in_worker(path: str) -> dict:
+    return score_file(_evaluator, path)
+
+def iter_scores(
+    paths: List[str],
+    n_workers: int=1,
+    directory: str=ACCURACY_EVALUATOR_DIR
+) -> Iterator[dict]:
+    """
+    Score submission files, yielding results as soon as they are available (not in input order).
+
+    With several workers, files are scored in a process pool.
+    Each worker loads the evaluator artifacts once, as read-only memory maps shared through the OS page cache.
+
+    Parameters
+    ----------
+    paths : List[str]
+        submission files
+    n_workers : int
+        number of worker processes, files are scored in the current process if 1
+    directory : str
+        AccuracyEvaluator artifacts directory, see `utils.warmup.warmup_accuracy_evaluator`
+
+    Yields
+    ------
+    dict
+        result, see `score_file`
+    """
+
+    if n_workers == 1:
+        evaluator = AccuracyEvaluator.load(directory, mmap_mode='r')
+        for path in paths:
+            yield score_file(evaluator, path)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_worker,
+        initargs=(directory,)
+    ) as executor:
+        futures = [executor.submit(_score_file_in_worker, path) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,492 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from utils.artifacts import (
+    MANIFEST_FILENAME,
+    artifacts_exist,
+    load_artifacts,
+    save_artifacts,
+    update_artifacts
+)
+from utils.settings import (
+    SESSION_DIR,
+    SESSION_STORE_MAX_BYTES,
+    SESSION_TTL,
+    SESSION_TOUCH_INTERVAL,
+    SESSION_SWEEP_INTERVAL
+)
+
+TOKEN_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+# access times are tracked apart from the manifest, whose mtime tells the content version
+ACCESS_FILENAME = 'last_access'
+
+# new entries are written to a directory with this prefix, then renamed to their token
+STAGING_PREFIX = '.staging-'
+
+def get_mtime(path: str, default: float=0.) -> float:
+    """
+    Return the modification time of `path`, or `default` if it does not exist
+    """
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return default
+
+def touch(path: str):
+    """
+    Create `path` if needed and set its modification time to now, ignoring errors
+    (e.g. the entry was removed meanwhile)
+    """
+    try:
+        with open(path, 'a'):
+            pass
+        os.utime(path)
+    except OSError:
+        pass
+
+class SessionStore(object):
+
+    # keys accepted by the store, also used to recognize entries of the on-disk tier
+    token_pattern = TOKEN_PATTERN
+    # True if the arrays stored under a key never change, e.g. keyed by a hash of their inputs
+    content_addressed = False
+
+    def __init__(
+        self,
+        directory: str=SESSION_DIR,
+        max_bytes: int=SESSION_STORE_MAX_BYTES,
+        ttl: float=SESSION_TTL,
+        touch_interval: float=SESSION_TOUCH_INTERVAL,
+        sweep_interval: float=SESSION_SWEEP_INTERVAL
+    ):
+        """
+        Server-side store of per-session arrays (e.g. uploaded predictions), keyed by a random token.
+        Only the token travels through the Dash state.
+
+        Two tiers:
+            in-process LRU, evicted beyond `max_bytes` or after `ttl` seconds without access
+            on-disk artifacts in `directory`, shared by all workers, removed after `ttl` seconds without access
+
+        In-process hits do no disk I/O beyond a `stat` of the manifest, to see updates of other workers,
+        and an update of the on-disk access time every `touch_interval` seconds at most.
+
+        Parameters
+        ----------
+        directory : str
+            on-disk tier directory
+        max_bytes : int
+            memory cap of the in-process tier
+        ttl : float
+            time to live since last access, in seconds
+        touch_interval : float
+            on-disk access times of an entry are updated at most every `touch_interval` seconds by this process
+        sweep_interval : float
+            expired on-disk entries are removed at most every `sweep_interval` seconds by this process
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self.sweep_interval = sweep_interval
+
+        # token -> dict(arrays, metadata, nbytes, last_access, last_touch, version)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = 0.
+
+    def create(
+        self,
+        arrays: Dict[str, np.ndarray],
+        metadata: dict=None
+    ) -> str:
+        """
+        Store arrays under a new token
+
+        Parameters
+        ----------
+        arrays : Dict[str, np.ndarray]
+            arrays, by name
+        metadata : dict
+            json-serializable metadata
+
+        Returns
+        -------
+        str
+            token
+        """
+
+        token = uuid.uuid4().hex
+        self.put(token, arrays, metadata)
+
+        return token
+
+    def put(
+        self,
+        token: str,
+        arrays: Dict[str, np.ndarray],
+        metadata: dict=None
+    ):
+        """
+        Store arrays under `token`, replacing previous ones
+        """
+
+        self._check_token(token)
+
+        metadata = metadata if metadata is not None else {}
+
+        self._save(token, arrays, metadata)
+
+        now = time.time()
+
+        with self._lock:
+            self._set_entry(token, arrays, metadata, now, self._get_version(token))
+
+            sweep = now - self._last_sweep > self.sweep_interval
+            if sweep:
+                self._last_sweep = now
+
+        if sweep:
+            self._sweep_directory()
+
+    def update(
+        self,
+        token: str,
+        arrays: Dict[str, np.ndarray],
+        metadata: dict=None
+    ):
+        """
+        Add arrays and metadata to the ones stored under `token`.
+        Only the new arrays are written to the on-disk tier, and its manifest is replaced last, atomically:
+        other workers read either the previous or the updated session, see `utils.artifacts.update_artifacts`
+        """
+
+        session = self.get(token)
+
+        if session is None:
+            raise KeyError(f"Unknown or expired session token `{token}`")
+
+        previous_arrays, previous_metadata = session
+
+        metadata = metadata if metadata is not None else {}
+
+        update_artifacts(self._get_path(token), arrays, metadata)
+        self._touch(token)
+
+        now = time.time()
+
+        with self._lock:
+            self._set_entry(
+                token,
+                dict(previous_arrays, **arrays),
+                dict(previous_metadata, **metadata),
+                now,
+                self._get_version(token)
+            )
+
+    def get(
+        self,
+        token: str
+    ) -> Tuple[Dict[str, np.ndarray], dict]:
+        """
+        Return arrays and metadata stored under `token`, or None if unknown or expired
+
+        Parameters
+        ----------
+        token : str
+            token returned by `create`
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            arrays, by name
+        dict
+            metadata
+        """
+
+        session, _ = self._get(token)
+
+        return session
+
+    def _get(
+        self,
+        token: str
+    ) -> Tuple[Tuple[Dict[str, np.ndarray], dict], str]:
+        """
+        Return arrays and metadata stored under `token`, or None if unknown or expired,
+        and the tier they were found in: 'memory', 'disk' or None
+        """
+
+        if token is None or not self.token_pattern.fullmatch(token):
+            return None, None
+
+        now = time.time()
+
+        version = self._get_version(token)
+
+        with self._lock:
+            entry = self._entries.get(token)
+            hit = entry is not None and now - entry['last_access'] <= self.ttl and entry['version'] == version
+            if hit:
+                entry['last_access'] = now
+                self._entries.move_to_end(token)
+                touch = now - entry['last_touch'] > self.touch_interval
+                if touch:
+                    entry['last_touch'] = now
+
+        if hit:
+            if touch:
+                self._touch(token)
+            return (entry['arrays'], entry['metadata']), 'memory'
+
+        # miss: the token may have been created or updated by another worker
+        path = self._get_path(token)
+        if not artifacts_exist(path) or now - self._get_last_access(token) > self.ttl:
+            return None, None
+
+        arrays, metadata = load_artifacts(path, mmap_mode='r')
+
+        with self._lock:
+            self._set_entry(token, arrays, metadata, now, version)
+
+        self._touch(token)
+
+        return (arrays, metadata), 'disk'
+
+    def _set_entry(
+        self,
+        token: str,
+        arrays: Dict[str, np.ndarray],
+        metadata: dict,
+        now: float,
+        version: float
+    ):
+        """
+        Store arrays in the in-process tier, accessed and touched at `now`.
+        Must be called with the lock held
+        """
+
+        self._entries[token] = dict(
+            arrays=arrays,
+            metadata=metadata,
+            nbytes=sum(np.asarray(array).nbytes for array in arrays.values()),
+            last_access=now,
+            last_touch=now,
+            version=version
+        )
+        self._entries.move_to_end(token)
+        self._evict()
+
+    def _save(
+        self,
+        token: str,
+        arrays: Dict[str, np.ndarray],
+        metadata: dict
+    ):
+        """
+        Save arrays to the on-disk tier. A new entry is written to a unique staging directory,
+        and renamed to its token once complete: other workers never see a partial entry
+        """
+
+        path = self._get_path(token)
+
+        os.makedirs(self.directory, exist_ok=True)
+        staging_path = tempfile.mkdtemp(dir=self.directory, prefix=STAGING_PREFIX)
+
+        try:
+            save_artifacts(staging_path, arrays, metadata)
+            touch(os.path.join(staging_path, ACCESS_FILENAME))
+            try:
+                os.rename(staging_path, path)
+                return
+            except OSError:
+                # the entry already exists, e.g. saved by another worker
+                pass
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+        if not (self.content_addressed and artifacts_exist(path)):
+            # replaced in place, the manifest last, see `utils.artifacts.save_artifacts`
+            save_artifacts(path, arrays, metadata)
+
+        self._touch(token)
+
+    def _evict(self):
+        """
+        Drop expired entries, then least recently used ones beyond the memory cap.
+        Must be called with the lock held
+        """
+
+        now = time.time()
+
+        for token in [token for token, entry in self._entries.items() if now - entry['last_access'] > self.ttl]:
+            del self._entries[token]
+
+        total_bytes = sum(entry['nbytes'] for entry in self._entries.values())
+
+        while total_bytes > self.max_bytes and len(self._entries) > 0:
+            _, entry = self._entries.popitem(last=False)
+            total_bytes -= entry['nbytes']
+
+    def _sweep_directory(self):
+        """
+        Remove on-disk entries not accessed for more than `ttl` seconds
+        """
+
+        now = time.time()
+
+        for name in os.listdir(self.directory):
+            path = self._get_path(name)
+            if self.token_pattern.fullmatch(name):
+                expired = now - self._get_last_access(name) > self.ttl
+            elif name.startswith(STAGING_PREFIX):
+                # left by an interrupted save
+                expired = now - get_mtime(path) > self.ttl
+            else:
+                continue
+            if expired:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _check_token(self, token: str):
+        if not self.token_pattern.fullmatch(token):
+            raise ValueError(f"Invalid session token `{token}`")
+
+    def _get_path(self, token: str) -> str:
+        return os.path.join(self.directory, token)
+
+    def _get_version(self, token: str) -> float:
+        if self.content_addressed:
+            # never updated: no need to look at the manifest
+            return None
+        return get_mtime(os.path.join(self._get_path(token), MANIFEST_FILENAME), default=None)
+
+    def _get_last_access(self, token: str) -> float:
+        return get_mtime(os.path.join(self._get_path(token), ACCESS_FILENAME))
+
+    def _touch(self, token: str):
+        touch(os.path.join(self._get_path(token), ACCESS_FILENAME))
+
+class ResultCache(SessionStore):
+
+    # keys returned by `utils.artifacts.cache_key`
+    token_pattern = re.compile(r'[0-9a-f]{64}')
+    content_addressed = True
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        ttl: float,
+        touch_interval: float=SESSION_TOUCH_INTERVAL,
+        sweep_interval: float=SESSION_SWEEP_INTERVAL
+    ):
+        """
+        Server-side cache of computed results (e.g. explore queries), keyed by a content hash of their inputs,
+        see `utils.artifacts.cache_key`. Same two tiers as `SessionStore`: results computed by a worker
+        are served to all workers from the on-disk tier.
+        Cached results never change, so in-process hits do not `stat` the on-disk tier.
+
+        Hits and misses of this process are counted, see `stats`.
+
+        Parameters
+        ----------
+        directory : str
+            on-disk tier directory
+        max_bytes : int
+            memory cap of the in-process tier
+        ttl : float
+            time to live since last access, in seconds
+        touch_interval : float
+            on-disk access times of an entry are updated at most every `touch_interval` seconds by this process
+        sweep_interval : float
+            expired on-disk entries are removed at most every `sweep_interval` seconds by this process
+        """
+
+        super().__init__(
+            directory=directory,
+            max_bytes=max_bytes,
+            ttl=ttl,
+            touch_interval=touch_interval,
+            sweep_interval=sweep_interval
+        )
+
+        self.counters = dict(memory_hits=0, disk_hits=0, misses=0)
+
+    def _get(
+        self,
+        token: str
+    ) -> Tuple[Tuple[Dict[str, np.ndarray], dict], str]:
+
+        session, tier = super()._get(token)
+
+        with self._lock:
+            self.counters['misses' if tier is None else f'{tier}_hits'] += 1
+
+        return session, tier
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Tuple[Dict[str, np.ndarray], dict]]
+    ) -> Tuple[Dict[str, np.ndarray], dict]:
+        """
+        Return arrays and metadata cached under `key`, computed and cached on miss
+
+        Parameters
+        ----------
+        key : str
+            cache key, see `utils.artifacts.cache_key`
+        compute : Callable
+            returns the arrays and metadata to cache, called on miss only
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            arrays, by name
+        dict
+            metadata
+        """
+
+        session = self.get(key)
+
+        if session is None:
+            session = compute()
+            try:
+                self.put(key, *session)
+            except OSError as e:
+                # caching is best effort, the result is served anyway
+                print(f'Could not cache result `{key}`: {e!r}')
+
+        return session
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counts of this process, and in-process tier usage
+        """
+
+        with self._lock:
+            counters = dict(self.counters)
+            n_entries = len(self._entries)
+            n_bytes = sum(entry['nbytes'] for entry in self._entries.values())
+
+        n_requests = sum(counters.values())
+        hits = counters['memory_hits'] + counters['disk_hits']
+
+        return dict(
+            counters,
+            hits=hits,
+            hit_rate=hits / n_requests if n_requests > 0 else None,
+            entries=n_entries,
+            nbytes=n_bytes,
+            max_bytes=self.max_bytes
+        )
@@ -10,8 +10,34 @@ CACHE_DIR = os.path.join(DATA_DIR, '.cache')
 CALENDAR_FILEPATH = os.path.join(DATA_DIR, 'calendar.csv')
 SELL_PRICES_FILEPATH = os.path.join(DATA_DIR, 'sell_prices.csv')
 SALES_FILEPATH = os.path.join(DATA_DIR, 'sales_train_validation.csv')
-ACCURACY_EVALUATOR_FILE_PATH = os.path.join(CACHE_DIR, 'accuracy_evaluator.pckl')
-SALES_EXPLORER_FILE_PATH = os.path.join(CACHE_DIR, 'sales_explorer.pckl')
+ACCURACY_EVALUATOR_DIR = os.path.join(CACHE_DIR, 'accuracy_evaluator')
+SALES_EXPLORER_DIR = os.path.join(CACHE_DIR, 'sales_explorer')
+
+# Server-side store for per-session data (uploaded predictions...), see `utils.session.SessionStore`
+SESSION_DIR = os.path.join(CACHE_DIR, 'sessions')
+SESSION_STORE_MAX_BYTES = 512 * 2**20 # in-process tier memory cap
+SESSION_TTL = 3600 # s, since last access
+# Disk I/O of the session store and result caches: access times of an on-disk entry are updated
+# at most this often by each worker, and expired entries removed at most this often by each worker
+SESSION_TOUCH_INTERVAL = 60 # s
+SESSION_SWEEP_INTERVAL = 600 # s
+
+# Server-side cache of explore query results, shared by all workers, see `utils.session.ResultCache`
+EXPLORE_CACHE_DIR = os.path.join(CACHE_DIR, 'explore')
+EXPLORE_CACHE_MAX_BYTES = 256 * 2**20 # in-process tier memory cap
+EXPLORE_CACHE_TTL = 24 * 3600 # s, since last access
+
+# pd.read_csv engine for input files, e.g. 'pyarrow' if installed. None for pandas default
+CSV_ENGINE = None
+
+# Also hash input files content to invalidate cached artifacts (slower than size and mtime only)
+CACHE_CONTENT_HASH = False
+
+# Floating point precision of pre-computed arrays (rolled-up values, scaling factors, prices, weights),
+# predictions and residuals: 'double' (float64) or 'single' (float32, half the memory and sparse product bandwidth).
+# Single precision WRMSSE is within SINGLE_PRECISION_RTOL of double precision, see `benchmarks/precision.py`
+PRECISION = os.environ.get('M5_VIEWER_PRECISION', 'double')
+SINGLE_PRECISION_RTOL = 1e-4
 
 #
 # Competition rules
@@ -62,6 +88,24 @@ AGGREGATION_LEVELS_COLOR_DISCRETE_MAP = dict(
 
 N_VALIDATION_DAYS = 28
 
+# WRMSSE bootstrap confidence intervals, see `AccuracyEvaluator.bootstrap`
+BOOTSTRAP_N_REPLICATES = 1000
+BOOTSTRAP_BLOCK_SIZE = 7 # days, one week to keep the weekly seasonality within blocks
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_CHUNK_SIZE = 100 # replicates computed at once
+
+# Uncertainty track quantiles, scored with the weighted scaled pinball loss (WSPL)
+QUANTILES = [0.005, 0.025, 0.165, 0.25, 0.5, 0.75, 0.835, 0.975, 0.995]
+UNCERTAINTY_CHUNK_SIZE = 4096 # aggregated time series scored at once
+
+# Submissions rolled up at once by `AccuracyEvaluator.evaluate_many`.
+# Memory is about 20 MB per submission of the full dataset
+EVALUATE_MANY_CHUNK_SIZE = 8
+
+# Rolling-origin backtest folds, see `utils.backtest.BacktestEvaluator`
+BACKTEST_N_FOLDS = 3
+BACKTEST_CHUNK_SIZE = 4096 # rows processed at once for scaling factors and weights
+
 #
 # App settings
 #
@@ -74,11 +118,25 @@ AGG_FUNCTIONS =[
     'max',
 ]
 
+# days aggregated at once by `utils.explore.groupby_agg`
+EXPLORE_CHUNK_SIZE = 256
+# points per trace and sampling frequency sent to the explore graph, about its pixel width
+EXPLORE_MAX_POINTS = 1000
+# seed of the random choice of plotted groups, when there are more than `SalesExplorer.MAX_N_GRAPH_TRACES`
+EXPLORE_SAMPLING_SEED = 0
+
 AGG_LEVEL_COL = 'agg_level'
 AGG_LEVEL_ID_COL = 'agg_level_id'
 
 WRMSSE_COL = 'wrmsse'
 RMSSE_COL = 'rmsse'
+WSPL_COL = 'wspl'
+SPL_COL = 'spl'
 SALES_USD_COL = 'sales_usd'
 
-COL_HEIGHT = 1500 # px
\ No newline at end of file
+COL_HEIGHT = 1500 # px
+
+# Serve immediately and build or load data objects in a background thread.
+# Disabled when data objects are loaded once before forking workers, see `gunicorn.conf.py`
+WARMUP_IN_BACKGROUND = os.environ.get('M5_VIEWER_WARMUP_IN_BACKGROUND', '1') == '1'
+WARMUP_REFRESH_INTERVAL = 2000 # ms
\ No newline at end of file
@@ -0,0 +1,287 @@
+import os
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.loading import (
+    CALENDAR_DTYPES,
+    ID_COLS_DTYPES,
+    SALES_DTYPE,
+    SELL_PRICES_DTYPES
+)
+from utils.settings import (
+    CALENDAR_FILEPATH,
+    N_VALIDATION_DAYS,
+    SALES_FILEPATH,
+    SELL_PRICES_FILEPATH
+)
+
+# M5 hierarchy: stores per state and items per department
+M5_STORES_PER_STATE = {
+    'CA': 4,
+    'TX': 3,
+    'WI': 3
+}
+M5_ITEMS_PER_DEPT = {
+    'FOODS_1': 216,
+    'FOODS_2': 398,
+    'FOODS_3': 823,
+    'HOBBIES_1': 416,
+    'HOBBIES_2': 149,
+    'HOUSEHOLD_1': 532,
+    'HOUSEHOLD_2': 515
+}
+M5_N_DAYS = 1913
+M5_START_DATE = '2011-01-29'
+
+# median sell price per category, in USD
+CAT_MEDIAN_PRICES = {
+    'FOODS': 2.5,
+    'HOBBIES': 4.5,
+    'HOUSEHOLD': 5.0
+}
+
+# day of month with SNAP purchases allowed, per state
+SNAP_DAYS = {
+    'CA': list(range(1, 11)),
+    'TX': [1, 3, 5, 6, 7, 9, 11, 12, 15],
+    'WI': [2, 3, 5, 6, 8, 9, 11, 12, 14, 15]
+}
+
+def get_synthetic_id_df(
+    scale: float=1.
+) -> pd.DataFrame:
+    """
+    Return the identifier columns of a synthetic sales dataframe, with the M5 hierarchy:
+    10 stores in 3 states, 7 departments in 3 categories, `scale` times the M5 number of items per department
+
+    Parameters
+    ----------
+    scale : float
+        number of items relative to M5, e.g. 0.01 for a tiny dataset, 10 for ten times M5.
+        Departments keep at least one item
+
+    Returns
+    -------
+    pd.DataFrame
+        id, item_id, dept_id, cat_id, store_id, state_id, one row per (store, item)
+    """
+
+    item_ids = []
+    dept_ids = []
+
+    for dept_id, n_items in M5_ITEMS_PER_DEPT.items():
+        n_items = max(int(round(n_items * scale)), 1)
+        item_ids += [f'{dept_id}_{k + 1:03d}' for k in range(n_items)]
+        dept_ids += [dept_id] * n_items
+
+    store_ids = []
+    state_ids = []
+
+    for state_id, n_stores in M5_STORES_PER_STATE.items():
+        store_ids += [f'{state_id}_{k + 1}' for k in range(n_stores)]
+        state_ids += [state_id] * n_stores
+
+    n_items, n_stores = len(item_ids), len(store_ids)
+
+    id_df = pd.DataFrame(dict(
+        item_id=np.tile(item_ids, n_stores),
+        dept_id=np.tile(dept_ids, n_stores),
+        store_id=np.repeat(store_ids, n_items),
+        state_id=np.repeat(state_ids, n_items)
+    ))
+    id_df['cat_id'] = id_df['dept_id'].str.rsplit('_', n=1).str[0]
+    id_df.insert(0, 'id', id_df['item_id'] + '_' + id_df['store_id'] + '_validation')
+
+    return id_df[['id', 'item_id', 'dept_id', 'cat_id', 'store_id', 'state_id']]
+
+def get_synthetic_calendar(
+    n_days: int
+) -> pd.DataFrame:
+    """
+    Return a calendar dataframe of `n_days` days in the M5 format, starting on the M5 start date.
+    Walmart weeks start on Saturdays and are numbered `1YYWW`, 52 weeks a year
+
+    Parameters
+    ----------
+    n_days : int
+        number of days
+
+    Returns
+    -------
+    pd.DataFrame
+        calendar dataframe
+    """
+
+    dates = pd.date_range(M5_START_DATE, periods=n_days, freq='D')
+    weeks = np.arange(n_days) // 7
+
+    calendar_df = pd.DataFrame(dict(
+        date=dates,
+        wm_yr_wk=10000 + 100 * (11 + weeks // 52) + weeks % 52 + 1,
+        weekday=dates.day_name(),
+        wday=(dates.dayofweek + 2) % 7 + 1, # 1 on Saturdays
+        month=dates.month,
+        year=dates.year,
+        d=[f'd_{k + 1}' for k in range(n_days)]
+    ))
+
+    christmas = (dates.month == 12) & (dates.day == 25)
+    calendar_df['event_name_1'] = np.where(christmas, 'Christmas', None)
+    calendar_df['event_type_1'] = np.where(christmas, 'National', None)
+    calendar_df['event_name_2'] = None
+    calendar_df['event_type_2'] = None
+
+    for state_id, days in SNAP_DAYS.items():
+        calendar_df[f'snap_{state_id}'] = np.isin(dates.day, days).astype(int)
+
+    return calendar_df.astype(CALENDAR_DTYPES)
+
+def make_synthetic_m5(
+    scale: float=1.,
+    n_days: int=M5_N_DAYS,
+    n_calendar_days: int=None,
+    seed: int=0,
+    chunk_size: int=4096
+) -> Tuple:
+    """
+    Return sales, sell prices and calendar dataframes shaped as the M5 ones,
+    with the dtypes of `utils.loading`.
+
+    Daily sales are intermittent: each series has its own Poisson rate (log-normal across series),
+    weekly and yearly seasonality, a release day before which sales are zero,
+    and random out-of-stock days.
+    Sell prices start on the release week, with occasional discounts.
+
+    Parameters
+    ----------
+    scale : float
+        number of items relative to M5, see `get_synthetic_id_df`
+    n_days : int
+        number of sales days
+    n_calendar_days : int
+        number of calendar and sell price days, `n_days` plus two validation periods by default, as in M5
+    seed : int
+        random seed
+    chunk_size : int
+        number of series generated at once
+
+    Returns
+    -------
+    pd.DataFrame
+        sales dataframe
+    pd.DataFrame
+        sell prices dataframe
+    pd.DataFrame
+        calendar dataframe
+    """
+
+    if n_calendar_days is None:
+        n_calendar_days = n_days + 2 * N_VALIDATION_DAYS
+
+    rng = np.random.default_rng(seed)
+
+    id_df = get_synthetic_id_df(scale)
+    calendar_df = get_synthetic_calendar(n_calendar_days)
+
+    n_series = len(id_df)
+
+    #
+    # 1. Sales
+    #
+
+    rates = np.exp(rng.normal(-0.5, 1.2, size=n_series))
+    in_stock_probabilities = rng.beta(8., 1., size=n_series)
+
+    # a third of the series are released after the first day
+    release_days = np.where(
+        rng.random(n_series) < 1/3,
+        rng.integers(0, max(int(0.7 * n_days), 1), size=n_series),
+        0
+        )
+
+    day_index = np.arange(n_days)
+    weekly_seasonality = np.array([1.3, 1.25, 0.95, 0.85, 0.85, 0.85, 0.95])[day_index % 7]
+    yearly_seasonality = 1 + 0.1 * np.sin(2 * np.pi * day_index / 365.25)
+    seasonality = weekly_seasonality * yearly_seasonality
+
+    sales_values = np.empty((n_series, n_days), dtype=SALES_DTYPE)
+
+    for chunk_start in range(0, n_series, chunk_size):
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+
+        lam = rates[chunk, None] * seasonality[None, :]
+        sales = rng.poisson(lam)
+        sales *= rng.random(lam.shape) < in_stock_probabilities[chunk, None]
+        sales *= day_index[None, :] >= release_days[chunk, None]
+
+        sales_values[chunk] = np.minimum(sales, np.iinfo(SALES_DTYPE).max)
+
+    sales_df = pd.concat(
+        [
+            id_df,
+            pd.DataFrame(sales_values, columns=calendar_df['d'].values[:n_days])
+        ],
+        axis=1
+    ).astype(ID_COLS_DTYPES)
+
+    #
+    # 2. Sell prices, one row per (store, item) and week from the release week
+    #
+
+    weeks = np.unique(calendar_df['wm_yr_wk'].values)
+    release_weeks = release_days // 7
+
+    item_codes, item_ids = pd.factorize(id_df['item_id'])
+    item_prices = np.exp(rng.normal(0., 0.6, size=len(item_ids))) \
+        * id_df.groupby(item_codes)['cat_id'].first().map(CAT_MEDIAN_PRICES).values
+    series_prices = np.round(item_prices[item_codes] * rng.uniform(0.95, 1.05, size=n_series), 2)
+
+    n_weeks_per_series = len(weeks) - release_weeks
+    series_index = np.repeat(np.arange(n_series), n_weeks_per_series)
+    week_index = np.arange(len(series_index)) \
+        - np.repeat(np.cumsum(n_weeks_per_series) - n_weeks_per_series, n_weeks_per_series) \
+        + release_weeks[series_index]
+
+    # 5% of the weeks have a 10% to 30% discount
+    discounts = np.where(
+        rng.random(len(series_index)) < 0.05,
+        rng.uniform(0.7, 0.9, size=len(series_index)),
+        1.
+        )
+
+    sell_prices_df = pd.DataFrame(dict(
+        store_id=id_df['store_id'].values[series_index],
+        item_id=id_df['item_id'].values[series_index],
+        wm_yr_wk=weeks[week_index],
+        sell_price=np.round(series_prices[series_index] * discounts, 2)
+    )).astype(SELL_PRICES_DTYPES)
+
+    return sales_df, sell_prices_df, calendar_df
+
+def write_synthetic_m5(
+    directory: str,
+    **kwargs
+):
+    """
+    Write synthetic data files in `directory`, with the names of the M5 files,
+    e.g. to run the app or `score.py` with `directory` as data directory
+
+    Parameters
+    ----------
+    directory : str
+        data directory
+    kwargs
+        `make_synthetic_m5` parameters
+    """
+
+    os.makedirs(directory, exist_ok=True)
+
+    sales_df, sell_prices_df, calendar_df = make_synthetic_m5(**kwargs)
+
+    for df, path in zip(
+        [sales_df, sell_prices_df, calendar_df],
+        [SALES_FILEPATH, SELL_PRICES_FILEPATH, CALENDAR_FILEPATH]
+    ):
+        df.to_csv(os.path.join(directory, os.path.basename(path)), index=False)
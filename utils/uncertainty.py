@@ -0,0 +1,230 @@
+import re
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.evaluate import AccuracyEvaluator, ValidationError, align_to_ids
+from utils.settings import QUANTILES, UNCERTAINTY_CHUNK_SIZE
+
+# aggregation levels whose uncertainty track ids list their keys in reverse order, e.g. FOODS_1_001_CA
+REVERSED_ID_AGG_LEVELS = ['state_id:item_id']
+
+def get_uncertainty_series_ids(
+    agg_level_ids: pd.DataFrame,
+    ids: np.array
+) -> Tuple:
+    """
+    Return the uncertainty track name of each aggregated time series, e.g. `Total_X`, `CA_1_X`, `CA_FOODS_1`,
+    and the suffix of submission ids
+
+    Parameters
+    ----------
+    agg_level_ids : pd.DataFrame
+        Aggregated time series ids, see `utils.evaluate.get_rollup_matrix`
+    ids : np.array
+        Sales dataframe ids
+
+    Returns
+    -------
+    np.array
+        name of each aggregated time series
+    str
+        submission ids suffix, e.g. `_validation`
+    """
+
+    match = re.search(r'_(validation|evaluation)$', str(ids[0]))
+    suffix = match.group(0) if match is not None else ''
+
+    series_ids = []
+
+    for agg_level, agg_level_id in zip(agg_level_ids['agg_level'].values, agg_level_ids['agg_level_id'].values):
+        if agg_level == 'all':
+            series_id = 'Total_X'
+        elif agg_level == 'id':
+            series_id = agg_level_id[:len(agg_level_id) - len(suffix)]
+        else:
+            keys = agg_level_id.split(':')
+            if agg_level in REVERSED_ID_AGG_LEVELS:
+                keys = keys[::-1]
+            if len(keys) == 1:
+                keys.append('X')
+            series_id = '_'.join(keys)
+
+        series_ids.append(series_id)
+
+    return np.array(series_ids, dtype=object), suffix
+
+class UncertaintyEvaluator(object):
+
+    def __init__(
+        self,
+        accuracy_evaluator: AccuracyEvaluator,
+        quantiles: List[float]=QUANTILES
+    ):
+        """
+        Initiate the evaluator of the uncertainty track, whose metric is the weighted scaled pinball loss (WSPL).
+
+        Quantile predictions are given for every aggregated time series (quantiles do not add up),
+        and are scored against the rolled-up groundtruth, USD sales weights and Lag1 MAE scale factors
+        pre-computed by `accuracy_evaluator`.
+
+        Parameters
+        ----------
+        accuracy_evaluator : AccuracyEvaluator
+            evaluator of the accuracy track
+        quantiles : List[float]
+            predicted quantiles
+        """
+
+        self.accuracy_evaluator = accuracy_evaluator
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.n_validation_days = accuracy_evaluator.n_validation_days
+
+        # closest quantile to the median, for residuals and plots
+        self.median_index = int(np.argmin(np.abs(self.quantiles - 0.5)))
+
+        # submission ids, one per (aggregated time series, quantile), quantiles varying fastest
+        self.series_ids, suffix = get_uncertainty_series_ids(
+            accuracy_evaluator.agg_level_ids,
+            accuracy_evaluator.ids
+        )
+        quantile_suffixes = np.array([f'_{quantile:.3f}{suffix}' for quantile in self.quantiles], dtype=object)
+
+        self.ids = np.repeat(self.series_ids, len(self.quantiles)) \
+            + np.tile(quantile_suffixes, len(self.series_ids))
+        self.id_index = pd.Index(self.ids)
+
+    def align_values(
+        self,
+        df : pd.DataFrame
+    ) -> np.array:
+        """
+        Return the quantile predictions of `df`, aligned with the aggregated time series.
+        Raises a `ValidationError` if they cannot be aligned, see `utils.evaluate.align_to_ids`
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Quantile predictions, in the uncertainty track submission format
+            Expected columns
+                id : e.g. `CA_1_X_0.995_validation`
+                F1, F2...
+
+        Returns
+        -------
+        np.array
+            predictions, of shape `(n_aggregated_time_series, len(self.quantiles), n_validation_days)`
+        """
+
+        values, report = align_to_ids(self.ids, self.id_index, df, n_value_columns=self.n_validation_days)
+
+        if values is None:
+            raise ValidationError(report)
+
+        return values.reshape(len(self.series_ids), len(self.quantiles), -1)\
+            .astype(self.accuracy_evaluator.float_dtype, copy=False)
+
+    def evaluate(
+        self,
+        predictions_df : pd.DataFrame
+    ) -> float:
+        """
+        Given quantile predictions, compute the WSPL
+
+        Parameters
+        ----------
+        predictions_df : pd.DataFrame
+            Quantile predictions, see `align_values`
+
+        Returns
+        -------
+        float
+            WSPL
+        """
+
+        return self.evaluate_detailed(predictions_df)[0]
+
+    def evaluate_detailed(
+        self,
+        predictions_df : pd.DataFrame
+    ) -> Tuple:
+        """
+        Given quantile predictions, compute the WSPL and return evaluation details
+
+        Parameters
+        ----------
+        predictions_df : pd.DataFrame
+            Quantile predictions, see `align_values`
+
+        Returns
+        -------
+        float
+            WSPL
+        np.array
+            residuals of the median prediction for each aggregated time series
+        pd.DataFrame
+            full results per `agg_level_id`
+                "spl"
+                "sales_usd"
+                "sales_usd_weight"
+                "wspl"
+        """
+
+        return self.evaluate_detailed_from_values(self.align_values(predictions_df))
+
+    def evaluate_detailed_from_values(
+        self,
+        pred_values : np.array,
+        chunk_size : int=UNCERTAINTY_CHUNK_SIZE
+    ) -> Tuple:
+        """
+        Same as `evaluate_detailed`, given values returned by `align_values`.
+        The pinball loss of all quantiles is computed at once, on chunks of aggregated time series
+
+        Parameters
+        ----------
+        pred_values : np.array
+            Quantile predictions, of shape `(n_aggregated_time_series, len(self.quantiles), n_validation_days)`
+        chunk_size : int
+            Number of aggregated time series scored at once
+
+        Returns
+        -------
+        float
+            WSPL
+        np.array
+            residuals of the median prediction for each aggregated time series
+        pd.DataFrame
+            full results per `agg_level_id`, see `evaluate_detailed`
+        """
+
+        accuracy_evaluator = self.accuracy_evaluator
+
+        gt_values = accuracy_evaluator.rolled_up_groundtruth_values
+        quantiles = self.quantiles[None, :, None]
+
+        n_series = len(self.series_ids)
+        spl_per_agg_level_id = np.empty(n_series, dtype=np.float64)
+
+        for chunk_start in range(0, n_series, chunk_size):
+            chunk = slice(chunk_start, chunk_start + chunk_size)
+
+            # (series, quantile, day)
+            diffs = gt_values[chunk][:, None, :] - pred_values[chunk]
+            pinball_losses = np.maximum(quantiles * diffs, (quantiles - 1) * diffs)
+
+            spl_per_agg_level_id[chunk] = np.mean(pinball_losses, axis=(1, 2), dtype=np.float64) \
+                / accuracy_evaluator.abs_scaling_factors[chunk]
+
+        residuals_per_agg_level_id = pred_values[:, self.median_index, :] - gt_values
+
+        results_per_agg_df = accuracy_evaluator.agg_level_ids.copy()
+        results_per_agg_df['spl'] = spl_per_agg_level_id
+        results_per_agg_df['sales_usd'] = accuracy_evaluator.sales_usd
+        results_per_agg_df['sales_usd_weight'] = accuracy_evaluator.sales_usd_weights / accuracy_evaluator.n_agg_levels
+        results_per_agg_df['wspl'] = results_per_agg_df['sales_usd_weight'] * results_per_agg_df['spl']
+
+        wspl = results_per_agg_df['wspl'].sum()
+
+        return wspl, residuals_per_agg_level_id, results_per_agg_df
@@ -0,0 +1,314 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.artifacts import cache_key, file_fingerprint, load_or_build
+from utils.evaluate import AccuracyEvaluator
+from utils.explore import SalesExplorer
+from utils.loading import read_input
+from utils.uncertainty import UncertaintyEvaluator
+from utils.settings import (
+    AGGREGATION_LEVELS,
+    N_VALIDATION_DAYS,
+    PRECISION,
+    CALENDAR_FILEPATH,
+    SELL_PRICES_FILEPATH,
+    SALES_FILEPATH,
+    ACCURACY_EVALUATOR_DIR,
+    SALES_EXPLORER_DIR,
+    CACHE_CONTENT_HASH
+)
+
+INPUT_FILEPATHS = dict(
+    sales_df=SALES_FILEPATH,
+    sell_prices_df=SELL_PRICES_FILEPATH,
+    calendar_df=CALENDAR_FILEPATH
+)
+
+class PhaseTimer(object):
+
+    def __init__(self):
+        """
+        Record and print the wall time of each warm-up phase
+        """
+
+        self.phases = []
+        self.current_phase = None
+
+    @contextmanager
+    def __call__(self, name: str):
+        """
+        Time the phase `name`, to be used as a context manager
+        """
+
+        self.current_phase = name
+        start = time.perf_counter()
+
+        yield
+
+        seconds = time.perf_counter() - start
+        self.phases.append(dict(name=name, seconds=seconds))
+        self.current_phase = None
+
+        print(f'Warm-up phase `{name}`: {seconds:.2f}s')
+
+class InputFrames(object):
+
+    def __init__(
+        self,
+        content_hash: bool=CACHE_CONTENT_HASH,
+        timer: PhaseTimer=None
+    ):
+        """
+        Lazily read input dataframes: each input file is read at most once,
+        and only if a stale artifact needs it
+
+        Parameters
+        ----------
+        content_hash : bool
+            also hash input files content in their fingerprints
+        timer : PhaseTimer
+            records file reading phases
+        """
+
+        self.content_hash = content_hash
+        self.timer = timer if timer is not None else PhaseTimer()
+
+        self._frames = {}
+        self._fingerprints = {}
+
+        # wall time and memory reports of read files
+        self.reports = []
+
+    def get(self, name: str) -> pd.DataFrame:
+        """
+        Return the input dataframe `name`, one of `INPUT_FILEPATHS`
+        """
+
+        if name not in self._frames:
+            with self.timer(f'read {name}'):
+                self._frames[name], report = read_input(name)
+                self.reports.append(report)
+
+        return self._frames[name]
+
+    def fingerprint(self, name: str) -> dict:
+        """
+        Return the fingerprint of the input file `name`, see `utils.artifacts.file_fingerprint`
+        """
+
+        if name not in self._fingerprints:
+            self._fingerprints[name] = file_fingerprint(
+                INPUT_FILEPATHS[name],
+                content_hash=self.content_hash
+            )
+
+        return self._fingerprints[name]
+
+def get_settings() -> dict:
+    """
+    Return the settings cached artifacts depend on
+    """
+    return dict(
+        aggregation_levels=AGGREGATION_LEVELS,
+        n_validation_days=N_VALIDATION_DAYS,
+        precision=PRECISION
+    )
+
+def warmup_accuracy_evaluator(
+    directory: str=ACCURACY_EVALUATOR_DIR,
+    inputs: InputFrames=None
+) -> AccuracyEvaluator:
+    """
+    Load the AccuracyEvaluator from its cached artifacts.
+    Each stale component is rebuilt, one at a time, the other ones are reused.
+
+    A component is stale if any of its input files, settings or upstream components changed,
+    see `AccuracyEvaluator.COMPONENTS`
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory
+    inputs : InputFrames
+        input dataframes, shared with other warm-up steps
+
+    Returns
+    -------
+    AccuracyEvaluator
+        evaluator, backed by memory-mapped artifacts
+    """
+
+    if inputs is None:
+        inputs = InputFrames()
+
+    settings = get_settings()
+
+    evaluator = AccuracyEvaluator.__new__(AccuracyEvaluator)
+    evaluator.n_validation_days = settings['n_validation_days']
+    evaluator.precision = settings['precision']
+
+    keys = {}
+
+    for component in AccuracyEvaluator.COMPONENTS:
+
+        name = component['name']
+
+        keys[name] = cache_key(
+            component=name,
+            inputs={col : inputs.fingerprint(col) for col in component['inputs']},
+            settings={col : settings[col] for col in component['settings']},
+            upstream={col : keys[col] for col in component['upstream']}
+        )
+
+        def _build():
+            evaluator.build_component(
+                name,
+                **{col : inputs.get(col) for col in component['inputs']}
+            )
+            return evaluator.get_component_artifacts(name)
+
+        with inputs.timer(f'accuracy_evaluator:{name}'):
+            arrays, metadata, rebuilt = load_or_build(
+                os.path.join(directory, name),
+                keys[name],
+                _build
+            )
+
+            evaluator.set_component_artifacts(name, arrays, metadata)
+
+        if rebuilt:
+            print(f'Rebuilt accuracy evaluator component `{name}`')
+
+    return evaluator
+
+def warmup_sales_explorer(
+    directory: str=SALES_EXPLORER_DIR,
+    inputs: InputFrames=None
+) -> SalesExplorer:
+    """
+    Load the SalesExplorer from its cached artifacts, rebuilt if stale
+
+    Parameters
+    ----------
+    directory : str
+        Artifacts directory
+    inputs : InputFrames
+        input dataframes, shared with other warm-up steps
+
+    Returns
+    -------
+    SalesExplorer
+        explorer, backed by memory-mapped artifacts
+    """
+
+    if inputs is None:
+        inputs = InputFrames()
+
+    key = cache_key(
+        component='sales_explorer',
+        inputs={col : inputs.fingerprint(col) for col in ['sales_df', 'calendar_df']}
+    )
+
+    def _build():
+        sales_explorer = SalesExplorer(
+            inputs.get('sales_df'),
+            inputs.get('calendar_df')
+            )
+        return sales_explorer.get_artifacts()
+
+    with inputs.timer('sales_explorer'):
+        arrays, metadata, rebuilt = load_or_build(directory, key, _build)
+
+        sales_explorer = SalesExplorer.from_artifacts(arrays, metadata, key=key)
+
+    if rebuilt:
+        print('Rebuilt sales explorer')
+
+    return sales_explorer
+
+class Warmup(object):
+
+    def __init__(
+        self,
+        content_hash: bool=CACHE_CONTENT_HASH
+    ):
+        """
+        Build or load the AccuracyEvaluator, the UncertaintyEvaluator and the SalesExplorer,
+        either synchronously (`run`) or in a background thread (`start`).
+        Objects are set as attributes as soon as they are ready.
+
+        Parameters
+        ----------
+        content_hash : bool
+            also hash input files content in their fingerprints
+        """
+
+        self.content_hash = content_hash
+
+        self.timer = PhaseTimer()
+
+        self.accuracy_evaluator = None
+        self.uncertainty_evaluator = None
+        self.sales_explorer = None
+        self.error = None
+        self.read_reports = []
+
+        self._thread = None
+
+    def run(self):
+        """
+        Build or load all objects, in the current thread
+        """
+
+        inputs = InputFrames(content_hash=self.content_hash, timer=self.timer)
+        self.read_reports = inputs.reports
+
+        try:
+            with self.timer('total'):
+                self.accuracy_evaluator = warmup_accuracy_evaluator(inputs=inputs)
+                with self.timer('uncertainty_evaluator'):
+                    self.uncertainty_evaluator = UncertaintyEvaluator(self.accuracy_evaluator)
+                self.sales_explorer = warmup_sales_explorer(inputs=inputs)
+        except Exception as e:
+            self.error = repr(e)
+            raise
+
+    def start(self):
+        """
+        Build or load all objects in a background daemon thread
+        """
+
+        self._thread = threading.Thread(
+            target=self.run,
+            name='warmup',
+            daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        """
+        True if all objects are ready
+        """
+        return self.accuracy_evaluator is not None \
+            and self.uncertainty_evaluator is not None \
+            and self.sales_explorer is not None
+
+    def status(self) -> dict:
+        """
+        Return readiness and progress, json-serializable
+        """
+        return dict(
+            ready=self.ready,
+            accuracy_evaluator=self.accuracy_evaluator is not None,
+            uncertainty_evaluator=self.uncertainty_evaluator is not None,
+            sales_explorer=self.sales_explorer is not None,
+            current_phase=self.timer.current_phase,
+            phases=list(self.timer.phases),
+            reads=list(self.read_reports),
+            error=self.error
+        )